@@ -0,0 +1,153 @@
+import json
+import logging
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, select
+
+from background import DaemonThreads
+
+logger = logging.getLogger(__name__)
+
+class SessionArchiver:
+    """Moves old closed/finished sessions out of the hot sessions table
+
+    Every ``interval`` seconds, sessions in one of ``statuses`` that ended
+    more than ``after_minutes`` ago are copied to ``history`` and deleted,
+    ``batch_size`` rows per transaction so that request handlers are never
+    locked out for long. The full row (game state included) is stored as
+    zlib-compressed JSON in the history table's ``data`` column; the other
+    history columns are copied from the session row by name.
+
+    On SQLite the database is switched to incremental auto-vacuum once, and
+    the pages freed by each run are returned to the file system afterwards.
+
+    The worker thread starts on the first ``ensure_running`` call.
+    """
+
+    def __init__(self, sessions, history, statuses=('closed', 'finished'), after_minutes=60,
+                 batch_size=500, interval=300):
+        self.sessions = sessions
+        self.history = history
+        self.statuses = statuses
+        self.after_minutes = after_minutes
+        self.batch_size = batch_size
+        self.interval = interval
+        self.engine = None
+        self._worker = DaemonThreads(self._run, 'session-archiver')
+        self.archived = 0
+        self.runs = 0
+        self.last_run = None
+
+    def bind(self, engine):
+        """Attach to the database (after its tables exist)"""
+        self.engine = engine
+        if engine.dialect.name == 'sqlite':
+            self._enable_incremental_vacuum()
+
+    def _enable_incremental_vacuum(self):
+        with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2:
+                return
+            # Changing the mode only takes effect after a full VACUUM, once
+            start = time.monotonic()
+            try:
+                conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.exec_driver_sql("VACUUM")
+            except Exception as e:
+                logger.warning(f"Could not enable incremental vacuum: {e}")
+                return
+            logger.info(f"Enabled incremental auto-vacuum in {time.monotonic() - start:.1f}s")
+
+    def _incremental_vacuum(self):
+        """Return the pages freed by archiving to the file system"""
+        raw = self.engine.raw_connection()
+        try:
+            # sqlite3 steps a statement without result columns only once, which
+            # frees a single page; executescript runs the pragma to completion
+            raw.driver_connection.executescript("PRAGMA incremental_vacuum;")
+        finally:
+            raw.close()
+
+    def ensure_running(self):
+        if self.interval <= 0 or self.engine is None:
+            return
+        self._worker.ensure_running()
+
+    def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Session archiving failed: {e}")
+            time.sleep(self.interval)
+
+    def run_once(self):
+        """Archive everything old enough, batch by batch, then free the space; returns the row count"""
+        cutoff = datetime.utcnow() - timedelta(minutes=self.after_minutes)
+        total = 0
+        while True:
+            moved = self._archive_batch(cutoff)
+            total += moved
+            if moved < self.batch_size:
+                break
+        if total and self.engine.dialect.name == 'sqlite':
+            self._incremental_vacuum()
+        self.archived += total
+        self.runs += 1
+        self.last_run = datetime.utcnow()
+        if total:
+            logger.info(f"Archived {total} sessions from {self.sessions.name}")
+        return total
+
+    def candidates(self, cutoff):
+        """Query of the next batch of sessions that ended before ``cutoff``"""
+        sessions = self.sessions
+        # A session cannot end before it starts, so the created_at bound lets
+        # the (status, created_at) index find the candidates
+        return (
+            select(sessions)
+            .where(
+                sessions.c.status.in_(self.statuses),
+                sessions.c.created_at < cutoff,
+                or_(sessions.c.finished_at.is_(None), sessions.c.finished_at < cutoff)
+            )
+            .limit(self.batch_size)
+        )
+
+    def _archive_batch(self, cutoff):
+        sessions = self.sessions
+        columns = [c.name for c in self.history.columns if c.name in sessions.c and c.name != 'data']
+        query = self.candidates(cutoff)
+        with self.engine.connect() as conn:
+            if conn.dialect.name == 'sqlite':
+                # Take the write lock first so two archivers never copy the same rows
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+            rows = conn.execute(query).mappings().all()
+            if not rows:
+                conn.rollback()
+                return 0
+            archived_at = datetime.utcnow()
+            conn.execute(self.history.insert(), [
+                dict({name: row[name] for name in columns},
+                     data=zlib.compress(json.dumps(dict(row), default=str).encode('utf-8')),
+                     archived_at=archived_at)
+                for row in rows
+            ])
+            conn.execute(sessions.delete().where(sessions.c.id.in_([row['id'] for row in rows])))
+            conn.commit()
+        return len(rows)
+
+    def stats(self):
+        return {
+            'archived': self.archived,
+            'runs': self.runs,
+            'last_run': self.last_run.isoformat() if self.last_run else None,
+            'after_minutes': self.after_minutes,
+            'interval': self.interval
+        }
+
+def load_archived(data):
+    """Decode a history row's ``data`` back into the session's column dict"""
+    return json.loads(zlib.decompress(data))
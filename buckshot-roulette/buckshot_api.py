@@ -1,13 +1,21 @@
 import os
+import copy
 import logging
 import random
 import json
+import threading
+import time
 from datetime import datetime
-from flask import Flask, request, jsonify
+from itertools import count
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.middleware.proxy_fix import ProxyFix
 
+from archiver import SessionArchiver, load_archived
+from ledger import BalanceLedger, LedgerPending, to_minor
+from session_ids import SessionIdAllocator
+
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -34,12 +42,16 @@ class User(db.Model):
     
     user_id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), nullable=True)
+    # Materialized ledger balance in minor units; change it only through BalanceLedger
+    balance_minor = db.Column(db.BigInteger, default=100000, nullable=False)
+    # Float mirror of balance_minor, kept for older readers
     balance = db.Column(db.Float, default=1000.0, nullable=False)
     
     def __init__(self, user_id, username=None, balance=1000.0):
         self.user_id = user_id
         self.username = username
         self.balance = balance
+        self.balance_minor = to_minor(balance)
     
     def to_dict(self):
         return {
@@ -50,9 +62,13 @@ class User(db.Model):
 
 class BuckshotSession(db.Model):
     __tablename__ = 'buckshot_sessions'
+    __table_args__ = (
+        # Serves the lobby (status = 'waiting' ORDER BY created_at) with a seek and no sort
+        db.Index('ix_buckshot_sessions_status_created', 'status', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    chat_id = db.Column(db.Integer, unique=True, nullable=False)
+    chat_id = db.Column(db.BigInteger, unique=True, nullable=False)
     creator_id = db.Column(db.Integer, nullable=False)
     creator_username = db.Column(db.String(64), nullable=False)
     player2_id = db.Column(db.Integer, nullable=True)
@@ -98,11 +114,140 @@ class BuckshotSession(db.Model):
     
     def can_join(self, user_id):
         return not self.is_full() and self.creator_id != user_id and self.is_active()
+    
+    @classmethod
+    def waiting(cls):
+        """Query of sessions waiting for a second player, oldest first"""
+        return cls.query.filter_by(status='waiting').order_by(cls.created_at)
+
+class BuckshotSessionHistory(db.Model):
+    """A closed/finished session moved out of buckshot_sessions by SessionArchiver"""
+    __tablename__ = 'buckshot_sessions_history'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # id in buckshot_sessions
+    chat_id = db.Column(db.BigInteger, nullable=False)
+    creator_id = db.Column(db.Integer, nullable=False)
+    player2_id = db.Column(db.Integer, nullable=True)
+    status = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    winner_id = db.Column(db.Integer, nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)  # whole row as zlib-compressed JSON
+    
+    def to_dict(self):
+        return load_archived(self.data)
+
+class LedgerEntry(db.Model):
+    """Append-only record of a balance change (amount in minor units, signed)"""
+    __tablename__ = 'balance_ledger'
+    __table_args__ = (
+        # An entry with a ref (e.g. 'game:<id>') is applied once per user
+        db.UniqueConstraint('user_id', 'ref', name='uq_balance_ledger_user_ref'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    amount = db.Column(db.BigInteger, nullable=False)
+    reason = db.Column(db.String(32), nullable=False)
+    ref = db.Column(db.String(64), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+# Live updates
+class ChangeFeed:
+    """Per-game change notifications for push subscribers
+    
+    The game manager publishes a new version after every change; readers
+    block in ``wait`` until the version differs from the one they have.
+    Each game has its own condition, so a move only wakes its own players.
+    Waiting on an id that has no game leaves no entry behind.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._games = {}  # chat_id -> [condition, version, waiters]
+    
+    def _entry(self, chat_id, waiter=False):
+        with self._lock:
+            entry = self._games.get(chat_id)
+            if entry is None:
+                entry = self._games[chat_id] = [threading.Condition(), 0, 0]
+            if waiter:
+                entry[2] += 1
+            return entry
+    
+    def _leave(self, chat_id, entry):
+        """Drop a waiter; forget the entry if it was the last one and nothing was published"""
+        with self._lock:
+            entry[2] -= 1
+            if not entry[2] and not entry[1] and self._games.get(chat_id) is entry:
+                del self._games[chat_id]
+    
+    def publish(self, chat_id, version):
+        """Record a new version and wake readers"""
+        entry = self._entry(chat_id)
+        with entry[0]:
+            entry[1] = version
+            entry[0].notify_all()
+    
+    def version(self, chat_id):
+        """Last published version of ``chat_id`` (0 if none yet)"""
+        entry = self._games.get(chat_id)
+        return entry[1] if entry else 0
+    
+    def wait(self, chat_id, seen, timeout=None):
+        """Block until the published version is not ``seen`` (or timeout); return it"""
+        entry = self._entry(chat_id, waiter=True)
+        try:
+            with entry[0]:
+                entry[0].wait_for(lambda: entry[1] != seen, timeout)
+                return entry[1]
+        finally:
+            self._leave(chat_id, entry)
+
+# Versions are unique across games so a recreated game never reuses one
+_game_versions = count(1)
+
+BONUS_TYPES = ['magnifying', 'beer', 'handcuffs', 'cigarettes', 'knife']
+
+def generate_shells(round_number):
+    """Shuffled shells for a new round (more shells in later rounds)"""
+    shell_count = random.randint(0, 3) + 3 + round_number
+    live_count = random.randint(1, shell_count - 1)
+    shells = ['live'] * live_count + ['blank'] * (shell_count - live_count)
+    random.shuffle(shells)
+    return shells
+
+def generate_bonuses(round_number=1):
+    """Random bonuses for one player (more bonuses in later rounds)"""
+    bonus_count = min(random.randint(2, 3) + round_number // 2, 5)
+    return [{'type': random.choice(BONUS_TYPES), 'used': False} for _ in range(bonus_count)]
+
+def public_state(game):
+    """Copy of a game state safe to send to players
+
+    The shell order never leaves the server: clients get how many live and
+    blank shells remain and the shells already fired or ejected.
+    """
+    state = copy.deepcopy({key: value for key, value in game.items() if key != 'shells'})
+    remaining = game['shells'][game['currentShell']:]
+    state['liveRemaining'] = remaining.count('live')
+    state['blankRemaining'] = len(remaining) - state['liveRemaining']
+    state['spentShells'] = game['shells'][:game['currentShell']]
+    return state
 
 # Game Logic
 class BuckshotGameManager:
     def __init__(self):
         self.games = {}  # chat_id -> game_state
+        self.versions = {}  # chat_id -> version of the current state
+        self.changes = ChangeFeed()
+    
+    def _touch(self, chat_id):
+        """Record a state change and notify subscribers"""
+        version = next(_game_versions)
+        self.versions[chat_id] = version
+        self.changes.publish(chat_id, version)
     
     def create_game(self, chat_id, player1_id, player1_username, mode='test'):
         """Create new game state"""
@@ -114,16 +259,6 @@ class BuckshotGameManager:
         shells = ['live'] * live_count + ['blank'] * blank_count
         random.shuffle(shells)
         
-        # Generate bonuses for each player
-        def generate_bonuses():
-            bonus_types = ['magnifying', 'beer', 'handcuffs', 'cigarettes', 'knife']
-            bonus_count = random.randint(2, 3)
-            bonuses = []
-            for _ in range(bonus_count):
-                bonus_type = random.choice(bonus_types)
-                bonuses.append({'type': bonus_type, 'used': False})
-            return bonuses
-        
         game_state = {
             'players': [
                 {
@@ -154,6 +289,7 @@ class BuckshotGameManager:
         }
         
         self.games[chat_id] = game_state
+        self._touch(chat_id)
         return game_state
     
     def join_game(self, chat_id, player2_id, player2_username):
@@ -176,6 +312,7 @@ class BuckshotGameManager:
         
         game['gamePhase'] = 'playing'
         game['lastAction'] = f'{player2_username} joined the game!'
+        self._touch(chat_id)
         
         return game
     
@@ -183,12 +320,154 @@ class BuckshotGameManager:
         """Get current game state"""
         return self.games.get(chat_id)
     
-    def update_game(self, chat_id, game_data):
-        """Update game state"""
-        if chat_id in self.games:
-            self.games[chat_id] = game_data
-            return True
-        return False
+    # Server-side rules. Every action validates the turn, changes the state
+    # in place and returns only the top-level keys of public_state it changed.
+    
+    def _player_action(self, chat_id, user_id):
+        """Resolve the game for a move by ``user_id``, or return an error dict"""
+        game = self.games.get(chat_id)
+        if game is None:
+            return None, {'error': 'Game not found'}
+        if game['gamePhase'] != 'playing':
+            return game, {'error': 'Game not active'}
+        if game['players'][game['currentPlayer']]['id'] != str(user_id):
+            return game, {'error': 'Not your turn'}
+        return game, None
+    
+    def _result(self, chat_id, before, **info):
+        """Publish the change and build the delta against ``before`` (a public_state)"""
+        self._touch(chat_id)
+        state = public_state(self.games[chat_id])
+        delta = {key: value for key, value in state.items() if before.get(key) != value}
+        return {'success': True, **info, 'version': self.versions[chat_id], 'delta': delta}
+    
+    def _finish_by_health(self, game):
+        """Last round is over: the healthier player wins (player 2 on a tie)"""
+        first, second = game['players']
+        game['gamePhase'] = 'finished'
+        game['winner'] = first if first['health'] > second['health'] else second
+    
+    def _shells_exhausted(self, game):
+        if game['round'] < game['maxRounds']:
+            game['gamePhase'] = 'round-end'
+        else:
+            self._finish_by_health(game)
+    
+    def shoot(self, chat_id, user_id, target):
+        """Fire the current shell at 'self' or 'opponent'"""
+        game, error = self._player_action(chat_id, user_id)
+        if error:
+            return error
+        if target not in ('self', 'opponent'):
+            return {'error': 'Invalid target'}
+        
+        before = public_state(game)
+        
+        if game['currentShell'] >= len(game['shells']):
+            self._shells_exhausted(game)
+            return self._result(chat_id, before, action='shoot', shell=None, damage=0)
+        
+        shell = game['shells'][game['currentShell']]
+        damage = (2 if game['knifeBonusActive'] else 1) if shell == 'live' else 0
+        
+        current = game['players'][game['currentPlayer']]
+        opponent = game['players'][1 - game['currentPlayer']]
+        victim = current if target == 'self' else opponent
+        
+        if damage > 0:
+            victim['health'] = max(0, victim['health'] - damage)
+            game['lastAction'] = f"{victim['name']} took {damage} damage ({shell})"
+        else:
+            game['lastAction'] = f"{shell} shell - no damage"
+        
+        # Move to next shell
+        game['currentShell'] += 1
+        game['knifeBonusActive'] = False
+        
+        if victim['health'] <= 0:
+            game['gamePhase'] = 'finished'
+            game['winner'] = next((p for p in game['players'] if p['health'] > 0), None)
+        elif game['currentShell'] >= len(game['shells']):
+            self._shells_exhausted(game)
+        elif target == 'opponent' or shell == 'live':
+            # Switch turns (shooting yourself with a blank keeps the turn);
+            # a handcuffed opponent skips once instead
+            if opponent['isHandcuffed']:
+                opponent['isHandcuffed'] = False
+            else:
+                game['currentPlayer'] = 1 - game['currentPlayer']
+        
+        return self._result(chat_id, before, action='shoot', shell=shell, damage=damage)
+    
+    def use_bonus(self, chat_id, user_id, index):
+        """Use one of the current player's bonuses by index"""
+        game, error = self._player_action(chat_id, user_id)
+        if error:
+            return error
+        
+        player = game['players'][game['currentPlayer']]
+        if not isinstance(index, int) or not 0 <= index < len(player['bonuses']):
+            return {'error': 'Invalid bonus'}
+        bonus = player['bonuses'][index]
+        if bonus['used']:
+            return {'error': 'Bonus already used'}
+        
+        before = public_state(game)
+        info = {'action': 'bonus', 'bonus': bonus['type']}
+        has_shell = game['currentShell'] < len(game['shells'])
+        
+        if bonus['type'] == 'magnifying':
+            # Only the player who used the glass learns the shell
+            info['revealed'] = game['shells'][game['currentShell']] if has_shell else None
+        elif bonus['type'] == 'beer':
+            if has_shell:
+                ejected = game['shells'][game['currentShell']]
+                game['currentShell'] += 1
+                game['lastAction'] = f"Ejected {ejected} shell"
+                info['ejected'] = ejected
+                if game['currentShell'] >= len(game['shells']):
+                    # Nothing left to shoot: end the round (or the game) here
+                    self._shells_exhausted(game)
+        elif bonus['type'] == 'handcuffs':
+            opponent = game['players'][1 - game['currentPlayer']]
+            opponent['isHandcuffed'] = True
+            game['lastAction'] = f"{opponent['name']} handcuffed"
+        elif bonus['type'] == 'cigarettes':
+            if player['health'] < 3:
+                player['health'] += 1
+                game['lastAction'] = f"{player['name']} healed 1 HP"
+                info['healed'] = 1
+        elif bonus['type'] == 'knife':
+            game['knifeBonusActive'] = True
+            game['lastAction'] = f"{player['name']} sharpened the knife"
+        
+        bonus['used'] = True
+        return self._result(chat_id, before, **info)
+    
+    def next_round(self, chat_id, user_id):
+        """Start the next round after 'round-end' (either player may call it)"""
+        game = self.games.get(chat_id)
+        if game is None:
+            return {'error': 'Game not found'}
+        if str(user_id) not in (p['id'] for p in game['players']):
+            return {'error': 'Not authorized'}
+        if game['gamePhase'] != 'round-end':
+            return {'error': 'Round is not over'}
+        
+        before = public_state(game)
+        game['round'] += 1
+        game['shells'] = generate_shells(game['round'])
+        game['currentShell'] = 0
+        game['gamePhase'] = 'playing'
+        game['knifeBonusActive'] = False
+        game['lastAction'] = f"Round {game['round']} начался!"
+        
+        # Reset handcuffs and give new bonuses
+        for player in game['players']:
+            player['isHandcuffed'] = False
+            player['bonuses'] = generate_bonuses(game['round'])
+        
+        return self._result(chat_id, before, action='next_round')
     
     def end_game(self, chat_id, winner_id=None):
         """End game and clean up"""
@@ -197,11 +476,72 @@ class BuckshotGameManager:
             game['gamePhase'] = 'finished'
             if winner_id:
                 game['winner'] = winner_id
+            self._touch(chat_id)
             return True
         return False
 
 # Initialize game manager
 game_manager = BuckshotGameManager()
+session_ids = SessionIdAllocator(worker_id=int(os.environ.get("SESSION_ID_WORKER", 2)))
+
+# Every balance change is a ledger entry; one writer thread commits them in batches
+ledger = BalanceLedger(max_batch=int(os.environ.get("LEDGER_MAX_BATCH", 256)))
+
+# Closed/finished sessions older than ARCHIVE_AFTER_MINUTES are moved to
+# buckshot_sessions_history every ARCHIVE_INTERVAL seconds (0 disables)
+archiver = SessionArchiver(
+    BuckshotSession.__table__,
+    BuckshotSessionHistory.__table__,
+    after_minutes=int(os.environ.get("ARCHIVE_AFTER_MINUTES", 60)),
+    batch_size=int(os.environ.get("ARCHIVE_BATCH", 500)),
+    interval=int(os.environ.get("ARCHIVE_INTERVAL", 300))
+)
+
+@app.before_request
+def start_archiver():
+    archiver.ensure_running()
+
+def ledger_pending_response():
+    """Reply for a balance change that has not committed yet; retrying it is safe"""
+    return jsonify({'error': 'Balance update pending, please retry', 'pending': True}), 503
+
+def get_or_create_user(user_id, username=None):
+    """Load a user, opening an account with the starting balance on first sight"""
+    user = User.query.get(user_id)
+    if not user:
+        ledger.open_account(user_id, username, to_minor(1000.0))
+        user = User.query.get(user_id)
+    return user
+
+# Server-Sent Events: seconds between keep-alive comments and before a
+# stream is recycled (EventSource reconnects on its own)
+SSE_KEEPALIVE = int(os.environ.get("SSE_KEEPALIVE", 15))
+SSE_MAX_SECONDS = int(os.environ.get("SSE_MAX_SECONDS", 300))
+
+def game_event_stream(chat_id):
+    """Yield the full game state once, then only the top-level keys that change"""
+    deadline = time.monotonic() + SSE_MAX_SECONDS
+    feed_version = game_manager.changes.version(chat_id)
+    sent_version = None
+    sent_state = None
+    yield "retry: 1000\n\n"
+    while time.monotonic() < deadline:
+        game = game_manager.get_game(chat_id)
+        if game is None:
+            yield "event: closed\ndata: {}\n\n"
+            return
+        version = game_manager.versions.get(chat_id)
+        if version != sent_version:
+            state = public_state(game)
+            if sent_state is None:
+                yield f"event: state\nid: {version}\ndata: {json.dumps(state)}\n\n"
+            else:
+                diff = {key: value for key, value in state.items() if sent_state.get(key) != value}
+                yield f"event: diff\nid: {version}\ndata: {json.dumps(diff)}\n\n"
+            sent_version, sent_state = version, state
+        else:
+            yield ": keep-alive\n\n"
+        feed_version = game_manager.changes.wait(chat_id, feed_version, timeout=SSE_KEEPALIVE)
 
 # API Routes
 @app.route('/api/sessions', methods=['POST'])
@@ -215,9 +555,13 @@ def create_session():
         chat_id = data.get('chat_id')
         stake = data.get('stake')
         
-        if not all([user_id, username, chat_id]):
+        if not all([user_id, username]):
             return jsonify({'error': 'Missing required data'}), 400
         
+        # Inline games reuse the Telegram chat id; otherwise the API issues one
+        if not chat_id:
+            chat_id = session_ids.next_id()
+        
         # Check if session already exists for this chat
         existing_session = BuckshotSession.query.filter_by(chat_id=chat_id).first()
         if existing_session:
@@ -225,7 +569,7 @@ def create_session():
                 return jsonify({
                     'success': True,
                     'session': existing_session.to_dict(),
-                    'game': game_manager.get_game(chat_id) or game_manager.create_game(chat_id, user_id, username, mode=game_mode)
+                    'game': public_state(game_manager.get_game(chat_id) or game_manager.create_game(chat_id, user_id, username, mode=game_mode))
                 })
             elif existing_session.status not in ['closed', 'finished']:
                 return jsonify({'error': 'Session already exists for this chat'}), 400
@@ -235,11 +579,7 @@ def create_session():
         
         # Check user balance for test mode
         if game_mode == 'test':
-            user = User.query.get(user_id)
-            if not user:
-                user = User(user_id=user_id, username=username, balance=1000.0)
-                db.session.add(user)
-                db.session.commit()
+            user = get_or_create_user(user_id, username)
             
             if stake is None:
                 stake = 10.0
@@ -278,9 +618,11 @@ def create_session():
         return jsonify({
             'success': True,
             'session': session.to_dict(),
-            'game': game
+            'game': public_state(game)
         })
         
+    except LedgerPending:
+        return ledger_pending_response()
     except Exception as e:
         logger.error(f"Error creating session: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -302,15 +644,19 @@ def join_session(chat_id):
             return jsonify({'error': 'Session not found'}), 404
         
         if not session.can_join(user_id):
+            game = game_manager.get_game(chat_id)
+            if session.player2_id == user_id and game:
+                # Already joined (a retried request): return the current game
+                return jsonify({
+                    'success': True,
+                    'session': session.to_dict(),
+                    'game': public_state(game)
+                })
             return jsonify({'error': 'Cannot join this session'}), 400
         
         # Check user balance for test mode
         if session.game_mode == 'test':
-            user = User.query.get(user_id)
-            if not user:
-                user = User(user_id=user_id, username=username, balance=1000.0)
-                db.session.add(user)
-                db.session.commit()
+            user = get_or_create_user(user_id, username)
             
             if user.balance < session.stake:
                 return jsonify({'error': f'Insufficient balance: {user.balance}, required: {session.stake}'}), 400
@@ -329,9 +675,11 @@ def join_session(chat_id):
         return jsonify({
             'success': True,
             'session': session.to_dict(),
-            'game': game
+            'game': public_state(game)
         })
         
+    except LedgerPending:
+        return ledger_pending_response()
     except Exception as e:
         logger.error(f"Error joining session: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -349,13 +697,24 @@ def get_session(chat_id):
         return jsonify({
             'success': True,
             'session': session.to_dict(),
-            'game': game
+            'game': public_state(game) if game else None
         })
         
     except Exception as e:
         logger.error(f"Error getting session: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/game/<int:chat_id>/events')
+def game_events(chat_id):
+    """Stream game state changes to the players (Server-Sent Events)"""
+    if game_manager.get_game(chat_id) is None:
+        return jsonify({'error': 'Game not found'}), 404
+    
+    return Response(game_event_stream(chat_id), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Disable proxy buffering (nginx)
+    })
+
 @app.route('/api/sessions/<int:chat_id>/close', methods=['POST'])
 def close_session(chat_id):
     """Close session"""
@@ -377,50 +736,80 @@ def close_session(chat_id):
         logger.error(f"Error closing session: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
-@app.route('/api/game/<int:chat_id>/update', methods=['POST'])
-def update_game(chat_id):
-    """Update game state"""
+def finish_session(chat_id, game):
+    """Record the result of a finished game on its session"""
+    session = BuckshotSession.query.filter_by(chat_id=chat_id).first()
+    if not session:
+        return
+    winner = game.get('winner')
+    if winner:
+        session.winner_id = int(winner['id'])
+    session.status = 'finished'
+    session.finished_at = datetime.utcnow()
+    db.session.commit()
+
+def game_action_response(chat_id, result):
+    """JSON response for an engine action; settles the session when the game ends"""
+    if 'error' in result:
+        status = 404 if result['error'] == 'Game not found' else 400
+        return jsonify(result), status
+    if result['delta'].get('gamePhase') == 'finished':
+        finish_session(chat_id, game_manager.get_game(chat_id))
+    return jsonify(result)
+
+@app.route('/api/game/<int:chat_id>/shoot', methods=['POST'])
+def shoot(chat_id):
+    """Shoot yourself or the opponent with the current shell"""
     try:
-        data = request.json
-        game_data = data.get('game')
+        data = request.json or {}
         user_id = data.get('user_id')
+        if not user_id:
+            return jsonify({'error': 'Missing user_id'}), 400
         
-        if not game_data or not user_id:
-            return jsonify({'error': 'Missing game data or user_id'}), 400
+        result = game_manager.shoot(chat_id, user_id, data.get('target'))
+        return game_action_response(chat_id, result)
         
-        # Verify user is part of the game
-        session = BuckshotSession.query.filter_by(chat_id=chat_id).first()
-        if not session:
-            return jsonify({'error': 'Session not found'}), 404
-        
-        if str(session.creator_id) != str(user_id) and str(session.player2_id) != str(user_id):
-            return jsonify({'error': 'Not authorized'}), 403
+    except Exception as e:
+        logger.error(f"Error shooting in game {chat_id}: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/game/<int:chat_id>/bonus', methods=['POST'])
+def use_bonus(chat_id):
+    """Use a bonus of the current player by index"""
+    try:
+        data = request.json or {}
+        user_id = data.get('user_id')
+        if not user_id:
+            return jsonify({'error': 'Missing user_id'}), 400
         
-        # Update game state
-        success = game_manager.update_game(chat_id, game_data)
-        if not success:
-            return jsonify({'error': 'Game not found'}), 404
+        result = game_manager.use_bonus(chat_id, user_id, data.get('index'))
+        return game_action_response(chat_id, result)
         
-        # Update session if game is finished
-        if game_data.get('gamePhase') == 'finished':
-            winner = game_data.get('winner')
-            if winner:
-                session.winner_id = winner.get('id')
-            session.status = 'finished'
-            session.finished_at = datetime.utcnow()
-            db.session.commit()
+    except Exception as e:
+        logger.error(f"Error using bonus in game {chat_id}: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/game/<int:chat_id>/next-round', methods=['POST'])
+def next_round(chat_id):
+    """Start the next round once the shells of the current one are spent"""
+    try:
+        data = request.json or {}
+        user_id = data.get('user_id')
+        if not user_id:
+            return jsonify({'error': 'Missing user_id'}), 400
         
-        return jsonify({'success': True})
+        result = game_manager.next_round(chat_id, user_id)
+        return game_action_response(chat_id, result)
         
     except Exception as e:
-        logger.error(f"Error updating game: {e}")
+        logger.error(f"Error starting next round in game {chat_id}: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/sessions')
 def list_sessions():
     """List all active sessions"""
     try:
-        sessions = BuckshotSession.query.filter_by(status='waiting').all()
+        sessions = BuckshotSession.waiting().all()
         return jsonify({
             'success': True,
             'sessions': [session.to_dict() for session in sessions]
@@ -459,13 +848,15 @@ def update_user_balance(user_id):
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        user.balance = float(new_balance)
-        db.session.commit()
+        ledger.set_balance(user_id, to_minor(new_balance))
+        db.session.refresh(user)
         
         return jsonify({
             'success': True,
             'balance': user.balance
         })
+    except LedgerPending:
+        return ledger_pending_response()
     except Exception as e:
         logger.error(f"Error updating user balance: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -474,6 +865,12 @@ def update_user_balance(user_id):
 def init_db():
     with app.app_context():
         db.create_all()
+        # create_all skips tables that exist; add indexes introduced since
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+        ledger.bind(db.engine)
+        archiver.bind(db.engine)
         logger.info("Database initialized")
 
 if __name__ == '__main__':
@@ -0,0 +1,44 @@
+import threading
+import time
+
+# 2024-01-01T00:00:00Z, start of the id timestamp
+EPOCH_MS = 1704067200000
+
+TIMESTAMP_BITS = 40  # ~34 years of milliseconds
+WORKER_BITS = 4      # up to 16 processes/APIs issuing ids
+SEQUENCE_BITS = 8    # up to 256 ids per millisecond in one process
+
+# Flag bit 52: ids >= 2**52 never clash with Telegram chat ids (at most 52
+# significant bits), and the whole id stays below 2**53, exact in JavaScript
+ALLOCATED_FLAG = 1 << (TIMESTAMP_BITS + WORKER_BITS + SEQUENCE_BITS)
+
+class SessionIdAllocator:
+    """Snowflake-style monotonic session ids, unique without retries"""
+    __slots__ = ('worker_id', '_lock', '_last_ms', '_sequence')
+
+    def __init__(self, worker_id=0):
+        if not 0 <= worker_id < (1 << WORKER_BITS):
+            raise ValueError(f"worker_id must be in [0, {(1 << WORKER_BITS) - 1}]")
+        self.worker_id = worker_id
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def next_id(self):
+        """Issue the next id; strictly increasing within the process"""
+        with self._lock:
+            now = int(time.time() * 1000) - EPOCH_MS
+            if now <= self._last_ms:
+                # Same millisecond (or clock moved back): continue the sequence,
+                # borrowing the next millisecond when it wraps instead of waiting
+                now = self._last_ms
+                self._sequence = (self._sequence + 1) & ((1 << SEQUENCE_BITS) - 1)
+                if self._sequence == 0:
+                    now += 1
+            else:
+                self._sequence = 0
+            self._last_ms = now
+            return (ALLOCATED_FLAG
+                    | (now << (WORKER_BITS + SEQUENCE_BITS))
+                    | (self.worker_id << SEQUENCE_BITS)
+                    | self._sequence)
@@ -23,7 +23,10 @@ interface Bonus {
 interface GameState {
   players: [Player, Player];
   currentPlayer: 0 | 1;
-  shells: ('live' | 'blank')[];
+  // The server never sends the shell order, only what is left and what was spent
+  liveRemaining: number;
+  blankRemaining: number;
+  spentShells: ('live' | 'blank')[];
   currentShell: number;
   gamePhase: 'waiting' | 'playing' | 'round-end' | 'finished';
   winner: Player | null;
@@ -142,11 +145,15 @@ const MultiplayerBuckshot: React.FC = () => {
     }
   }, [gameState, currentUserId]);
 
-  // Poll for game updates
+  // Live game updates: Server-Sent Events, polling as a fallback
+  const hasGame = gameState !== null;
   useEffect(() => {
-    if (!chatId || !gameState) return;
+    if (!chatId || !hasGame) return;
 
-    const pollInterval = setInterval(async () => {
+    let events: EventSource | null = null;
+    let pollInterval: ReturnType<typeof setInterval> | null = null;
+
+    const poll = async () => {
       try {
         const response = await fetch(`${API_BASE_URL}/api/sessions/${chatId}`, {
           headers: {
@@ -163,94 +170,133 @@ const MultiplayerBuckshot: React.FC = () => {
       } catch (err) {
         console.error('Failed to poll game state:', err);
       }
-    }, 2000);
+    };
+
+    const startPolling = () => {
+      if (!pollInterval) {
+        pollInterval = setInterval(poll, 2000);
+      }
+    };
+
+    if ('EventSource' in window) {
+      events = new EventSource(`${API_BASE_URL}/api/game/${chatId}/events`);
+      events.addEventListener('state', (event) => {
+        setGameState(JSON.parse((event as MessageEvent).data));
+      });
+      events.addEventListener('diff', (event) => {
+        const diff: Partial<GameState> = JSON.parse((event as MessageEvent).data);
+        setGameState(prev => (prev ? { ...prev, ...diff } : prev));
+      });
+      events.addEventListener('closed', () => {
+        events?.close();
+        events = null;
+      });
+      events.onerror = () => {
+        // EventSource reconnects by itself; fall back to polling only if it gave up
+        if (events && events.readyState === EventSource.CLOSED) {
+          events = null;
+          startPolling();
+        }
+      };
+    } else {
+      startPolling();
+    }
 
-    return () => clearInterval(pollInterval);
-  }, [chatId, gameState]);
+    return () => {
+      events?.close();
+      if (pollInterval) clearInterval(pollInterval);
+    };
+  }, [chatId, hasGame]);
 
-  // Update game state on server
-  const updateGameState = useCallback(async (newGameState: GameState) => {
-    if (!chatId || !currentUserId) return;
+  // Send an action to the server; it applies the rules and returns a delta
+  const sendAction = useCallback(async (action: string, payload: Record<string, unknown> = {}) => {
+    if (!chatId || !currentUserId) return null;
 
     try {
-      const response = await fetch(`${API_BASE_URL}/api/game/${chatId}/update`, {
+      const response = await fetch(`${API_BASE_URL}/api/game/${chatId}/${action}`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
           'bypass-tunnel-reminder': 'true'
         },
-        body: JSON.stringify({
-          game: newGameState,
-          user_id: currentUserId
-        })
+        body: JSON.stringify({ user_id: currentUserId, ...payload })
       });
+      const data = await response.json();
 
-      if (!response.ok) {
-        console.error('Failed to update game state');
+      if (!response.ok || !data.success) {
+        console.error('Action rejected:', data.error);
+        return null;
       }
+
+      setGameState(prev => (prev ? { ...prev, ...data.delta } : prev));
+      return data;
     } catch (err) {
-      console.error('Error updating game state:', err);
+      console.error('Error sending action:', err);
+      return null;
     }
   }, [chatId, currentUserId]);
 
+  // Announce the end of a round and ask the server for the next one
+  const handleRoundEnd = useCallback((delta: Partial<GameState>) => {
+    if (delta.gamePhase !== 'round-end' || !gameState) return;
+
+    toast({
+      title: "Round Complete!",
+      description: `Round ${gameState.round} finished. Starting Round ${gameState.round + 1}...`,
+    });
+
+    setTimeout(() => {
+      sendAction('next-round');
+    }, 2000);
+  }, [gameState, toast, sendAction]);
+
   // Use bonus
-  const useBonus = useCallback((bonusIndex: number) => {
+  const useBonus = useCallback(async (bonusIndex: number) => {
     if (!gameState || !isMyTurn) return;
 
     const currentPlayer = gameState.players[gameState.currentPlayer];
-    const bonus = currentPlayer.bonuses[bonusIndex];
-    
-    if (bonus.used) return;
-    
-    const newGameState = { ...gameState };
-    const player = newGameState.players[newGameState.currentPlayer];
-    
-    switch (bonus.type) {
+    if (currentPlayer.bonuses[bonusIndex].used) return;
+
+    const data = await sendAction('bonus', { index: bonusIndex });
+    if (!data) return;
+
+    switch (data.bonus) {
       case 'magnifying':
-        const shellType = newGameState.shells[newGameState.currentShell];
-        toast({
-          title: "Shell Revealed",
-          description: `Current shell is: ${shellType.toUpperCase()}`,
-          variant: shellType === 'live' ? 'destructive' : 'default'
-        });
+        if (data.revealed) {
+          toast({
+            title: "Shell Revealed",
+            description: `Current shell is: ${data.revealed.toUpperCase()}`,
+            variant: data.revealed === 'live' ? 'destructive' : 'default'
+          });
+        }
         break;
-        
+
       case 'beer':
-        if (newGameState.currentShell < newGameState.shells.length) {
-          const ejectedShell = newGameState.shells[newGameState.currentShell];
-          newGameState.currentShell++;
-          newGameState.lastAction = `Ejected ${ejectedShell} shell`;
+        if (data.ejected) {
           toast({
             title: "Shell Ejected",
-            description: `Ejected a ${ejectedShell} shell`,
+            description: `Ejected a ${data.ejected} shell`,
           });
         }
         break;
-        
+
       case 'handcuffs':
-        const opponent = newGameState.players[1 - newGameState.currentPlayer];
-        opponent.isHandcuffed = true;
-        newGameState.lastAction = `${opponent.name} handcuffed`;
         toast({
           title: "Handcuffs Applied",
-          description: `${opponent.name} will skip their next turn`,
+          description: `${gameState.players[1 - gameState.currentPlayer].name} will skip their next turn`,
         });
         break;
-        
+
       case 'cigarettes':
-        if (player.health < 3) {
-          player.health++;
-          newGameState.lastAction = `${player.name} healed 1 HP`;
+        if (data.healed) {
           toast({
             title: "Health Restored",
-            description: `${player.name} gained 1 health`,
+            description: `${currentPlayer.name} gained 1 health`,
           });
         }
         break;
-        
+
       case 'knife':
-        newGameState.knifeBonusActive = true;
-        newGameState.lastAction = `${player.name} sharpened the knife`;
         toast({
           title: "Knife Ready",
           description: "Next shot will deal double damage",
@@ -258,173 +304,20 @@ const MultiplayerBuckshot: React.FC = () => {
         });
         break;
     }
-    
-    player.bonuses[bonusIndex].used = true;
-    setGameState(newGameState);
-    updateGameState(newGameState);
-  }, [gameState, isMyTurn, toast, updateGameState]);
-
-  // Generate new shells for next round
-  const generateNewShells = useCallback(() => {
-    if (!gameState) return [];
-    
-    const baseShellCount = 3 + gameState.round;
-    const shellCount = Math.floor(Math.random() * 4) + baseShellCount;
-    const liveCount = Math.floor(Math.random() * (shellCount - 1)) + 1;
-    const blankCount = shellCount - liveCount;
-    
-    const shells: ('live' | 'blank')[] = [
-      ...Array(liveCount).fill('live'),
-      ...Array(blankCount).fill('blank')
-    ];
-    
-    // Shuffle shells
-    for (let i = shells.length - 1; i > 0; i--) {
-      const j = Math.floor(Math.random() * (i + 1));
-      [shells[i], shells[j]] = [shells[j], shells[i]];
-    }
-    
-    return shells;
-  }, [gameState]);
-
-  // Generate new bonuses for players
-  const generateNewBonuses = useCallback(() => {
-    if (!gameState) return [];
-    
-    const bonusTypes = ['magnifying', 'beer', 'handcuffs', 'cigarettes', 'knife'] as const;
-    const bonusCount = Math.min(Math.floor(Math.random() * 2) + 2 + Math.floor(gameState.round / 2), 5);
-    const bonuses: Bonus[] = [];
-    
-    for (let i = 0; i < bonusCount; i++) {
-      const randomType = bonusTypes[Math.floor(Math.random() * bonusTypes.length)];
-      bonuses.push({ type: randomType, used: false });
-    }
-    
-    return bonuses;
-  }, [gameState]);
-
-  // Start new round
-  const startNewRound = useCallback(() => {
-    if (!gameState) return;
-
-    const newGameState = { ...gameState };
-    newGameState.round++;
-    newGameState.shells = generateNewShells();
-    newGameState.currentShell = 0;
-    newGameState.gamePhase = 'playing';
-    newGameState.knifeBonusActive = false;
-    newGameState.lastAction = `Round ${newGameState.round} начался!`;
-    
-    // Reset handcuffs and give new bonuses
-    newGameState.players.forEach(player => {
-      player.isHandcuffed = false;
-      player.bonuses = generateNewBonuses();
-    });
-    
-    setGameState(newGameState);
-    updateGameState(newGameState);
-  }, [gameState, generateNewShells, generateNewBonuses, updateGameState]);
+  }, [gameState, isMyTurn, toast, sendAction]);
 
   // Shoot action
-  const shoot = useCallback((target: 'self' | 'opponent') => {
+  const shoot = useCallback(async (target: 'self' | 'opponent') => {
     if (!gameState || !isMyTurn) return;
 
-    if (gameState.currentShell >= gameState.shells.length) {
-      // No more shells - start new round if game isn't finished
-      if (gameState.round < gameState.maxRounds) {
-        const newGameState = { ...gameState, gamePhase: 'round-end' };
-        setGameState(newGameState);
-        updateGameState(newGameState);
-        
-        toast({
-          title: "Round Complete!",
-          description: `Round ${gameState.round} finished. Starting Round ${gameState.round + 1}...`,
-        });
-        
-        setTimeout(() => {
-          startNewRound();
-        }, 2000);
-      } else {
-        // Game ends - determine winner by health
-        const winner = gameState.players.reduce((prev, current) => 
-          prev.health > current.health ? prev : current
-        );
-        const newGameState = { 
-          ...gameState, 
-          gamePhase: 'finished',
-          winner 
-        };
-        setGameState(newGameState);
-        updateGameState(newGameState);
-      }
-      return;
-    }
-    
-    const shellType = gameState.shells[gameState.currentShell];
-    const damage = shellType === 'live' ? (gameState.knifeBonusActive ? 2 : 1) : 0;
-    
-    const newGameState = { ...gameState };
-    const currentPlayer = newGameState.players[newGameState.currentPlayer];
-    const targetPlayer = target === 'self' ? currentPlayer : newGameState.players[1 - newGameState.currentPlayer];
-    
-    // Apply damage and trigger blood effect
-    if (damage > 0) {
-      targetPlayer.health = Math.max(0, targetPlayer.health - damage);
-      newGameState.lastAction = `${targetPlayer.name} took ${damage} damage (${shellType})`;
+    const data = await sendAction('shoot', { target });
+    if (!data) return;
+
+    if (data.damage > 0) {
       triggerBloodEffect();
-    } else {
-      newGameState.lastAction = `${shellType} shell - no damage`;
-    }
-    
-    // Move to next shell
-    newGameState.currentShell++;
-    newGameState.knifeBonusActive = false;
-    
-    // Check for winner
-    if (targetPlayer.health <= 0) {
-      newGameState.gamePhase = 'finished';
-      newGameState.winner = newGameState.players.find(p => p.health > 0) || null;
-      setGameState(newGameState);
-      updateGameState(newGameState);
-      return;
-    }
-    
-    // Check if shells are empty after this shot
-    if (newGameState.currentShell >= newGameState.shells.length) {
-      if (newGameState.round < newGameState.maxRounds) {
-        newGameState.gamePhase = 'round-end';
-        setGameState(newGameState);
-        updateGameState(newGameState);
-        return;
-      } else {
-        // Final round complete - determine winner by health
-        const winner = newGameState.players.reduce((prev, current) => 
-          prev.health > current.health ? prev : current
-        );
-        newGameState.gamePhase = 'finished';
-        newGameState.winner = winner;
-        setGameState(newGameState);
-        updateGameState(newGameState);
-        return;
-      }
-    }
-    
-    // Switch turns (unless shot self with blank, or target is handcuffed)
-    if (target === 'opponent' || shellType === 'live') {
-      const nextPlayer = 1 - newGameState.currentPlayer;
-      const nextPlayerObj = newGameState.players[nextPlayer];
-      
-      if (nextPlayerObj.isHandcuffed) {
-        nextPlayerObj.isHandcuffed = false;
-        // Stay with current player
-      } else {
-        newGameState.currentPlayer = nextPlayer as 0 | 1;
-      }
     }
-    
-    setGameState(newGameState);
-    updateGameState(newGameState);
-  }, [gameState, isMyTurn, toast, startNewRound, triggerBloodEffect, updateGameState]);
+    handleRoundEnd(data.delta);
+  }, [gameState, isMyTurn, sendAction, triggerBloodEffect, handleRoundEnd]);
 
   // Loading state
   if (loading) {
@@ -544,9 +437,8 @@ const MultiplayerBuckshot: React.FC = () => {
 
   const currentPlayer = gameState.players[gameState.currentPlayer];
   const opponent = gameState.players[1 - gameState.currentPlayer];
-  const remainingShells = gameState.shells.slice(gameState.currentShell);
-  const liveCount = remainingShells.filter(s => s === 'live').length;
-  const blankCount = remainingShells.filter(s => s === 'blank').length;
+  const liveCount = gameState.liveRemaining;
+  const blankCount = gameState.blankRemaining;
 
   return (
     <div 
@@ -672,7 +564,7 @@ const MultiplayerBuckshot: React.FC = () => {
             onClick={() => shoot('self')}
             variant="warning"
             className="py-6 md:py-8 text-base md:text-lg font-bold min-h-[80px] md:min-h-[90px]"
-            disabled={gameState.currentShell >= gameState.shells.length}
+            disabled={liveCount + blankCount === 0}
           >
             🔫 SHOOT SELF
           </Button>
@@ -680,7 +572,7 @@ const MultiplayerBuckshot: React.FC = () => {
             onClick={() => shoot('opponent')}
             variant="destructive"
             className="py-6 md:py-8 text-base md:text-lg font-bold min-h-[80px] md:min-h-[90px]"
-            disabled={gameState.currentShell >= gameState.shells.length}
+            disabled={liveCount + blankCount === 0}
           >
             🔫 SHOOT {opponent.name.toUpperCase()}
           </Button>
@@ -4,10 +4,10 @@ from aiohttp import web
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
 import config
+from fsm_storage import create_storage
 from handlers import router
 
 # Configure logging
@@ -36,7 +36,14 @@ def create_app() -> web.Application:
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
     
-    dp = Dispatcher(storage=MemoryStorage())
+    # FSM states survive restarts; "memory" restores the old behaviour
+    storage = create_storage(
+        config.FSM_STORAGE,
+        cache_ttl=config.FSM_CACHE_TTL,
+        flush_interval=config.FSM_FLUSH_INTERVAL,
+        state_ttl=config.FSM_STATE_TTL
+    )
+    dp = Dispatcher(storage=storage)
     dp.include_router(router)
     
     # Set startup and shutdown handlers
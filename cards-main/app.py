@@ -1,13 +1,17 @@
 
 import os
+import atexit
 import logging
-from flask import Flask, render_template, request, jsonify
+import threading
+from collections import OrderedDict
+from flask import Flask, Response, render_template, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from db import db, Base
 from werkzeug.middleware.proxy_fix import ProxyFix
 import random
 import json
-import requests
+import time
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -32,23 +36,179 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 db.init_app(app)
 
 # Import game logic
-from game_logic import GameManager, CARDS, SUITS, calculate_score
-
-game_manager = GameManager()
-
-game_manager = GameManager()
+from game_logic import GameManager, ShoePool, Table, CARDS, SUITS, calculate_score
+from session_ids import SessionIdAllocator
+from notifications import TelegramNotifier
+from ledger import BalanceLedger, LedgerError, LedgerPending, to_minor
+from archiver import SessionArchiver
+
+def json_default(o):
+    """Serialize tables through their public view (never the shoe)"""
+    if isinstance(o, Table):
+        return o.to_json()
+    return DefaultJSONProvider.default(o)
+
+class GameJSONProvider(DefaultJSONProvider):
+    default = staticmethod(json_default)
+
+app.json = GameJSONProvider(app)
+
+# Session IDs for games created outside a Telegram chat; each API process needs its own worker id
+session_ids = SessionIdAllocator(worker_id=int(os.environ.get("SESSION_ID_WORKER", 1)))
+
+game_manager = GameManager(ShoePool(
+    size=int(os.environ.get("SHOE_POOL_SIZE", 16)),
+    penetration=float(os.environ.get("SHOE_PENETRATION", 0.75))
+), game_ids=session_ids)
+
+# --- Game snapshot cache ---
+# Serialized /api/game responses per table, rebuilt only when the table
+# version changes. The per-process prefix keeps ETags from an earlier run
+# from matching after a restart. Finished games stay in the game manager
+# for the result screen and rematches, so the cache is also capped
+# (least recently polled tables go first).
+_ETAG_PREFIX = os.urandom(4).hex()
+SNAPSHOT_CACHE_SIZE = int(os.environ.get("SNAPSHOT_CACHE_SIZE", 2048))
+game_snapshots = OrderedDict()  # chat_id -> (version, etag, body)
+_snapshots_lock = threading.Lock()
+
+def forget_game_snapshot(chat_id):
+    with _snapshots_lock:
+        game_snapshots.pop(chat_id, None)
+
+def get_game_snapshot(chat_id, game):
+    """Return (etag, body) of the current game state, serializing at most once per version"""
+    with _snapshots_lock:
+        cached = game_snapshots.get(chat_id)
+        if cached and cached[0] == game.version:
+            game_snapshots.move_to_end(chat_id)
+            return cached[1], cached[2]
+    
+    version = game.version
+    snapshot = game.to_json()
+    body = app.json.dumps({
+        'success': True,
+        'game': snapshot,
+        'player1': snapshot['player1'],
+        'player2': snapshot['player2'],
+        'turn': snapshot['turn'],
+        'status': snapshot['status']
+    }).encode('utf-8')
+    etag = f"{_ETAG_PREFIX}-{version}"
+    with _snapshots_lock:
+        game_snapshots[chat_id] = (version, etag, body)
+        game_snapshots.move_to_end(chat_id)
+        while len(game_snapshots) > SNAPSHOT_CACHE_SIZE:
+            game_snapshots.popitem(last=False)
+    return etag, body
+
+# --- Server-Sent Events ---
+# Seconds between keep-alive comments and before a stream is recycled
+# (EventSource reconnects on its own, which frees the server thread)
+SSE_KEEPALIVE = int(os.environ.get("SSE_KEEPALIVE", 15))
+SSE_MAX_SECONDS = int(os.environ.get("SSE_MAX_SECONDS", 300))
+
+def game_event_stream(chat_id):
+    """Yield an SSE message with the game snapshot on every table change"""
+    deadline = time.monotonic() + SSE_MAX_SECONDS
+    feed_version = game_manager.changes.version(chat_id)
+    sent = None
+    # Ask the browser to wait a little before reconnecting
+    yield "retry: 1000\n\n"
+    while time.monotonic() < deadline:
+        game = game_manager.get_game(chat_id)
+        if game is None:
+            yield "event: closed\ndata: {}\n\n"
+            return
+        if game.version != sent:
+            etag, body = get_game_snapshot(chat_id, game)
+            sent = game.version
+            yield f"id: {etag}\ndata: {body.decode('utf-8')}\n\n"
+        else:
+            yield ": keep-alive\n\n"
+        feed_version = game_manager.changes.wait(chat_id, feed_version, timeout=SSE_KEEPALIVE)
 
 # --- Telegram notification helper ---
+# Messages are sent by background workers, so game moves never wait on the Bot API.
+# TELEGRAM_API_URL can point at fake_telegram.py for local testing.
 BOT_TOKEN = os.environ.get("BOT_TOKEN", "")
+notifier = TelegramNotifier(
+    BOT_TOKEN,
+    api_url=os.environ.get("TELEGRAM_API_URL", "https://api.telegram.org"),
+    workers=int(os.environ.get("NOTIFY_WORKERS", 2)),
+    rate=float(os.environ.get("NOTIFY_RATE", 25)),
+    max_pending=int(os.environ.get("NOTIFY_QUEUE_LIMIT", 10000)),
+    retries=int(os.environ.get("NOTIFY_RETRIES", 5))
+)
+atexit.register(notifier.close)
+
 def send_telegram_message(user_id, text):
-    if not BOT_TOKEN:
-        return
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    payload = {"chat_id": user_id, "text": text}
+    notifier.notify(user_id, text)
+
+def finish_game(result):
+    """Settle a finished game and tell both players how it ended"""
+    from settlement import settle_game
+    
+    game = result['game']
+    winner = result.get('winner_id')
+    # The cached snapshot is of the game still in play
+    forget_game_snapshot(game.chat_id)
     try:
-        requests.post(url, json=payload, timeout=3)
-    except Exception as e:
-        logger.warning(f"Failed to send Telegram message: {e}")
+        if not settle_game(ledger, game, winner):
+            return  # Already settled by an earlier request
+    except LedgerPending:
+        # Still queued: it commits on its own, a retried move is refused by the settlement key
+        logger.warning(f"Settlement of game {game.game_id} in chat {game.chat_id} is still pending")
+        return
+    
+    p1 = game.player1
+    p2 = game.player2
+    if p1 and p2:
+        if winner == p1.id:
+            send_telegram_message(p1.id, f"🏆 Ви виграли гру BlackJack! Ставка: {game.stake}")
+            send_telegram_message(p2.id, f"❌ Ви програли гру BlackJack. Ставка: {game.stake}")
+        elif winner == p2.id:
+            send_telegram_message(p2.id, f"🏆 Ви виграли гру BlackJack! Ставка: {game.stake}")
+            send_telegram_message(p1.id, f"❌ Ви програли гру BlackJack. Ставка: {game.stake}")
+        else:
+            send_telegram_message(p1.id, "🤝 Нічия у грі BlackJack!")
+            send_telegram_message(p2.id, "🤝 Нічия у грі BlackJack!")
+
+# --- Balances ---
+# Every balance change is a ledger entry; one writer thread commits them in batches
+ledger = BalanceLedger(max_batch=int(os.environ.get("LEDGER_MAX_BATCH", 256)))
+
+def ledger_pending_response():
+    """Reply for a balance change that has not committed yet; retrying it is safe"""
+    return jsonify({'error': 'Balance update pending, please retry', 'pending': True}), 503
+
+def get_or_create_user(user_id, username=None):
+    """Load a user, opening an account with the starting balance on first sight"""
+    from models import User
+    user = User.query.get(user_id)
+    if not user:
+        ledger.open_account(user_id, username, to_minor(1000.0))
+        user = User.query.get(user_id)
+    return user
+
+# --- Session archive ---
+# Closed/finished sessions older than ARCHIVE_AFTER_MINUTES are moved to
+# game_sessions_history every ARCHIVE_INTERVAL seconds (0 disables)
+def create_archiver():
+    from models import GameSession, GameSessionHistory
+    return SessionArchiver(
+        GameSession.__table__,
+        GameSessionHistory.__table__,
+        after_minutes=int(os.environ.get("ARCHIVE_AFTER_MINUTES", 60)),
+        batch_size=int(os.environ.get("ARCHIVE_BATCH", 500)),
+        interval=int(os.environ.get("ARCHIVE_INTERVAL", 300))
+    )
+
+archiver = create_archiver()
+
+@app.before_request
+def start_archiver():
+    archiver.ensure_running()
 
 # --- Rematch logic ---
 rematch_requests = {}
@@ -66,41 +226,35 @@ def accept_rematch(chat_id, user_id):
     game = game_manager.get_game(chat_id)
     if not game:
         return jsonify({'error': 'Game not found'}), 404
-    player1 = game['player1']['id']
-    player2 = game['player2']['id']
+    player1 = game.player1.id
+    player2 = game.player2.id
     if player1 in rematch_requests[chat_id] and player2 in rematch_requests[chat_id]:
         # Both players agreed - create new game
-        username1 = game['player1']['username']
-        username2 = game['player2']['username']
-        mode = game['player1']['mode']
-        stake = game['stake']
+        username1 = game.player1.username
+        username2 = game.player2.username
+        mode = game.player1.mode
+        stake = game.stake
         
-        # Deduct stakes from both players for test mode
+        # Deduct stakes from both players for test mode, once per finished game
+        # (a retried accept finds the entries and does not charge again)
         if mode == 'test':
-            from models import User
-            user1 = User.query.get(player1)
-            user2 = User.query.get(player2)
-            
-            if user1 and user1.balance >= stake:
-                user1.balance -= stake
-            else:
-                return jsonify({'error': 'Player 1 insufficient balance'}), 400
-                
-            if user2 and user2.balance >= stake:
-                user2.balance -= stake
-            else:
-                return jsonify({'error': 'Player 2 insufficient balance'}), 400
-                
-            db.session.commit()
+            try:
+                ledger.post([(player1, -to_minor(stake)), (player2, -to_minor(stake))], 'stake',
+                            ref=f"rematch:{game.game_id}")
+            except LedgerPending:
+                return ledger_pending_response()
+            except LedgerError as e:
+                player = 'Player 1' if e.user_id == player1 else 'Player 2'
+                return jsonify({'error': f'{player} insufficient balance'}), 400
         
         # Create new game with same stake
         new_game = game_manager.create_game(chat_id, player1, username1, mode=mode)
-        new_game['stake'] = stake  # Set the same stake
+        new_game.stake = stake  # Set the same stake
         join_result = game_manager.join_game(chat_id, player2, username2)
         
         rematch_requests.pop(chat_id, None)
         
-        if 'error' not in join_result:
+        if isinstance(join_result, Table):
             return jsonify({'success': True, 'rematch': True, 'message': 'Rematch started', 'game': join_result})
         else:
             return jsonify({'error': join_result['error']}), 400
@@ -134,20 +288,33 @@ def get_game(chat_id):
     try:
         game = game_manager.get_game(chat_id)
         if not game:
+            forget_game_snapshot(chat_id)
             return jsonify({'error': 'Game not found', 'message': 'Гра не знайдена'}), 404
         
-        return jsonify({
-            'success': True,
-            'game': game,
-            'player1': game['player1'],
-            'player2': game['player2'],
-            'turn': game['turn'],
-            'status': game['status']
-        })
+        etag, body = get_game_snapshot(chat_id, game)
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+        else:
+            response = app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        # Let clients keep the body but revalidate on every poll
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
         logger.error(f"Error getting game {chat_id}: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/game/<int:chat_id>/events')
+def game_events(chat_id):
+    """Push game state to the client (Server-Sent Events) whenever it changes"""
+    if not game_manager.get_game(chat_id):
+        return jsonify({'error': 'Game not found', 'message': 'Гра не знайдена'}), 404
+    
+    return Response(game_event_stream(chat_id), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Disable proxy buffering (nginx)
+    })
+
 @app.route('/api/split/<int:chat_id>/<int:user_id>', methods=['POST'])
 def split_hand(chat_id, user_id):
     """Split player's hand if possible"""
@@ -164,64 +331,13 @@ def split_hand(chat_id, user_id):
 def hit(chat_id, user_id):
     """Player hits (takes another card)"""
     try:
-        from models import User
         result = game_manager.hit(chat_id, user_id)
         if 'error' in result:
             return jsonify(result), 400
         
         # Update database if game finished
         if result.get('result') == 'finished' or result.get('result') == 'bust':
-            game = result['game']
-            # Close session in DB
-            from models import GameSession
-            session = GameSession.query.filter_by(chat_id=chat_id).first()
-            if session:
-                session.status = 'closed'
-                from datetime import datetime
-                session.finished_at = datetime.utcnow()
-                session.winner_id = result.get('winner_id')
-            
-            # Handle rewards for test mode
-            if game['player1']['mode'] == 'test':
-                stake = game['stake']
-                winner_id = result.get('winner_id')
-                
-                # Get both players
-                player1 = User.query.get(game['player1']['id'])
-                player2 = User.query.get(game['player2']['id'])
-                
-                if winner_id:
-                    # Winner gets both stakes
-                    winner = User.query.get(winner_id)
-                    if winner:
-                        winner.balance += stake * 2
-                        logger.info(f"Winner {winner_id} received {stake * 2} coins")
-                else:
-                    # Draw - return stakes to both players
-                    if player1:
-                        player1.balance += stake
-                    if player2:
-                        player2.balance += stake
-                    logger.info(f"Draw - returned {stake} coins to both players")
-                    
-            db.session.commit()
-            # --- Send Telegram notifications ---
-            try:
-                p1 = game['player1']
-                p2 = game['player2']
-                winner = result.get('winner_id')
-                if p1 and p2:
-                    if winner == p1['id']:
-                        send_telegram_message(p1['id'], f"🏆 Ви виграли гру BlackJack! Ставка: {game['stake']}")
-                        send_telegram_message(p2['id'], f"❌ Ви програли гру BlackJack. Ставка: {game['stake']}")
-                    elif winner == p2['id']:
-                        send_telegram_message(p2['id'], f"🏆 Ви виграли гру BlackJack! Ставка: {game['stake']}")
-                        send_telegram_message(p1['id'], f"❌ Ви програли гру BlackJack. Ставка: {game['stake']}")
-                    else:
-                        send_telegram_message(p1['id'], "🤝 Нічия у грі BlackJack!")
-                        send_telegram_message(p2['id'], "🤝 Нічия у грі BlackJack!")
-            except Exception as e:
-                logger.warning(f"Failed to send Telegram notifications: {e}")
+            finish_game(result)
         return jsonify(result)
     except Exception as e:
         logger.error(f"Error in hit for game {chat_id}, user {user_id}: {e}")
@@ -231,64 +347,13 @@ def hit(chat_id, user_id):
 def stand(chat_id, user_id):
     """Player stands (stops taking cards)"""
     try:
-        from models import User
         result = game_manager.stand(chat_id, user_id)
         if 'error' in result:
             return jsonify(result), 400
         
         # Update database if game finished
         if result.get('result') == 'finished':
-            game = result['game']
-            # Close session in DB
-            from models import GameSession
-            session = GameSession.query.filter_by(chat_id=chat_id).first()
-            if session:
-                session.status = 'closed'
-                from datetime import datetime
-                session.finished_at = datetime.utcnow()
-                session.winner_id = result.get('winner_id')
-            
-            # Handle rewards for test mode
-            if game['player1']['mode'] == 'test':
-                stake = game['stake']
-                winner_id = result.get('winner_id')
-                
-                # Get both players
-                player1 = User.query.get(game['player1']['id'])
-                player2 = User.query.get(game['player2']['id'])
-                
-                if winner_id:
-                    # Winner gets both stakes
-                    winner = User.query.get(winner_id)
-                    if winner:
-                        winner.balance += stake * 2
-                        logger.info(f"Winner {winner_id} received {stake * 2} coins")
-                else:
-                    # Draw - return stakes to both players
-                    if player1:
-                        player1.balance += stake
-                    if player2:
-                        player2.balance += stake
-                    logger.info(f"Draw - returned {stake} coins to both players")
-                    
-            db.session.commit()
-            # --- Send Telegram notifications ---
-            try:
-                p1 = game['player1']
-                p2 = game['player2']
-                winner = result.get('winner_id')
-                if p1 and p2:
-                    if winner == p1['id']:
-                        send_telegram_message(p1['id'], f"🏆 Ви виграли гру BlackJack! Ставка: {game['stake']}")
-                        send_telegram_message(p2['id'], f"❌ Ви програли гру BlackJack. Ставка: {game['stake']}")
-                    elif winner == p2['id']:
-                        send_telegram_message(p2['id'], f"🏆 Ви виграли гру BlackJack! Ставка: {game['stake']}")
-                        send_telegram_message(p1['id'], f"❌ Ви програли гру BlackJack. Ставка: {game['stake']}")
-                    else:
-                        send_telegram_message(p1['id'], "🤝 Нічия у грі BlackJack!")
-                        send_telegram_message(p2['id'], "🤝 Нічия у грі BlackJack!")
-            except Exception as e:
-                logger.warning(f"Failed to send Telegram notifications: {e}")
+            finish_game(result)
         return jsonify(result)
     except Exception as e:
         logger.error(f"Error in stand for game {chat_id}, user {user_id}: {e}")
@@ -324,23 +389,43 @@ def list_games():
         logger.error(f"Error listing games: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/shoe-pool')
+def shoe_pool_stats():
+    """Shoe pool metrics (pool size, hit rate, reshuffles)"""
+    try:
+        return jsonify({
+            'success': True,
+            'shoe_pool': game_manager.shoe_pool.stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting shoe pool stats: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/notifications')
+def notification_stats():
+    """Telegram notification queue metrics (queued, sent, retried, failed)"""
+    try:
+        return jsonify({
+            'success': True,
+            'notifications': notifier.stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting notification stats: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @app.route('/api/user/<int:user_id>/balance')
 def get_user_balance(user_id):
     """Get user balance"""
     try:
-        from models import User
-        user = User.query.get(user_id)
-        if not user:
-            # Create new user with default balance
-            user = User(user_id=user_id, balance=1000.0)
-            db.session.add(user)
-            db.session.commit()
+        user = get_or_create_user(user_id)
         
         return jsonify({
             'success': True,
             'balance': user.balance,
             'user_id': user.user_id
         })
+    except LedgerPending:
+        return ledger_pending_response()
     except Exception as e:
         logger.error(f"Error getting balance for user {user_id}: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -349,22 +434,19 @@ def get_user_balance(user_id):
 def update_user_balance(user_id):
     """Update user balance"""
     try:
-        from models import User
         data = request.json
         amount = data.get('amount', 0)
         
-        user = User.query.get(user_id)
-        if not user:
-            user = User(user_id=user_id, balance=1000.0)
-            db.session.add(user)
-        
-        user.balance += amount
-        db.session.commit()
+        user = get_or_create_user(user_id)
+        ledger.post([(user_id, to_minor(amount))], 'adjustment', require_funds=False)
+        db.session.refresh(user)
         
         return jsonify({
             'success': True,
             'new_balance': user.balance
         })
+    except LedgerPending:
+        return ledger_pending_response()
     except Exception as e:
         logger.error(f"Error updating balance for user {user_id}: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -389,7 +471,7 @@ def create_demo_game():
         demo_player2_username = 'ШІ Гравець'
         
         result = game_manager.join_game(chat_id, demo_player2_id, demo_player2_username)
-        if 'error' in result:
+        if not isinstance(result, Table):
             return jsonify(result), 400
         
         return jsonify({
@@ -405,7 +487,7 @@ def create_demo_game():
 def create_session():
     """Create new game session"""
     try:
-        from models import User, GameSession
+        from models import GameSession
         data = request.json
         user_id = data.get('user_id')
         username = data.get('username')
@@ -413,9 +495,13 @@ def create_session():
         chat_id = data.get('chat_id')
         stake = data.get('stake')
         
-        if not all([user_id, username, chat_id]):
+        if not all([user_id, username]):
             return jsonify({'error': 'Missing required data'}), 400
         
+        # Inline games reuse the Telegram chat id; otherwise the API issues one
+        if not chat_id:
+            chat_id = session_ids.next_id()
+        
         # Check if session already exists for this chat
         existing_session = GameSession.query.filter_by(chat_id=chat_id).first()
         if existing_session:
@@ -436,11 +522,7 @@ def create_session():
         
         # Check user balance for test mode
         if game_mode == 'test':
-            user = User.query.get(user_id)
-            if not user:
-                user = User(user_id=user_id, username=username, balance=1000.0)
-                db.session.add(user)
-                db.session.commit()
+            user = get_or_create_user(user_id, username)
             # Ставка за замовчуванням 10, або кастомна
             if stake is None:
                 stake = 10.0
@@ -481,6 +563,8 @@ def create_session():
             'game': game
         })
         
+    except LedgerPending:
+        return ledger_pending_response()
     except Exception as e:
         logger.error(f"Error creating session: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -489,7 +573,7 @@ def create_session():
 def join_session(chat_id):
     """Join existing game session"""
     try:
-        from models import User, GameSession
+        from models import GameSession
         import json
         
         data = request.json
@@ -505,8 +589,8 @@ def join_session(chat_id):
             return jsonify({'error': 'Session not found'}), 404
         
         if not session.can_join(user_id):
-            if session.creator_id == user_id:
-                # Creator trying to rejoin their own game - allow it
+            if user_id in (session.creator_id, session.player2_id):
+                # A player rejoining (or a retried join) gets the current game
                 game = game_manager.get_game(chat_id)
                 if game:
                     return jsonify({
@@ -523,21 +607,23 @@ def join_session(chat_id):
         
         # Check balance for test mode
         if session.game_mode == 'test':
-            user = User.query.get(user_id)
-            if not user:
-                user = User(user_id=user_id, username=username, balance=1000.0)
-                db.session.add(user)
-                db.session.commit()
-            
+            user = get_or_create_user(user_id, username)
             if user.balance < session.stake:
                 return jsonify({'error': f'Insufficient balance: {user.balance}, required: {session.stake}'}), 400
             
-            # Deduct stakes from both players
-            creator = User.query.get(session.creator_id)
-            if creator:
-                creator.balance -= session.stake
-            user.balance -= session.stake
-            db.session.commit()
+            # Deduct stakes from both players, once per game
+            game = game_manager.get_game(chat_id)
+            try:
+                ledger.post(
+                    [(session.creator_id, -to_minor(session.stake)), (user_id, -to_minor(session.stake))],
+                    'stake',
+                    ref=f"stake:{game.game_id}" if game else None
+                )
+            except LedgerPending:
+                return ledger_pending_response()
+            except LedgerError as e:
+                who = 'Session creator has' if e.user_id == session.creator_id else 'You have'
+                return jsonify({'error': f'{who} insufficient balance, required: {session.stake}'}), 400
         
         # Update session with second player
         session.player2_id = user_id
@@ -547,11 +633,11 @@ def join_session(chat_id):
         
         # Join game in memory
         result = game_manager.join_game(chat_id, user_id, username)
-        if 'error' in result:
+        if not isinstance(result, Table):
             return jsonify(result), 400
         
         # Save game state to database
-        session.game_data = json.dumps(result)
+        session.game_data = json.dumps(result, default=json_default)
         db.session.commit()
         
         return jsonify({
@@ -560,6 +646,8 @@ def join_session(chat_id):
             'game': result
         })
         
+    except LedgerPending:
+        return ledger_pending_response()
     except Exception as e:
         logger.error(f"Error joining session {chat_id}: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -591,6 +679,7 @@ def close_session(chat_id):
         
         # Remove game from memory
         game_manager.remove_game(chat_id)
+        forget_game_snapshot(chat_id)
         
         return jsonify({
             'success': True,
@@ -631,7 +720,7 @@ def list_sessions():
     try:
         from models import GameSession
         
-        sessions = GameSession.query.filter(GameSession.status.in_(['waiting', 'playing'])).all()
+        sessions = GameSession.active().all()
         
         return jsonify({
             'success': True,
@@ -648,8 +737,14 @@ def init_db():
     """Initialize database tables"""
     with app.app_context():
         # Import models here to avoid circular import
-        from models import User, GameSession
+        from models import User, GameSession, GameSessionHistory, GameSettlement, LedgerEntry
         db.create_all()
+        # create_all skips tables that exist; add indexes introduced since
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+        ledger.bind(db.engine)
+        archiver.bind(db.engine)
         logger.info("Database tables created successfully")
 
 # Initialize database when app starts
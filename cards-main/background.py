@@ -0,0 +1,32 @@
+import threading
+
+class DaemonThreads:
+    """Daemon worker threads that are started on first use
+
+    Owners call ``ensure_running()`` whenever they hand work to the
+    threads instead of starting them at import: threads do not survive a
+    fork, so each forked server worker starts its own on its first request.
+    Threads that died are restarted by the next call.
+    """
+
+    def __init__(self, target, name, count=1):
+        self.target = target
+        self.name = name
+        self.count = count
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def alive(self):
+        """Number of threads currently running"""
+        return sum(thread.is_alive() for thread in self._threads)
+
+    def ensure_running(self):
+        if len(self._threads) == self.count and all(thread.is_alive() for thread in self._threads):
+            return
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.count:
+                name = self.name if self.count == 1 else f"{self.name}-{len(self._threads)}"
+                thread = threading.Thread(target=self.target, name=name, daemon=True)
+                thread.start()
+                self._threads.append(thread)
@@ -0,0 +1,103 @@
+"""Benchmark: per-request read-modify-write commits vs the batched balance ledger.
+
+Many threads move stakes between a small set of users on a fresh SQLite
+file, once the way the routes used to (read the balance, change it in
+Python, commit) and once through BalanceLedger. Reports operations per
+second and whether the final balances add up (lost updates).
+
+Usage: python bench_ledger.py [--threads 32] [--ops 200] [--users 20]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+
+from db import db
+from ledger import BalanceLedger, LedgerError
+import models  # noqa: F401 - registers the tables on db.metadata
+
+START_MINOR = 100000
+
+def make_engine(path):
+    engine = create_engine(f"sqlite:///{path}", connect_args={'timeout': 30})
+    db.metadata.create_all(engine)
+    return engine
+
+def open_accounts(ledger, users):
+    for user_id in range(1, users + 1):
+        ledger.open_account(user_id, f"user{user_id}", START_MINOR)
+
+def run_threads(threads, ops, work):
+    errors = []
+    def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(ops):
+            try:
+                work(rng)
+            except Exception as e:
+                errors.append(e)
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return time.perf_counter() - start, errors
+
+def bench_read_modify_write(engine, threads, ops, users):
+    """Old pattern: SELECT balance, compute in Python, UPDATE, commit per operation"""
+    def work(rng):
+        a, b = rng.sample(range(1, users + 1), 2)
+        with engine.connect() as conn:
+            for user_id, amount in ((a, -100), (b, 100)):
+                balance = conn.execute(text("SELECT balance_minor FROM users WHERE user_id = :u"),
+                                       {'u': user_id}).scalar()
+                conn.execute(text("UPDATE users SET balance_minor = :b WHERE user_id = :u"),
+                             {'b': balance + amount, 'u': user_id})
+            conn.commit()
+    return run_threads(threads, ops, work)
+
+def bench_ledger(ledger, threads, ops, users):
+    def work(rng):
+        a, b = rng.sample(range(1, users + 1), 2)
+        ledger.post([(a, -100), (b, 100)], 'stake')
+    return run_threads(threads, ops, work)
+
+def total_balance(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT SUM(balance_minor) FROM users")).scalar()
+
+def main():
+    parser = argparse.ArgumentParser(description='Balance ledger group-commit benchmark')
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--ops', type=int, default=200, help='operations per thread')
+    parser.add_argument('--users', type=int, default=20)
+    args = parser.parse_args()
+    total_ops = args.threads * args.ops
+    expected = args.users * START_MINOR
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, 'rmw.db'))
+        open_accounts(BalanceLedger(engine), args.users)
+        elapsed, errors = bench_read_modify_write(engine, args.threads, args.ops, args.users)
+        drift = total_balance(engine) - expected
+        print(f"read-modify-write: {total_ops / elapsed:10,.0f} ops/s  "
+              f"errors {len(errors)}  balance drift {drift} (lost updates)")
+
+        engine = make_engine(os.path.join(tmp, 'ledger.db'))
+        ledger = BalanceLedger(engine)
+        open_accounts(ledger, args.users)
+        elapsed, errors = bench_ledger(ledger, args.threads, args.ops, args.users)
+        refused = sum(isinstance(e, LedgerError) for e in errors)
+        drift = total_balance(engine) - expected
+        stats = ledger.stats()
+        print(f"ledger:            {total_ops / elapsed:10,.0f} ops/s  "
+              f"errors {len(errors) - refused}  refused {refused}  balance drift {drift}  "
+              f"avg batch {stats['avg_batch']}  unreconciled {len(ledger.reconcile())}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Micro-benchmark: full re-scoring vs incremental hand scoring.
+
+Deals simulated hands from real shoes and scores them after every card,
+once with calculate_score() over the whole hand (the old hit() path) and
+once with the running state kept by add_card().
+
+Usage: python bench_scoring.py [--hands 2000000] [--max-cards 6]
+"""
+import argparse
+import random
+import time
+
+from game_logic import Hand, Shoe, add_card, calculate_score
+
+def deal_hands(count, max_cards):
+    """Pre-deal hands so that dealing is not part of the measurement"""
+    hands = []
+    shoe = Shoe()
+    for _ in range(count):
+        size = random.randint(2, max_cards)
+        if len(shoe) < size:
+            shoe = Shoe()
+        hands.append([shoe.pop() for _ in range(size)])
+    return hands
+
+def bench_full(hands):
+    start = time.perf_counter()
+    for cards in hands:
+        held = []
+        for card in cards:
+            held.append(card)
+            calculate_score(held)
+    return time.perf_counter() - start
+
+def bench_incremental(hands):
+    start = time.perf_counter()
+    for cards in hands:
+        hand = Hand()
+        for card in cards:
+            add_card(hand, card)
+    return time.perf_counter() - start
+
+def check(hands):
+    for cards in hands:
+        hand = Hand()
+        for i, card in enumerate(cards, 1):
+            assert add_card(hand, card) == calculate_score(cards[:i]), cards[:i]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hands', type=int, default=2_000_000)
+    parser.add_argument('--max-cards', type=int, default=6)
+    args = parser.parse_args()
+
+    hands = deal_hands(args.hands, args.max_cards)
+    check(hands[:100_000])
+    cards = sum(len(h) for h in hands)
+
+    full = bench_full(hands)
+    incremental = bench_incremental(hands)
+
+    print(f"hands: {len(hands):,}  cards dealt: {cards:,}")
+    print(f"calculate_score (full):  {full:.3f}s  {cards / full / 1e6:.2f}M cards/s")
+    print(f"add_card (incremental):  {incremental:.3f}s  {cards / incremental / 1e6:.2f}M cards/s")
+    print(f"speedup: {full / incremental:.2f}x")
+
+if __name__ == '__main__':
+    main()
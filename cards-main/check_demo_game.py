@@ -0,0 +1,70 @@
+"""Regression check: demo games settle without an account for the demo opponent.
+
+Plays demo games (POST /api/create-demo-game, then both seats stand)
+against a throwaway SQLite database through the Flask test client.
+Exits with status 1 if a move fails, a finished game is not settled,
+or the ledger and the balances disagree.
+
+Usage: python check_demo_game.py [--games 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+def play(client, chat_id, user_id):
+    """Play one demo game to the end; returns a list of problems"""
+    response = client.post('/api/create-demo-game',
+                           json={'chat_id': chat_id, 'user_id': user_id, 'username': 'player'})
+    if response.status_code != 200:
+        return [f"create-demo-game returned {response.status_code}"]
+    game = response.get_json()['game']
+    problems = []
+    for seat in (user_id, user_id + 1):
+        if game['status'] == 'finished':
+            break
+        response = client.post(f'/api/stand/{chat_id}/{seat}')
+        if response.status_code != 200:
+            problems.append(f"stand by {seat} returned {response.status_code}")
+            break
+        game = response.get_json().get('game', game)
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description='Demo game settlement check')
+    parser.add_argument('--games', type=int, default=20, help='demo games to play')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The app reads DATABASE_URL and creates its tables at import time
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'demo.db')}"
+        os.environ.setdefault('ARCHIVE_INTERVAL', '0')
+        from app import app, db, ledger
+        from models import GameSettlement
+
+        problems = []
+        user_id = 1000
+        with app.app_context():
+            client = app.test_client()
+            # The demo player has an account, the demo opponent (user_id + 1) does not
+            client.get(f'/api/user/{user_id}/balance')
+            for i in range(args.games):
+                chat_id = (1 << 52) + i
+                for problem in play(client, chat_id, user_id):
+                    problems.append(f"game {chat_id}: {problem}")
+            settled = GameSettlement.query.count()
+            if settled != args.games:
+                problems.append(f"{settled} of {args.games} games settled")
+            unreconciled = ledger.reconcile()
+            if unreconciled:
+                problems.append(f"balances differ from the ledger for users {unreconciled}")
+            db.engine.dispose()
+
+    for problem in problems:
+        print(f"FAIL {problem}")
+    if problems:
+        sys.exit(1)
+    print(f"ok   {args.games} demo games settled")
+
+if __name__ == '__main__':
+    main()
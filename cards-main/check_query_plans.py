@@ -0,0 +1,114 @@
+"""Query-plan check for the blackjack API's hot queries.
+
+Fills a throwaway SQLite database with many finished sessions and a few
+active ones, then runs EXPLAIN QUERY PLAN on the query behind each route.
+Exits with status 1 if any of them scans a whole table or a whole index,
+i.e. if it would slow down as finished sessions pile up. Scanning a
+partial index is fine: it only holds active sessions. The plans are
+checked before and after ANALYZE.
+
+Usage: python check_query_plans.py [--finished 200000] [--verbose]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Indexes that only cover active sessions, so scanning them is cheap
+PARTIAL_INDEXES = ('ix_game_sessions_active',)
+
+def route_queries(engine):
+    """(name, statement) for every hot query, compiled with literal values"""
+    from sqlalchemy import update
+    from app import archiver
+    from ledger import _CREDIT, _DEBIT
+    from models import GameSession, User
+
+    chat_id = 4864761311604992
+    params = {'user_id': 1, 'amount': -1000}
+    statements = [
+        ('session by chat_id (get/join/close/create)', GameSession.query.filter_by(chat_id=chat_id).statement),
+        ('list_sessions', GameSession.active().statement),
+        ('user by id', User.query.filter_by(user_id=1).statement),
+        ('settlement: close session', update(GameSession).where(GameSession.chat_id == chat_id)
+            .values(status='closed')),
+        ('ledger: debit', _DEBIT.bindparams(**params)),
+        ('ledger: credit', _CREDIT.bindparams(**params)),
+        ('archiver: next batch', archiver.candidates(datetime.utcnow())),
+    ]
+    return [(name, str(stmt.compile(dialect=engine.dialect, compile_kwargs={'literal_binds': True})))
+            for name, stmt in statements]
+
+def fill(engine, finished, active):
+    from models import GameSession, User
+    rng = random.Random(1)
+    start = datetime(2024, 1, 1)
+    rows = []
+    for i in range(finished + active):
+        created = start + timedelta(seconds=rng.randrange(60 * 24 * 3600))
+        rows.append({
+            'chat_id': (1 << 52) + i,
+            'creator_id': rng.randrange(1, 10000),
+            'creator_username': 'player',
+            'player2_id': rng.randrange(1, 10000),
+            'game_mode': 'test',
+            'stake': 10.0,
+            'status': rng.choice(('waiting', 'playing')) if i >= finished else rng.choice(('closed', 'finished')),
+            'created_at': created,
+            'finished_at': None if i >= finished else created + timedelta(minutes=5)
+        })
+    with engine.begin() as conn:
+        conn.execute(GameSession.__table__.insert(), rows)
+        conn.execute(User.__table__.insert(), [
+            {'user_id': i, 'username': 'player', 'balance': 1000.0, 'balance_minor': 100000}
+            for i in range(1, 10000)
+        ])
+
+def check(engine, verbose):
+    problems = []
+    with engine.connect() as conn:
+        for name, sql in route_queries(engine):
+            plan = [row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+            bad = [step for step in plan
+                   if step.startswith('SCAN') and not any(index in step for index in PARTIAL_INDEXES)]
+            if verbose or bad:
+                print(f"{'FAIL' if bad else 'ok  '} {name}")
+                for step in plan:
+                    print(f"       {step}")
+            else:
+                print(f"ok   {name}")
+            if bad:
+                problems.append(name)
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description='EXPLAIN QUERY PLAN check for hot API queries')
+    parser.add_argument('--finished', type=int, default=200_000, help='finished sessions to insert')
+    parser.add_argument('--active', type=int, default=50, help='active sessions to insert')
+    parser.add_argument('--verbose', action='store_true', help='print every plan')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The app reads DATABASE_URL and creates its tables at import time
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'plans.db')}"
+        from app import app, db
+
+        with app.app_context():
+            engine = db.engine
+            fill(engine, args.finished, args.active)
+            print(f"{args.finished:,} finished / {args.active} active sessions, no statistics:")
+            problems = check(engine, args.verbose)
+            with engine.begin() as conn:
+                conn.exec_driver_sql("ANALYZE")
+            print("after ANALYZE:")
+            problems += check(engine, args.verbose)
+            engine.dispose()
+
+    if problems:
+        print(f"{len(problems)} queries would scan a whole table or index")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Local stand-in for the Telegram Bot API sendMessage method.
+
+Records every message it receives and can simulate slow responses, flood
+control (429 with retry_after) and server errors, so that the notification
+queue can be exercised without a real bot.
+
+Usage:
+    python fake_telegram.py [--port 8089] [--latency 0.2] [--flood-every 10]
+                            [--retry-after 1] [--error-every 0]
+    TELEGRAM_API_URL=http://127.0.0.1:8089 BOT_TOKEN=test python app.py
+
+GET /messages lists what was received, DELETE /messages clears it.
+"""
+import argparse
+import threading
+import time
+
+from flask import Flask, jsonify, request
+
+app = Flask(__name__)
+app.config.update(LATENCY=0.0, FLOOD_EVERY=0, RETRY_AFTER=1, ERROR_EVERY=0)
+
+_lock = threading.Lock()
+messages = []
+calls = 0
+
+@app.route('/bot<token>/sendMessage', methods=['POST'])
+def send_message(token):
+    global calls
+    payload = request.get_json(silent=True) or request.form.to_dict()
+    with _lock:
+        calls += 1
+        call = calls
+    time.sleep(app.config['LATENCY'])
+
+    if app.config['FLOOD_EVERY'] and call % app.config['FLOOD_EVERY'] == 0:
+        retry_after = app.config['RETRY_AFTER']
+        return jsonify({
+            'ok': False,
+            'error_code': 429,
+            'description': f'Too Many Requests: retry after {retry_after}',
+            'parameters': {'retry_after': retry_after}
+        }), 429
+    if app.config['ERROR_EVERY'] and call % app.config['ERROR_EVERY'] == 0:
+        return jsonify({'ok': False, 'error_code': 502, 'description': 'Bad Gateway'}), 502
+    if not payload.get('chat_id') or not payload.get('text'):
+        return jsonify({'ok': False, 'error_code': 400, 'description': 'Bad Request: message text is empty'}), 400
+
+    with _lock:
+        message_id = len(messages) + 1
+        messages.append({
+            'message_id': message_id,
+            'chat_id': payload['chat_id'],
+            'text': payload['text'],
+            'date': time.time()
+        })
+    return jsonify({'ok': True, 'result': {
+        'message_id': message_id,
+        'chat': {'id': payload['chat_id']},
+        'text': payload['text']
+    }})
+
+@app.route('/messages', methods=['GET', 'DELETE'])
+def list_messages():
+    global calls
+    with _lock:
+        if request.method == 'DELETE':
+            messages.clear()
+            calls = 0
+        return jsonify({'calls': calls, 'messages': list(messages)})
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fake Telegram Bot API for local testing')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds to wait before each reply')
+    parser.add_argument('--flood-every', type=int, default=0, help='answer every Nth call with 429')
+    parser.add_argument('--retry-after', type=int, default=1, help='retry_after sent with 429 replies')
+    parser.add_argument('--error-every', type=int, default=0, help='answer every Nth call with 502')
+    args = parser.parse_args()
+
+    app.config.update(
+        LATENCY=args.latency,
+        FLOOD_EVERY=args.flood_every,
+        RETRY_AFTER=args.retry_after,
+        ERROR_EVERY=args.error_every
+    )
+    app.run(host=args.host, port=args.port, threaded=True)
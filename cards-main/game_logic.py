@@ -1,5 +1,13 @@
 import random
 import logging
+import threading
+from functools import wraps
+from array import array
+from collections import deque
+from itertools import count
+
+from background import DaemonThreads
+from session_ids import SessionIdAllocator
 
 logger = logging.getLogger(__name__)
 
@@ -10,13 +18,25 @@ CARDS = {
 }
 SUITS = ['♠', '♥', '♦', '♣']
 
+RANKS = list(CARDS.keys())
+DECKS_PER_SHOE = 6  # 6 decks for casino style
+
+# Compact card codes: code = rank_index * len(SUITS) + suit_index.
+# Display strings, point values and ace flags are precomputed per code so
+# dealing never formats a string and scoring never parses one.
+CARD_STRINGS = tuple(f"{rank}{suit}" for rank in RANKS for suit in SUITS)
+CARD_VALUES = bytes(CARDS[rank] for rank in RANKS for _ in SUITS)
+CARD_IS_ACE = bytes(rank == 'A' for rank in RANKS for _ in SUITS)
+CARD_CODES = {card: code for code, card in enumerate(CARD_STRINGS)}
+_CARD_POINTS = {card: CARD_VALUES[code] for code, card in enumerate(CARD_STRINGS)}
+
 def calculate_score(cards):
     """Calculate the score of a hand of cards"""
     if not cards:
         return 0
     
-    score = sum(CARDS[card[:-1]] for card in cards)
-    aces = sum(1 for card in cards if card[:-1] == 'A')
+    score = sum(_CARD_POINTS[card] for card in cards)
+    aces = sum(1 for card in cards if card[0] == 'A')
     
     # Adjust for aces
     while score > 21 and aces > 0:
@@ -25,6 +45,37 @@ def calculate_score(cards):
     
     return score
 
+def add_card(hand, card):
+    """Add a card to a hand and update its running score in O(1)
+    
+    The hand keeps its total, the number of aces still counted as 11
+    ('soft_aces') and a bust flag, so no card is ever re-scored.
+    """
+    code = CARD_CODES[card]
+    hand.cards.append(card)
+    score = hand.score + CARD_VALUES[code]
+    soft_aces = hand.soft_aces + CARD_IS_ACE[code]
+    
+    # Adjust for aces
+    while score > 21 and soft_aces > 0:
+        score -= 10
+        soft_aces -= 1
+    
+    hand.score = score
+    hand.soft_aces = soft_aces
+    hand.bust = score > 21
+    return score
+
+def reset_hand(hand, cards=()):
+    """Replace the cards of a hand and rebuild its running score"""
+    hand.cards = []
+    hand.score = 0
+    hand.soft_aces = 0
+    hand.bust = False
+    for card in cards:
+        add_card(hand, card)
+    return hand
+
 def can_split(cards):
     """Check if cards can be split (same rank)"""
     if len(cards) != 2:
@@ -37,47 +88,414 @@ def can_split(cards):
     # Same rank means can split
     return rank1 == rank2
 
+class Shoe:
+    """Shuffled multi-deck shoe stored as one byte per card.
+    
+    Cards are dealt by advancing a cursor instead of popping from a list;
+    they become display strings only when dealt or serialized.
+    """
+    
+    __slots__ = ('_codes', '_cursor')
+    
+    def __init__(self, codes=None, decks=DECKS_PER_SHOE):
+        if codes is None:
+            codes = array('B', range(len(CARD_STRINGS))) * decks
+            random.shuffle(codes)
+        self._codes = codes
+        self._cursor = 0
+    
+    @classmethod
+    def from_list(cls, cards):
+        """Build a shoe from display strings (e.g. a synced game state)"""
+        return cls(array('B', (CARD_CODES[card] for card in cards)))
+    
+    def __len__(self):
+        return len(self._codes) - self._cursor
+    
+    @property
+    def size(self):
+        """Number of cards in the full shoe"""
+        return len(self._codes)
+    
+    @property
+    def penetration(self):
+        """Fraction of the shoe that has already been dealt"""
+        return self._cursor / len(self._codes) if self._codes else 1.0
+    
+    def reshuffle(self):
+        """Shuffle the whole shoe in place and restart dealing"""
+        random.shuffle(self._codes)
+        self._cursor = 0
+    
+    def deal_code(self):
+        """Deal the next card as a compact code"""
+        if self._cursor >= len(self._codes):
+            raise IndexError('deal from empty shoe')
+        code = self._codes[self._cursor]
+        self._cursor += 1
+        return code
+    
+    def pop(self):
+        """Deal the next card as a display string"""
+        return CARD_STRINGS[self.deal_code()]
+    
+    def to_list(self):
+        """Remaining cards as display strings, in dealing order"""
+        return [CARD_STRINGS[code] for code in self._codes[self._cursor:]]
+
 def create_deck():
-    """Create a shuffled deck of cards (6 decks)"""
-    deck = []
-    for _ in range(6):  # 6 decks for casino style
-        for card in CARDS.keys():
-            for suit in SUITS:
-                deck.append(f"{card}{suit}")
-    
-    random.shuffle(deck)
-    return deck
+    """Create a shuffled shoe of cards (6 decks)"""
+    return Shoe()
+
+class ShoePool:
+    """Pool of shuffled shoes shared by all tables
+    
+    Shoes are shuffled by a background thread and handed out in constant
+    time. A shoe released by a finished table goes back into the pool
+    until it is dealt past the cut card (``penetration``); only then is it
+    reshuffled, again in the background.
+    """
+    
+    def __init__(self, size=16, penetration=0.75, decks=DECKS_PER_SHOE):
+        self.size = size
+        self.penetration = penetration
+        self.decks = decks
+        self._ready = deque()
+        self._spent = deque()
+        self._cond = threading.Condition()
+        self._worker = DaemonThreads(self._refill, 'shoe-pool')
+        self.hits = 0
+        self.misses = 0
+        self.reshuffles = 0
+    
+    def _refill(self):
+        """Background loop: keep ``size`` shuffled shoes ready"""
+        while True:
+            with self._cond:
+                while len(self._ready) >= self.size:
+                    self._cond.wait()
+                shoe = self._spent.popleft() if self._spent else None
+            
+            # Shuffle outside the lock so acquire() never waits on it
+            if shoe is None:
+                shoe = Shoe(decks=self.decks)
+            else:
+                shoe.reshuffle()
+            
+            with self._cond:
+                self._ready.append(shoe)
+                self.reshuffles += 1
+    
+    def acquire(self):
+        """Hand out a shuffled shoe (built on the spot if the pool is empty)"""
+        with self._cond:
+            self._worker.ensure_running()
+            if self._ready:
+                self.hits += 1
+                shoe = self._ready.popleft()
+            else:
+                self.misses += 1
+                shoe = None
+            self._cond.notify()
+        return shoe if shoe is not None else Shoe(decks=self.decks)
+    
+    def release(self, shoe):
+        """Return a table's shoe; it is reused until the cut card is reached"""
+        if not isinstance(shoe, Shoe) or shoe.size != self.decks * len(CARD_STRINGS):
+            return
+        with self._cond:
+            if shoe.penetration < self.penetration and len(self._ready) < self.size:
+                self._ready.append(shoe)
+            else:
+                self._spent.append(shoe)
+                # Keep at most one pool's worth of spent shoes for reuse
+                while len(self._spent) > self.size:
+                    self._spent.popleft()
+            self._cond.notify()
+    
+    def stats(self):
+        """Pool metrics"""
+        with self._cond:
+            requests = self.hits + self.misses
+            return {
+                'size': self.size,
+                'ready': len(self._ready),
+                'spent': len(self._spent),
+                'penetration': self.penetration,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / requests if requests else None,
+                'reshuffles': self.reshuffles
+            }
+
+class Hand:
+    """Cards of one hand with their running score"""
+    
+    __slots__ = ('cards', 'score', 'soft_aces', 'bust', 'stand')
+    
+    def __init__(self, cards=()):
+        self.stand = False
+        reset_hand(self, cards)
+    
+    def to_json(self):
+        return {
+            'cards': list(self.cards),
+            'score': self.score
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        hand = cls(data.get('cards', []))
+        hand.stand = data.get('stand', False)
+        return hand
+
+class Seat:
+    """A player at a table: the main hand plus at most one split hand"""
+    
+    __slots__ = ('id', 'username', 'mode', 'hand', 'split_hands', 'active_hand', 'stand')
+    
+    def __init__(self, user_id, username, mode):
+        self.id = user_id
+        self.username = username
+        self.mode = mode
+        self.hand = Hand()
+        self.split_hands = []  # Додаткові руки для спліту
+        self.active_hand = 0   # Активна рука (0 = основна)
+        self.stand = False
+    
+    @property
+    def cards(self):
+        return self.hand.cards
+    
+    @property
+    def score(self):
+        return self.hand.score
+    
+    def current_hand(self):
+        """Hand that receives the next card"""
+        if self.split_hands and self.active_hand != 0:
+            return self.split_hands[0]
+        return self.hand
+    
+    def to_json(self):
+        return {
+            'id': self.id,
+            'username': self.username,
+            'cards': list(self.hand.cards),
+            'score': self.hand.score,
+            'stand': self.stand,
+            'mode': self.mode,
+            'split_hands': [hand.to_json() for hand in self.split_hands],
+            'active_hand': self.active_hand
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        seat = cls(data['id'], data.get('username'), data.get('mode', 'test'))
+        seat.hand = Hand(data.get('cards', []))
+        seat.split_hands = [Hand.from_dict(hand) for hand in data.get('split_hands', [])]
+        seat.active_hand = data.get('active_hand', 0)
+        seat.stand = data.get('stand', False)
+        return seat
+
+# State versions are unique across all tables, so a version also tells
+# apart a rematch table from the one it replaced
+_table_versions = count(1)
+
+class Table:
+    """State of one blackjack game
+    
+    Players are looked up by user id through a seat index, and the JSON
+    form is built once per state change (see ``touch``).
+    """
+    
+    __slots__ = ('chat_id', 'game_id', 'player1', 'player2', 'stake', 'turn', 'status', 'deck',
+                 'version', '_seats', '_json')
+    
+    def __init__(self, chat_id, player1, stake, deck, game_id=None):
+        self.chat_id = chat_id
+        # Unique per game, unlike chat_id which a rematch reuses; keys the settlement
+        self.game_id = game_id
+        self.player1 = player1
+        self.player2 = None
+        self.stake = stake
+        self.turn = player1.id
+        self.status = 'waiting'
+        self.deck = deck
+        self.version = next(_table_versions)
+        self._seats = {player1.id: player1}
+        self._json = None
+    
+    def seat(self, user_id):
+        """Seat of a player, or None if the user is not at this table"""
+        return self._seats.get(user_id)
+    
+    def opponent(self, seat):
+        return self.player2 if seat is self.player1 else self.player1
+    
+    def sit_down(self, seat):
+        """Seat the second player"""
+        self.player2 = seat
+        self._seats[seat.id] = seat
+    
+    def pass_turn(self, seat):
+        """Give the turn to the opponent of ``seat``"""
+        if self.player2:
+            self.turn = self.opponent(seat).id
+    
+    def touch(self):
+        """Mark the state as changed so the JSON form is rebuilt"""
+        self.version = next(_table_versions)
+        self._json = None
+    
+    def to_json(self):
+        """Client-facing view of the table, cached until the next ``touch``
+        
+        Only what the client renders is included; the shoe never leaves
+        the server.
+        """
+        if self._json is None:
+            self._json = {
+                'player1': self.player1.to_json(),
+                'player2': self.player2.to_json() if self.player2 else None,
+                'stake': self.stake,
+                'turn': self.turn,
+                'status': self.status
+            }
+        return self._json
+    
+    @classmethod
+    def from_dict(cls, chat_id, data, deck=None):
+        """Rebuild a table from its JSON form (e.g. a synced game state)
+        
+        The public view carries no shoe, so the caller passes one unless
+        ``data`` still has a 'deck' list.
+        """
+        if deck is None:
+            deck = Shoe.from_list(data.get('deck') or [])
+        table = cls(chat_id, Seat.from_dict(data['player1']), data.get('stake', 10.0), deck,
+                    game_id=data.get('game_id'))
+        if data.get('player2'):
+            table.sit_down(Seat.from_dict(data['player2']))
+        table.turn = data.get('turn', table.turn)
+        table.status = data.get('status', table.status)
+        return table
+
+class ChangeFeed:
+    """Per-table change notifications for push subscribers
+    
+    GameManager publishes the table version after every change; readers
+    block in ``wait`` until the version differs from the one they have.
+    Each table has its own condition, so a move only wakes the clients
+    watching that table. Entries live while their table does or while
+    someone waits on them, so waiting on unknown ids leaves nothing behind.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tables = {}  # chat_id -> [condition, version, waiters]
+    
+    def _entry(self, chat_id, waiter=False):
+        with self._lock:
+            entry = self._tables.get(chat_id)
+            if entry is None:
+                entry = self._tables[chat_id] = [threading.Condition(), 0, 0]
+            if waiter:
+                entry[2] += 1
+            return entry
+    
+    def _leave(self, chat_id, entry):
+        """Drop a waiter; forget the entry if it was the last one and no table is live"""
+        with self._lock:
+            entry[2] -= 1
+            if not entry[2] and not entry[1] and self._tables.get(chat_id) is entry:
+                del self._tables[chat_id]
+    
+    def publish(self, chat_id, version):
+        """Record a new version (None when the table is gone) and wake readers"""
+        entry = self._entry(chat_id)
+        with entry[0]:
+            if entry[1] == version:
+                return
+            entry[1] = version
+            entry[0].notify_all()
+        if version is None:
+            with self._lock:
+                self._tables.pop(chat_id, None)
+    
+    def version(self, chat_id):
+        """Last published version of ``chat_id`` (0 if none yet)"""
+        entry = self._tables.get(chat_id)
+        return entry[1] if entry else 0
+    
+    def wait(self, chat_id, seen, timeout=None):
+        """Block until the published version is not ``seen`` (or timeout); return it"""
+        entry = self._entry(chat_id, waiter=True)
+        try:
+            with entry[0]:
+                entry[0].wait_for(lambda: entry[1] != seen, timeout)
+                return entry[1]
+        finally:
+            self._leave(chat_id, entry)
+
+def _publishes(method):
+    """Publish the table version to the change feed after a GameManager call"""
+    @wraps(method)
+    def wrapper(self, chat_id, *args, **kwargs):
+        result = method(self, chat_id, *args, **kwargs)
+        game = self.games.get(chat_id)
+        self.changes.publish(chat_id, game.version if game else None)
+        return result
+    return wrapper
 
 class GameManager:
     """Manages all active games"""
     
-    def __init__(self):
+    def __init__(self, shoe_pool=None, game_ids=None):
         self.games = {}
+        self.shoe_pool = shoe_pool or ShoePool()
+        # Allocator of Table.game_id (shared with session ids, so both stay unique)
+        self.game_ids = game_ids or SessionIdAllocator()
+        self.changes = ChangeFeed()
+    
+    def _release_shoe(self, chat_id):
+        """Give the shoe of a replaced or removed table back to the pool"""
+        game = self.games.get(chat_id)
+        if game:
+            self.shoe_pool.release(game.deck)
+    
+    def _player_turn(self, chat_id, user_id):
+        """Resolve table and seat for a move, or return an error dict"""
+        game = self.games.get(chat_id)
+        if game is None:
+            return None, None, {'error': 'Game not found'}
+        
+        if game.turn != user_id:
+            return game, None, {'error': 'Not your turn'}
+        
+        player = game.seat(user_id)
+        if player is None:
+            return game, None, {'error': 'Player not found'}
+        
+        return game, player, None
     
+    @_publishes
     def create_game(self, chat_id, player1_id, player1_username, mode='test'):
         """Create a new game"""
         stake = 10.0 if mode == 'test' else 0.01
         
-        self.games[chat_id] = {
-            'player1': {
-                'id': player1_id,
-                'username': player1_username,
-                'cards': [],
-                'score': 0,
-                'stand': False,
-                'mode': mode,
-                'split_hands': [],  # Додаткові руки для спліту
-                'active_hand': 0    # Активна рука (0 = основна)
-            },
-            'player2': None,
-            'stake': stake,
-            'turn': player1_id,
-            'status': 'waiting',
-            'deck': create_deck()
-        }
+        self._release_shoe(chat_id)
+        self.games[chat_id] = Table(
+            chat_id,
+            Seat(player1_id, player1_username, mode),
+            stake,
+            self.shoe_pool.acquire(),
+            game_id=self.game_ids.next_id()
+        )
         
         return self.games[chat_id]
     
+    @_publishes
     def join_game(self, chat_id, player2_id, player2_username):
         """Add second player to game and start"""
         if chat_id not in self.games:
@@ -85,98 +503,56 @@ class GameManager:
         
         game = self.games[chat_id]
         
-        if game['player2'] is not None:
+        if game.player2 is not None:
             return {'error': 'Game is full'}
         
-        if game['player1']['id'] == player2_id:
+        if game.player1.id == player2_id:
             return {'error': 'Cannot play against yourself'}
         
         # Add second player
-        game['player2'] = {
-            'id': player2_id,
-            'username': player2_username,
-            'cards': [],
-            'score': 0,
-            'stand': False,
-            'mode': game['player1']['mode'],
-            'split_hands': [],  # Додаткові руки для спліту
-            'active_hand': 0    # Активна рука (0 = основна)
-        }
+        game.sit_down(Seat(player2_id, player2_username, game.player1.mode))
         
         # Deal only one card to each player at the start
-        game['player1']['cards'].append(game['deck'].pop())
-        game['player2']['cards'].append(game['deck'].pop())
-        
-        # Calculate scores
-        game['player1']['score'] = calculate_score(game['player1']['cards'])
-        game['player2']['score'] = calculate_score(game['player2']['cards'])
+        add_card(game.player1.hand, game.deck.pop())
+        add_card(game.player2.hand, game.deck.pop())
         
         # Set game status
-        game['status'] = 'playing'
+        game.status = 'playing'
+        game.touch()
         
         return game
     
+    @_publishes
     def hit(self, chat_id, user_id):
         """Player takes another card"""
-        if chat_id not in self.games:
-            return {'error': 'Game not found'}
+        game, player, error = self._player_turn(chat_id, user_id)
+        if error:
+            return error
         
-        game = self.games[chat_id]
-        
-        if game['turn'] != user_id:
-            return {'error': 'Not your turn'}
-        
-        if game['status'] != 'playing':
+        if game.status != 'playing':
             return {'error': 'Game not active'}
         
-        # Determine player
-        if game['player1']['id'] == user_id:
-            player_key = 'player1'
-            opponent_key = 'player2'
-        elif game['player2'] and game['player2']['id'] == user_id:
-            player_key = 'player2'
-            opponent_key = 'player1'
-        else:
-            return {'error': 'Player not found'}
-        
         # Block hit if player has already stood
-        if game[player_key]['stand']:
+        if player.stand:
             return {'error': 'Ви вже натиснули "Пас" і не можете брати карти!'}
         
         # Deal card
-        if len(game['deck']) == 0:
+        if len(game.deck) == 0:
             return {'error': 'No more cards'}
         
-        new_card = game['deck'].pop()
-        
-        player = game[player_key]
-        current_score = 0
+        new_card = game.deck.pop()
         
         # Deal card to the active hand
-        if len(player['split_hands']) > 0:
-            if player['active_hand'] == 0:
-                # Playing main hand
-                player['cards'].append(new_card)
-                player['score'] = calculate_score(player['cards'])
-                current_score = player['score']
-            else:
-                # Playing split hand
-                player['split_hands'][0]['cards'].append(new_card)
-                player['split_hands'][0]['score'] = calculate_score(player['split_hands'][0]['cards'])
-                current_score = player['split_hands'][0]['score']
-        else:
-            # No split, normal play
-            player['cards'].append(new_card)
-            player['score'] = calculate_score(player['cards'])
-            current_score = player['score']
+        current_score = add_card(player.current_hand(), new_card)
+        game.touch()
         
         # Check for bust on current hand
         if current_score > 21:
             # If player has split hands, just mark current hand as bust and potentially switch
-            if len(player['split_hands']) > 0:
-                if player['active_hand'] == 0:
+            if player.split_hands:
+                if player.active_hand == 0:
                     # Main hand bust, switch to split hand
-                    player['active_hand'] = 1
+                    player.active_hand = 1
                     return {
                         'success': True,
                         'result': 'hand_bust_switch',
@@ -188,25 +564,24 @@ class GameManager:
                 else:
                     # Split hand bust, check if all hands are done
                     # Both hands played, evaluate total result
-                    return self._evaluate_split_hands(chat_id, player_key, opponent_key, new_card)
+                    return self._evaluate_split_hands(game, player, new_card)
             else:
                 # Regular bust - game over
-                game['status'] = 'finished'
-                winner_key = opponent_key
+                game.status = 'finished'
+                winner = game.opponent(player)
                 
                 return {
                     'success': True,
                     'result': 'bust',
-                    'message': f"Перебор! {game[player_key]['username']} програв!",
-                    'winner': game[winner_key]['username'],
-                    'winner_id': game[winner_key]['id'],
+                    'message': f"Перебор! {player.username} програв!",
+                    'winner': winner.username,
+                    'winner_id': winner.id,
                     'game': game,
                     'new_card': new_card
                 }
         
         # Switch turn
-        if game['player2']:
-            game['turn'] = game['player2']['id'] if player_key == 'player1' else game['player1']['id']
+        game.pass_turn(player)
         
         return {
             'success': True,
@@ -215,33 +590,22 @@ class GameManager:
             'new_card': new_card
         }
     
+    @_publishes
     def stand(self, chat_id, user_id):
         """Player stands (stops taking cards)"""
-        if chat_id not in self.games:
-            return {'error': 'Game not found'}
-        
-        game = self.games[chat_id]
+        game, player, error = self._player_turn(chat_id, user_id)
+        if error:
+            return error
         
-        if game['turn'] != user_id:
-            return {'error': 'Not your turn'}
-        
-        # Determine player
-        if game['player1']['id'] == user_id:
-            player_key = 'player1'
-        elif game['player2'] and game['player2']['id'] == user_id:
-            player_key = 'player2'
-        else:
-            return {'error': 'Player not found'}
-        
-        game[player_key]['stand'] = True
+        player.stand = True
+        game.touch()
         
         # Check if both players have stood
-        if game['player1']['stand'] and game['player2'] and game['player2']['stand']:
-            return self._finish_game(chat_id)
+        if game.player1.stand and game.player2 and game.player2.stand:
+            return self._finish_game(game)
         
         # Switch turn
-        if game['player2']:
-            game['turn'] = game['player2']['id'] if player_key == 'player1' else game['player1']['id']
+        game.pass_turn(player)
         
         return {
             'success': True,
@@ -249,61 +613,42 @@ class GameManager:
             'game': game
         }
     
+    @_publishes
     def split_hand(self, chat_id, user_id):
         """Split player's hand if they have matching cards"""
-        if chat_id not in self.games:
-            return {'error': 'Game not found'}
-        
-        game = self.games[chat_id]
-        
-        if game['turn'] != user_id:
-            return {'error': 'Not your turn'}
-        
-        # Determine player
-        if game['player1']['id'] == user_id:
-            player_key = 'player1'
-        elif game['player2'] and game['player2']['id'] == user_id:
-            player_key = 'player2'
-        else:
-            return {'error': 'Player not found'}
-        
-        player = game[player_key]
+        game, player, error = self._player_turn(chat_id, user_id)
+        if error:
+            return error
         
         # Check if split is possible
-        if not can_split(player['cards']):
+        if not can_split(player.cards):
             return {'error': 'Cannot split - cards must be same rank'}
         
-        if len(player['split_hands']) > 0:
+        if player.split_hands:
             return {'error': 'Already split once - multiple splits not allowed'}
         
-        # Perform split
-        original_cards = player['cards'].copy()
-        
-        # Create two hands with one card each
-        player['cards'] = [original_cards[0]]  # First hand keeps first card
-        player['split_hands'] = [{
-            'cards': [original_cards[1]],      # Second hand gets second card
-            'score': 0,
-            'stand': False
-        }]
-        
         # Deal one card to each hand
-        if len(game['deck']) >= 2:
+        if len(game.deck) >= 2:
+            original_cards = player.cards.copy()
+            
+            # Create two hands with one card each
+            reset_hand(player.hand, [original_cards[0]])  # First hand keeps first card
+            player.split_hands = [Hand([original_cards[1]])]  # Second hand gets second card
+            
             # Deal to first hand (current main hand)
-            new_card1 = game['deck'].pop()
-            player['cards'].append(new_card1)
-            player['score'] = calculate_score(player['cards'])
+            new_card1 = game.deck.pop()
+            add_card(player.hand, new_card1)
             
             # Deal to second hand (split hand)
-            new_card2 = game['deck'].pop()
-            player['split_hands'][0]['cards'].append(new_card2)
-            player['split_hands'][0]['score'] = calculate_score(player['split_hands'][0]['cards'])
+            new_card2 = game.deck.pop()
+            add_card(player.split_hands[0], new_card2)
             
             # Set active hand to first hand
-            player['active_hand'] = 0
+            player.active_hand = 0
+            game.touch()
             
             logger.info(f"Player {user_id} split their hand. Original: {original_cards}, "
-                       f"Hand 1: {player['cards']}, Hand 2: {player['split_hands'][0]['cards']}")
+                       f"Hand 1: {player.cards}, Hand 2: {player.split_hands[0].cards}")
             
             return {
                 'success': True,
@@ -314,32 +659,21 @@ class GameManager:
         else:
             return {'error': 'Not enough cards in deck'}
     
+    @_publishes
     def switch_split_hand(self, chat_id, user_id):
         """Switch to next split hand if current hand is done"""
-        if chat_id not in self.games:
-            return {'error': 'Game not found'}
-        
-        game = self.games[chat_id]
-        
-        if game['turn'] != user_id:
-            return {'error': 'Not your turn'}
+        game, player, error = self._player_turn(chat_id, user_id)
+        if error:
+            return error
         
-        # Determine player
-        if game['player1']['id'] == user_id:
-            player_key = 'player1'
-        elif game['player2'] and game['player2']['id'] == user_id:
-            player_key = 'player2'
-        else:
-            return {'error': 'Player not found'}
-        
-        player = game[player_key]
-        
-        if len(player['split_hands']) == 0:
+        if not player.split_hands:
             return {'error': 'No split hands to switch to'}
         
+        game.touch()
+        
         # If currently on main hand (0), switch to split hand (1)
-        if player['active_hand'] == 0:
-            player['active_hand'] = 1
+        if player.active_hand == 0:
+            player.active_hand = 1
             return {
                 'success': True,
                 'result': 'switched_hand',
@@ -348,15 +682,14 @@ class GameManager:
             }
         else:
             # All split hands done, end turn
-            player['stand'] = True
+            player.stand = True
             
             # Switch turn to other player or finish game
-            if game['player1']['stand'] and game['player2'] and game['player2']['stand']:
-                return self._finish_game(chat_id)
+            if game.player1.stand and game.player2 and game.player2.stand:
+                return self._finish_game(game)
             
             # Switch turn
-            if game['player2']:
-                game['turn'] = game['player2']['id'] if player_key == 'player1' else game['player1']['id']
+            game.pass_turn(player)
             
             return {
                 'success': True,
@@ -364,21 +697,17 @@ class GameManager:
                 'game': game
             }
     
-    def _evaluate_split_hands(self, chat_id, player_key, opponent_key, new_card):
+    def _evaluate_split_hands(self, game, player, new_card):
         """Evaluate result when split hands are complete"""
-        game = self.games[chat_id]
-        player = game[player_key]
-        
         # Mark player as done with split hands
-        player['stand'] = True
+        player.stand = True
         
         # Switch turn to other player or finish game
-        if game['player1']['stand'] and game['player2'] and game['player2']['stand']:
-            return self._finish_game(chat_id)
+        if game.player1.stand and game.player2 and game.player2.stand:
+            return self._finish_game(game)
         
         # Switch turn
-        if game['player2']:
-            game['turn'] = game['player2']['id'] if player_key == 'player1' else game['player1']['id']
+        game.pass_turn(player)
         
         return {
             'success': True,
@@ -388,53 +717,49 @@ class GameManager:
             'new_card': new_card
         }
     
-    def _finish_game(self, chat_id):
+    def _finish_game(self, game):
         """Finish the game and determine winner"""
-        game = self.games[chat_id]
-        game['status'] = 'finished'
+        game.status = 'finished'
+        game.touch()
         
-        score1 = game['player1']['score']
-        score2 = game['player2']['score']
+        player1 = game.player1
+        player2 = game.player2
+        score1 = player1.score
+        score2 = player2.score
         
         # Determine winner
         if score1 > 21 and score2 > 21:
             result = 'draw'
             message = "Нічия! Обидва гравці перебрали."
             winner = None
-            winner_id = None
         elif score1 > 21:
             result = 'player2_wins'
-            message = f"{game['player2']['username']} виграв!"
-            winner = game['player2']
-            winner_id = game['player2']['id']
+            message = f"{player2.username} виграв!"
+            winner = player2
         elif score2 > 21:
             result = 'player1_wins'
-            message = f"{game['player1']['username']} виграв!"
-            winner = game['player1']
-            winner_id = game['player1']['id']
+            message = f"{player1.username} виграв!"
+            winner = player1
         elif score1 > score2:
             result = 'player1_wins'
-            message = f"{game['player1']['username']} виграв! ({score1} vs {score2})"
-            winner = game['player1']
-            winner_id = game['player1']['id']
+            message = f"{player1.username} виграв! ({score1} vs {score2})"
+            winner = player1
         elif score2 > score1:
             result = 'player2_wins'
-            message = f"{game['player2']['username']} виграв! ({score2} vs {score1})"
-            winner = game['player2']
-            winner_id = game['player2']['id']
+            message = f"{player2.username} виграв! ({score2} vs {score1})"
+            winner = player2
         else:
             result = 'draw'
             message = f"Нічия! ({score1} vs {score2})"
             winner = None
-            winner_id = None
         
         return {
             'success': True,
             'result': 'finished',
             'game_result': result,
             'message': message,
-            'winner': winner['username'] if winner else None,
-            'winner_id': winner_id,
+            'winner': winner.username if winner else None,
+            'winner_id': winner.id if winner else None,
             'game': game
         }
     
@@ -442,15 +767,32 @@ class GameManager:
         """Get game state"""
         return self.games.get(chat_id)
     
+    @_publishes
     def set_game(self, chat_id, game_data):
         """Set game state (for synchronization)"""
-        self.games[chat_id] = game_data
+        current = self.games.get(chat_id)
+        if isinstance(game_data, Table):
+            table = game_data
+        else:
+            deck = None
+            if not game_data.get('deck'):
+                # Keep dealing from the table's shoe when syncing a public view
+                deck = current.deck if current else self.shoe_pool.acquire()
+            table = Table.from_dict(chat_id, game_data, deck)
+        if table.game_id is None:
+            # A synced state of the current game keeps its id
+            table.game_id = current.game_id if current else self.game_ids.next_id()
+        if current is not None and current.deck is not table.deck:
+            self.shoe_pool.release(current.deck)
+        self.games[chat_id] = table
     
     def list_games(self):
         """Get all games (for debugging)"""
         return self.games
     
+    @_publishes
     def remove_game(self, chat_id):
         """Remove finished game"""
         if chat_id in self.games:
+            self._release_shoe(chat_id)
             del self.games[chat_id]
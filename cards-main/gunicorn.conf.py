@@ -0,0 +1,18 @@
+"""gunicorn settings, read automatically when gunicorn starts in this directory:
+
+    gunicorn app:app
+
+Each open game page keeps an SSE stream (/api/game/<id>/events) on one
+worker thread for up to SSE_MAX_SECONDS, so the sync worker class (one
+request per worker) would let a few open games block every other route.
+gthread serves each request on its own thread instead.
+
+Games live in process memory, so there is exactly one worker process;
+GUNICORN_THREADS bounds the open streams plus concurrent requests.
+"""
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+worker_class = "gthread"
+workers = 1
+threads = int(os.environ.get("GUNICORN_THREADS", 100))
@@ -0,0 +1,244 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+
+from background import DaemonThreads
+
+logger = logging.getLogger(__name__)
+
+# Balances are kept as integers in hundredths of a coin, so sums never drift
+MINOR_UNITS = 100
+
+def to_minor(amount):
+    """Coins (float, str or Decimal) to integer minor units, rounding half up"""
+    return int((Decimal(str(amount)) * MINOR_UNITS).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def from_minor(amount):
+    return amount / MINOR_UNITS
+
+class LedgerError(Exception):
+    """An operation the ledger refused; nothing of it was applied"""
+
+class UnknownUser(LedgerError):
+    def __init__(self, user_id):
+        super().__init__(f"User {user_id} not found")
+        self.user_id = user_id
+
+class InsufficientFunds(LedgerError):
+    def __init__(self, user_id):
+        super().__init__(f"Insufficient balance for user {user_id}")
+        self.user_id = user_id
+
+class LedgerPending(Exception):
+    """The operation did not commit within the timeout but is still queued
+
+    It may yet be applied: retry with the same ``ref`` rather than assume
+    it failed.
+    """
+
+_INSERT_ENTRY = text(
+    "INSERT INTO balance_ledger (user_id, amount, reason, ref, created_at)"
+    " VALUES (:user_id, :amount, :reason, :ref, :created_at)"
+)
+# The float ``balance`` column mirrors balance_minor for older readers
+_CREDIT = text(
+    "UPDATE users SET balance_minor = balance_minor + :amount,"
+    " balance = (balance_minor + :amount) / 100.0 WHERE user_id = :user_id"
+)
+_DEBIT = text(
+    "UPDATE users SET balance_minor = balance_minor + :amount,"
+    " balance = (balance_minor + :amount) / 100.0"
+    " WHERE user_id = :user_id AND balance_minor + :amount >= 0"
+)
+
+class BalanceLedger:
+    """Append-only balance ledger with group commit
+
+    Every change is a row in ``balance_ledger`` (signed amount in minor
+    units); ``users.balance_minor`` is the materialized sum, updated in
+    place with ``balance_minor = balance_minor + x`` in the same
+    transaction, so there are no lost updates even across processes.
+
+    Operations are queued to a single writer thread. Whatever queued up
+    while the previous batch was committing goes into the next transaction
+    (up to ``max_batch``), each operation in its own savepoint: a refused
+    operation is rolled back alone, the rest of the batch still commits.
+    Callers block until their batch is durable, or get LedgerPending after
+    ``timeout`` seconds.
+
+    An entry with a ``ref`` is applied at most once per user (unique index),
+    which makes payouts and stakes safe to retry.
+    """
+
+    def __init__(self, engine=None, max_batch=256, timeout=10.0):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._writer = DaemonThreads(self._run, 'balance-ledger')
+        self.batches = 0
+        self.operations = 0
+
+    def bind(self, engine):
+        """Attach to the database (after its tables exist) and migrate old ``users`` tables"""
+        self.engine = engine
+        self.migrate()
+
+    def migrate(self):
+        """Add users.balance_minor to databases created before the ledger
+
+        Existing float balances are converted and recorded as 'opening'
+        entries, so the ledger sums to every balance from the start.
+        """
+        columns = {c['name'] for c in inspect(self.engine).get_columns('users')}
+        if 'balance_minor' in columns:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE users ADD COLUMN balance_minor BIGINT NOT NULL DEFAULT 0"))
+            conn.execute(text("UPDATE users SET balance_minor = CAST(ROUND(balance * 100) AS INTEGER)"))
+            conn.execute(text(
+                "INSERT INTO balance_ledger (user_id, amount, reason, ref, created_at)"
+                " SELECT user_id, balance_minor, 'opening', 'opening', :now FROM users"
+            ), {'now': datetime.utcnow()})
+        logger.info("Migrated user balances to the ledger")
+
+    # --- Writer thread ---
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.max_batch))]
+            self._commit(batch)
+
+    def _commit(self, batch):
+        results = []
+        try:
+            with self.engine.connect() as conn:
+                if conn.dialect.name == 'sqlite':
+                    # Take the write lock up front instead of failing to upgrade mid-batch
+                    conn.exec_driver_sql("BEGIN IMMEDIATE")
+                for operation, future in batch:
+                    savepoint = conn.begin_nested()
+                    try:
+                        value = operation(conn)
+                    except Exception as e:
+                        savepoint.rollback()
+                        results.append((future, None, e))
+                    else:
+                        savepoint.commit()
+                        results.append((future, value, None))
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Ledger batch of {len(batch)} operations failed: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.operations += len(batch)
+        for future, value, error in results:
+            if error is None:
+                future.set_result(value)
+            else:
+                future.set_exception(error)
+
+    # --- Operations ---
+
+    def wait(self, future):
+        """Result of a submitted operation; raises LedgerPending if it is not committed in time"""
+        try:
+            return future.result(self.timeout)
+        except FutureTimeout:
+            raise LedgerPending(f"Ledger operation still queued after {self.timeout}s") from None
+
+    def submit(self, operation):
+        """Run ``operation(conn)`` in the next batch transaction; returns a Future of its result
+
+        The operation may execute any statements on ``conn`` (they commit or
+        roll back together with its ledger entries), but must not commit.
+        """
+        future = Future()
+        with self._cond:
+            self._writer.ensure_running()
+            self._queue.append((operation, future))
+            self._cond.notify()
+        return future
+
+    def apply(self, conn, legs, reason, ref=None, require_funds=True):
+        """Apply ``legs`` [(user_id, amount_minor), ...] on ``conn``, all or nothing
+
+        For use inside an operation passed to ``submit``. Debits that would
+        take a balance below zero raise InsufficientFunds when
+        ``require_funds``; a repeated ``ref`` raises IntegrityError.
+        """
+        now = datetime.utcnow()
+        for user_id, amount in legs:
+            params = {'user_id': user_id, 'amount': amount, 'reason': reason, 'ref': ref, 'created_at': now}
+            conn.execute(_INSERT_ENTRY, params)
+            result = conn.execute(_DEBIT if require_funds and amount < 0 else _CREDIT, params)
+            if result.rowcount != 1:
+                found = conn.execute(text("SELECT 1 FROM users WHERE user_id = :user_id"), params).first()
+                raise InsufficientFunds(user_id) if found else UnknownUser(user_id)
+
+    def post(self, legs, reason, ref=None, require_funds=True):
+        """Apply ``legs`` atomically and wait for the commit
+
+        Returns False if an entry with this ``ref`` was already applied.
+        Raises LedgerError if the operation was refused, LedgerPending if
+        it has not committed yet.
+        """
+        future = self.submit(lambda conn: self.apply(conn, legs, reason, ref, require_funds))
+        try:
+            self.wait(future)
+        except IntegrityError:
+            return False
+        return True
+
+    def open_account(self, user_id, username=None, balance_minor=100000):
+        """Create the user with an opening balance unless they already exist"""
+        def operation(conn):
+            created = conn.execute(text(
+                "INSERT INTO users (user_id, username, balance, balance_minor)"
+                " VALUES (:user_id, :username, 0, 0) ON CONFLICT (user_id) DO NOTHING"
+            ), {'user_id': user_id, 'username': username}).rowcount
+            if created:
+                self.apply(conn, [(user_id, balance_minor)], 'opening', ref='opening')
+            return bool(created)
+        return self.wait(self.submit(operation))
+
+    def set_balance(self, user_id, balance_minor, reason='adjustment'):
+        """Set a balance to an absolute value, recording the difference"""
+        def operation(conn):
+            row = conn.execute(text("SELECT balance_minor FROM users WHERE user_id = :user_id"),
+                               {'user_id': user_id}).first()
+            if row is None:
+                raise UnknownUser(user_id)
+            if balance_minor != row[0]:
+                self.apply(conn, [(user_id, balance_minor - row[0])], reason, require_funds=False)
+        self.wait(self.submit(operation))
+
+    def reconcile(self):
+        """User ids whose materialized balance differs from the sum of their entries"""
+        with self.engine.connect() as conn:
+            return [row[0] for row in conn.execute(text(
+                "SELECT u.user_id FROM users u LEFT JOIN"
+                " (SELECT user_id, SUM(amount) AS total FROM balance_ledger GROUP BY user_id) l"
+                " ON l.user_id = u.user_id WHERE u.balance_minor != COALESCE(l.total, 0)"
+            ))]
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'operations': self.operations,
+            'queued': len(self._queue),
+            'avg_batch': round(self.operations / self.batches, 2) if self.batches else 0
+        }
@@ -1,18 +1,24 @@
 from db import db
-from sqlalchemy import Integer, String, Float, Text, DateTime, Boolean
+from sqlalchemy import Integer, BigInteger, String, Float, Text, DateTime, Boolean, Index, LargeBinary, UniqueConstraint, text
 from datetime import datetime
+from archiver import load_archived
+from ledger import to_minor
 
 class User(db.Model):
     __tablename__ = 'users'
     
     user_id = db.Column(Integer, primary_key=True)
     username = db.Column(String(64), nullable=True)
+    # Materialized ledger balance in minor units; change it only through BalanceLedger
+    balance_minor = db.Column(BigInteger, default=100000, nullable=False)
+    # Float mirror of balance_minor, kept for older readers
     balance = db.Column(Float, default=1000.0, nullable=False)
     
     def __init__(self, user_id, username=None, balance=1000.0):
         self.user_id = user_id
         self.username = username
         self.balance = balance
+        self.balance_minor = to_minor(balance)
     
     def __repr__(self):
         return f'<User {self.user_id}: {self.username}>'
@@ -24,11 +30,21 @@ class User(db.Model):
             'balance': self.balance
         }
 
+# Sessions that still show up in the lobby / are being played
+ACTIVE_STATUSES = ('waiting', 'playing')
+
 class GameSession(db.Model):
     __tablename__ = 'game_sessions'
+    __table_args__ = (
+        Index('ix_game_sessions_status_created', 'status', 'created_at'),
+        # Active sessions are a handful next to all finished ones; this index stays tiny
+        Index('ix_game_sessions_active', 'created_at',
+              sqlite_where=text("status IN ('waiting', 'playing')"),
+              postgresql_where=text("status IN ('waiting', 'playing')")),
+    )
     
     id = db.Column(Integer, primary_key=True, autoincrement=True)
-    chat_id = db.Column(Integer, unique=True, nullable=False)
+    chat_id = db.Column(BigInteger, unique=True, nullable=False)
     creator_id = db.Column(Integer, nullable=False)
     creator_username = db.Column(String(64), nullable=False)
     player2_id = db.Column(Integer, nullable=True)
@@ -72,11 +88,68 @@ class GameSession(db.Model):
         return self.player2_id is not None
     
     def is_active(self):
-        return self.status in ['waiting', 'playing']
+        return self.status in ACTIVE_STATUSES
+    
+    @classmethod
+    def active(cls):
+        """Query of active sessions, oldest first (served by ix_game_sessions_active)"""
+        return cls.query.filter(cls.status.in_(ACTIVE_STATUSES)).order_by(cls.created_at)
     
     def can_join(self, user_id):
         return not self.is_full() and self.creator_id != user_id and self.is_active()
     
     def close_session(self):
         self.status = 'closed'
-        self.finished_at = datetime.utcnow()
\ No newline at end of file
+        self.finished_at = datetime.utcnow()
+
+class GameSessionHistory(db.Model):
+    """A closed/finished session moved out of game_sessions by SessionArchiver"""
+    __tablename__ = 'game_sessions_history'
+    
+    id = db.Column(Integer, primary_key=True, autoincrement=False)  # id in game_sessions
+    chat_id = db.Column(BigInteger, nullable=False)
+    creator_id = db.Column(Integer, nullable=False)
+    player2_id = db.Column(Integer, nullable=True)
+    status = db.Column(String(20), nullable=False)
+    created_at = db.Column(DateTime, nullable=True)
+    finished_at = db.Column(DateTime, nullable=True)
+    winner_id = db.Column(Integer, nullable=True)
+    archived_at = db.Column(DateTime, nullable=False)
+    data = db.Column(LargeBinary, nullable=False)  # whole row as zlib-compressed JSON
+    
+    def __repr__(self):
+        return f'<GameSessionHistory {self.chat_id}: {self.status}>'
+    
+    def to_dict(self):
+        return load_archived(self.data)
+
+class GameSettlement(db.Model):
+    """One row per settled game; its primary key makes settlement idempotent"""
+    __tablename__ = 'game_settlements'
+    
+    game_id = db.Column(BigInteger, primary_key=True, autoincrement=False)
+    chat_id = db.Column(BigInteger, nullable=False)
+    winner_id = db.Column(Integer, nullable=True)
+    payout = db.Column(Float, default=0.0, nullable=False)
+    settled_at = db.Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<GameSettlement {self.game_id}: winner {self.winner_id}>'
+
+class LedgerEntry(db.Model):
+    """Append-only record of a balance change (amount in minor units, signed)"""
+    __tablename__ = 'balance_ledger'
+    __table_args__ = (
+        # An entry with a ref (e.g. 'game:<id>') is applied once per user
+        UniqueConstraint('user_id', 'ref', name='uq_balance_ledger_user_ref'),
+    )
+    
+    id = db.Column(Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(Integer, nullable=False)
+    amount = db.Column(BigInteger, nullable=False)
+    reason = db.Column(String(32), nullable=False)
+    ref = db.Column(String(64), nullable=True)
+    created_at = db.Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<LedgerEntry {self.user_id}: {self.amount} ({self.reason})>'
@@ -0,0 +1,204 @@
+import logging
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from background import DaemonThreads
+
+logger = logging.getLogger(__name__)
+
+# Telegram rejects longer message texts
+MAX_MESSAGE_LENGTH = 4096
+
+class TelegramNotifier:
+    """Background sender for Telegram bot messages
+
+    ``notify()`` only queues the text and returns, so request handlers never
+    wait on the Bot API. Worker threads send through one pooled HTTP session.
+    Texts queued for the same recipient while an earlier one is still waiting
+    are coalesced into a single message, and a recipient is served by one
+    worker at a time, so its messages keep their order.
+
+    Sends are spaced to stay under ``rate`` messages per second. A 429 reply
+    pauses all workers for the ``retry_after`` Telegram asks for; connection
+    errors and 5xx replies are retried with exponential back-off. Other
+    errors (bot blocked, chat not found) drop the message.
+    """
+
+    def __init__(self, token, api_url="https://api.telegram.org", workers=2, rate=25.0,
+                 max_pending=10000, retries=5, backoff=0.5, timeout=5.0):
+        self.token = token
+        self.api_url = api_url.rstrip('/')
+        self.workers = workers
+        self.rate = rate
+        self.max_pending = max_pending
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._pending = {}  # chat_id -> [text, ...] not yet picked up by a worker
+        self._ready = deque()  # chat_ids with pending texts and no worker on them
+        self._sending = set()
+        self._cond = threading.Condition()
+        self._workers = DaemonThreads(self._run, 'telegram-notifier', count=workers)
+        self._session = None
+        self._rate_lock = threading.Lock()
+        self._next_send = 0.0
+        self._closed = False
+        self.queued = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.retried = 0
+        self.failed = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self):
+        return bool(self.token)
+
+    def _ensure_workers(self):
+        if self._session is None:
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+            self._session.mount('https://', adapter)
+            self._session.mount('http://', adapter)
+        self._workers.ensure_running()
+
+    def notify(self, chat_id, text):
+        """Queue a message; returns False if it was dropped (disabled, closed or queue full)"""
+        if not self.enabled:
+            return False
+        with self._cond:
+            if self._closed or self.queued >= self.max_pending:
+                self.dropped += 1
+                reason = "closed" if self._closed else "full"
+                logger.warning(f"Notification queue {reason}, dropping message to {chat_id}")
+                return False
+            self._ensure_workers()
+            self.queued += 1
+            texts = self._pending.get(chat_id)
+            if texts is not None:
+                texts.append(text)
+                return True
+            self._pending[chat_id] = [text]
+            if chat_id not in self._sending:
+                self._ready.append(chat_id)
+                self._cond.notify()
+        return True
+
+    def _run(self):
+        """Worker loop: take a recipient, send everything queued for it"""
+        while True:
+            with self._cond:
+                while not self._ready:
+                    self._cond.wait()
+                chat_id = self._ready.popleft()
+                texts = self._pending.pop(chat_id)
+                self._sending.add(chat_id)
+
+            try:
+                for message in self._coalesce(texts):
+                    self._deliver(chat_id, message)
+            except Exception as e:
+                logger.error(f"Notification worker error for {chat_id}: {e}")
+
+            with self._cond:
+                self._sending.discard(chat_id)
+                self.queued -= len(texts)
+                # Texts that arrived while we were sending wait for the next worker
+                if chat_id in self._pending:
+                    self._ready.append(chat_id)
+                self._cond.notify_all()
+
+    def _coalesce(self, texts):
+        """Join queued texts into as few messages as Telegram's size limit allows"""
+        messages = []
+        for text in texts:
+            text = text[:MAX_MESSAGE_LENGTH]
+            if messages and len(messages[-1]) + 2 + len(text) <= MAX_MESSAGE_LENGTH:
+                messages[-1] += "\n\n" + text
+                self.coalesced += 1
+            else:
+                messages.append(text)
+        return messages
+
+    def _wait_turn(self):
+        """Block until the global send rate (and any flood-wait pause) allows a send"""
+        with self._rate_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_send)
+            self._next_send = slot + (1.0 / self.rate if self.rate > 0 else 0)
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _pause(self, seconds):
+        with self._rate_lock:
+            self._next_send = max(self._next_send, time.monotonic() + seconds)
+
+    def _deliver(self, chat_id, text):
+        url = f"{self.api_url}/bot{self.token}/sendMessage"
+        payload = {"chat_id": chat_id, "text": text}
+        for attempt in range(self.retries + 1):
+            self._wait_turn()
+            try:
+                response = self._session.post(url, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                error, delay = str(e), self.backoff * 2 ** attempt
+            else:
+                if response.ok:
+                    self.sent += 1
+                    return True
+                if response.status_code == 429:
+                    # Flood control: Telegram says how long to back off
+                    try:
+                        delay = float(response.json()['parameters']['retry_after'])
+                    except (ValueError, KeyError, TypeError):
+                        delay = self.backoff * 2 ** attempt
+                    self._pause(delay)
+                    error = f"429, retry after {delay}s"
+                elif response.status_code >= 500:
+                    error, delay = f"HTTP {response.status_code}", self.backoff * 2 ** attempt
+                else:
+                    self.failed += 1
+                    logger.warning(f"Telegram rejected message to {chat_id}: "
+                                   f"{response.status_code} {response.text[:200]}")
+                    return False
+            if attempt < self.retries:
+                self.retried += 1
+                time.sleep(delay)
+        self.failed += 1
+        logger.warning(f"Failed to send Telegram message to {chat_id}: {error}")
+        return False
+
+    def flush(self, timeout=None):
+        """Wait until every queued message is sent or given up on; True if the queue drained"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.queued:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=10):
+        """Stop accepting messages and give queued ones ``timeout`` seconds to go out"""
+        with self._cond:
+            self._closed = True
+        if self._workers.alive():
+            self.flush(timeout)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'workers': self._workers.alive(),
+                'queued': self.queued,
+                'recipients_waiting': len(self._pending),
+                'sent': self.sent,
+                'coalesced': self.coalesced,
+                'retried': self.retried,
+                'failed': self.failed,
+                'dropped': self.dropped
+            }
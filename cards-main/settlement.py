@@ -0,0 +1,64 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from ledger import to_minor
+from models import GameSession, GameSettlement, User
+
+logger = logging.getLogger(__name__)
+
+def settle_game(ledger, game, winner_id):
+    """Close a finished game's session and pay out its stakes in one transaction
+
+    The settlement row is written first: its primary key is the game id, so a
+    second call for the same game (a retried or concurrent move) fails there
+    and changes nothing. Payouts are ledger entries, committed by the
+    ledger's writer in the same transaction as the settlement row. In test
+    mode the winner gets both stakes and a draw refunds each player's;
+    real-money games only close the session. Seats without an account (the
+    demo opponent) are not paid.
+
+    Returns True if this call settled the game, False if it already was.
+    """
+    stake = game.stake
+    test_mode = game.player1.mode == 'test'
+    if not test_mode:
+        payout = 0.0
+    elif winner_id:
+        payout = stake * 2
+    else:
+        payout = stake
+
+    def settle(conn):
+        conn.execute(insert(GameSettlement).values(
+            game_id=game.game_id,
+            chat_id=game.chat_id,
+            winner_id=winner_id,
+            payout=payout,
+            settled_at=datetime.utcnow()
+        ))
+        conn.execute(
+            update(GameSession)
+            .where(GameSession.chat_id == game.chat_id)
+            .values(status='closed', finished_at=datetime.utcnow(), winner_id=winner_id)
+        )
+        if payout:
+            # Winner takes both stakes; on a draw each player gets their own back
+            seats = [winner_id] if winner_id else [game.player1.id, game.player2.id]
+            paid = conn.execute(select(User.user_id).where(User.user_id.in_(seats))).scalars().all()
+            ledger.apply(conn, [(user_id, to_minor(payout)) for user_id in paid],
+                         'payout', ref=f"game:{game.game_id}")
+
+    try:
+        ledger.wait(ledger.submit(settle))
+    except IntegrityError:
+        logger.info(f"Game {game.game_id} in chat {game.chat_id} is already settled")
+        return False
+
+    if payout and winner_id:
+        logger.info(f"Winner {winner_id} received {payout} coins")
+    elif payout:
+        logger.info(f"Draw - returned {payout} coins to both players")
+    return True
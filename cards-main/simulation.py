@@ -0,0 +1,298 @@
+"""Vectorized Monte Carlo simulator for two-player blackjack
+
+Plays whole batches of tables at once with NumPy under the same rules as
+GameManager in game_logic.py:
+
+- one card to each player on join, player 1 moves first;
+- every hit passes the turn to the opponent, a player who has stood
+  just passes;
+- a bust without a split ends the game at once and the opponent wins;
+- one split of a two-card pair; the split itself does not pass the turn,
+  a bust on the first hand moves play to the second one, and the game
+  result is decided on the main hand score as in _finish_game.
+
+Both players follow a fixed strategy: hit below ``stand_on`` and split
+pairs whose rank is in ``split_ranks``. ``--verify`` replays the same
+shoes through GameManager and checks that every result matches.
+
+Usage: python simulation.py [--hands 10000000] [--p1-stand 17] [--p2-stand 17]
+"""
+import argparse
+import time
+from array import array
+
+import numpy as np
+
+from game_logic import (
+    CARD_IS_ACE, CARD_STRINGS, CARD_VALUES, DECKS_PER_SHOE, RANKS, SUITS,
+    GameManager, Shoe, ShoePool
+)
+
+PLAYER1_WINS, PLAYER2_WINS, DRAW = 0, 1, 2
+RESULT_NAMES = ('player1_wins', 'player2_wins', 'draw')
+
+# Upper bound of cards dealt at one table (4 hands of at most ~11 cards)
+MAX_CARDS = 64
+
+VALUES = np.frombuffer(CARD_VALUES, dtype=np.uint8).astype(np.int16)
+IS_ACE = np.frombuffer(CARD_IS_ACE, dtype=np.uint8).astype(np.int16)
+RANK_OF = np.arange(len(CARD_STRINGS), dtype=np.int16) // len(SUITS)
+
+def deal_shoes(rng, tables, decks=DECKS_PER_SHOE, cards=MAX_CARDS):
+    """First ``cards`` cards of ``tables`` independently shuffled shoes
+
+    Only the dealt prefix is shuffled (a partial Fisher-Yates per table),
+    which is all a table ever sees of its shoe.
+    """
+    base = np.tile(np.arange(len(CARD_STRINGS), dtype=np.uint8), decks)
+    # Laid out card-major so that each dealt position is one contiguous row
+    shoes = np.repeat(base[:, None], tables, axis=1)
+    flat = shoes.reshape(-1)
+    offsets = np.arange(tables)
+    for i in range(cards):
+        j = rng.integers(i, base.size, size=tables) * tables + offsets
+        picked = flat[j]
+        flat[j] = shoes[i]
+        shoes[i] = picked
+    return np.ascontiguousarray(shoes[:cards].T)
+
+class Batch:
+    """State of a batch of tables, indexed [table, player, hand]"""
+
+    def __init__(self, shoes, stand_on, split_ranks):
+        n = len(shoes)
+        self.n = n
+        self.shoes = shoes
+        self.stand_on = np.asarray(stand_on, dtype=np.int16)
+        self.split_mask = np.zeros(len(RANKS), dtype=bool)
+        for rank in split_ranks:
+            self.split_mask[RANKS.index(rank)] = True
+
+        self.cursor = np.zeros(n, dtype=np.int16)
+        self.score = np.zeros((n, 2, 2), dtype=np.int16)
+        self.soft = np.zeros((n, 2, 2), dtype=np.int16)
+        self.ncards = np.zeros((n, 2, 2), dtype=np.int16)
+        self.opening = np.zeros((n, 2, 2), dtype=np.uint8)  # first two main-hand cards
+        self.has_split = np.zeros((n, 2), dtype=bool)
+        self.active_hand = np.zeros((n, 2), dtype=np.int8)
+        self.stood = np.zeros((n, 2), dtype=bool)
+        self.turn = np.zeros(n, dtype=np.int8)
+        self.playing = np.ones(n, dtype=bool)
+        self.result = np.full(n, -1, dtype=np.int8)
+        self.by_bust = np.zeros(n, dtype=bool)
+
+    def deal(self, idx, player, hand):
+        """Deal the next card of each table in ``idx`` to one hand"""
+        if not len(idx):
+            return
+        if self.cursor[idx].max() >= self.shoes.shape[1]:
+            raise RuntimeError('simulated shoe prefix exhausted; raise MAX_CARDS')
+        code = self.shoes[idx, self.cursor[idx]]
+        self.cursor[idx] += 1
+
+        held = self.ncards[idx, player, hand]
+        first = (hand == 0) & (held < 2)
+        self.opening[idx[first], player[first], held[first]] = code[first]
+        self.ncards[idx, player, hand] = held + 1
+
+        score = self.score[idx, player, hand] + VALUES[code]
+        soft = self.soft[idx, player, hand] + IS_ACE[code]
+        # Adjust for aces (one card never needs more than two steps)
+        for _ in range(2):
+            demote = (score > 21) & (soft > 0)
+            score -= 10 * demote
+            soft -= demote
+        self.score[idx, player, hand] = score
+        self.soft[idx, player, hand] = soft
+
+    def pass_turn(self, idx):
+        self.turn[idx] ^= 1
+
+    def finish(self, idx):
+        """Compare main hand scores like GameManager._finish_game"""
+        self.playing[idx] = False
+        s1 = self.score[idx, 0, 0]
+        s2 = self.score[idx, 1, 0]
+        result = np.where(s1 > s2, PLAYER1_WINS, np.where(s2 > s1, PLAYER2_WINS, DRAW))
+        result = np.where(s1 > 21, PLAYER2_WINS, result)
+        result = np.where(s2 > 21, PLAYER1_WINS, result)
+        result = np.where((s1 > 21) & (s2 > 21), DRAW, result)
+        self.result[idx] = result
+
+    def end_turn(self, idx, player):
+        """Player is done: stand, then finish or pass the turn"""
+        self.stood[idx, player] = True
+        both = self.stood[idx, 0] & self.stood[idx, 1]
+        self.finish(idx[both])
+        self.pass_turn(idx[~both])
+
+    def split(self, idx, player):
+        first = self.opening[idx, player, 0]
+        second = self.opening[idx, player, 1]
+        self.has_split[idx, player] = True
+        self.active_hand[idx, player] = 0
+        for hand, code in ((0, first), (1, second)):
+            self.score[idx, player, hand] = VALUES[code]
+            self.soft[idx, player, hand] = IS_ACE[code]
+            self.ncards[idx, player, hand] = 1
+        self.deal(idx, player, np.zeros_like(player))
+        self.deal(idx, player, np.ones_like(player))
+
+    def step(self):
+        """One action of the player to move at every unfinished table"""
+        idx = np.nonzero(self.playing)[0]
+        player = self.turn[idx]
+
+        stood = self.stood[idx, player]
+        self.pass_turn(idx[stood])
+        idx, player = idx[~stood], player[~stood]
+
+        can_split = (
+            ~self.has_split[idx, player]
+            & (self.ncards[idx, player, 0] == 2)
+            & (RANK_OF[self.opening[idx, player, 0]] == RANK_OF[self.opening[idx, player, 1]])
+            & self.split_mask[RANK_OF[self.opening[idx, player, 0]]]
+        )
+        self.split(idx[can_split], player[can_split])
+        idx, player = idx[~can_split], player[~can_split]
+
+        hand = self.active_hand[idx, player]
+        split = self.has_split[idx, player]
+        hits = self.score[idx, player, hand] < self.stand_on[player]
+
+        # Stand, or move from the first split hand to the second one
+        rest = ~hits
+        switch = rest & split & (hand == 0)
+        self.active_hand[idx[switch], player[switch]] = 1
+        done = rest & ~switch
+        self.end_turn(idx[done], player[done])
+
+        idx, player, hand, split = idx[hits], player[hits], hand[hits], split[hits]
+        self.deal(idx, player, hand)
+        bust = self.score[idx, player, hand] > 21
+
+        ok = ~bust
+        self.pass_turn(idx[ok])
+
+        bust_switch = bust & split & (hand == 0)
+        self.active_hand[idx[bust_switch], player[bust_switch]] = 1
+
+        split_done = bust & split & (hand == 1)
+        self.end_turn(idx[split_done], player[split_done])
+
+        lost = bust & ~split
+        lost_idx = idx[lost]
+        self.playing[lost_idx] = False
+        self.by_bust[lost_idx] = True
+        self.result[lost_idx] = np.where(player[lost] == 0, PLAYER2_WINS, PLAYER1_WINS)
+
+    def run(self):
+        self.deal(np.arange(self.n), np.zeros(self.n, dtype=np.int8), np.zeros(self.n, dtype=np.int8))
+        self.deal(np.arange(self.n), np.ones(self.n, dtype=np.int8), np.zeros(self.n, dtype=np.int8))
+        while self.playing.any():
+            self.step()
+        return self
+
+def simulate(hands, batch_size=20_000, stand_on=(17, 17), split_ranks=('A', '8'), seed=None):
+    """Simulate ``hands`` games and return outcome counts and throughput"""
+    rng = np.random.default_rng(seed)
+    counts = np.zeros(3, dtype=np.int64)
+    busts = np.zeros(2, dtype=np.int64)
+    splits = np.zeros(2, dtype=np.int64)
+    start = time.perf_counter()
+
+    remaining = hands
+    while remaining > 0:
+        size = min(batch_size, remaining)
+        batch = Batch(deal_shoes(rng, size), stand_on, split_ranks).run()
+        counts += np.bincount(batch.result, minlength=3)
+        # A bust loss is recorded as a win for the other player
+        busts += np.bincount(1 - batch.result[batch.by_bust], minlength=2)
+        splits += batch.has_split.sum(axis=0)
+        remaining -= size
+
+    elapsed = time.perf_counter() - start
+    return {
+        'hands': hands,
+        'results': {name: int(c) for name, c in zip(RESULT_NAMES, counts)},
+        'bust_losses': {'player1': int(busts[0]), 'player2': int(busts[1])},
+        'splits': {'player1': int(splits[0]), 'player2': int(splits[1])},
+        'seconds': elapsed,
+        'hands_per_second': hands / elapsed if elapsed else float('inf')
+    }
+
+def replay(manager, shoe, stand_on=(17, 17), split_ranks=('A', '8')):
+    """Play one shoe prefix through GameManager with the same strategy"""
+    manager.create_game(1, 1, 'p1')
+    manager.games[1].deck = Shoe(array('B', shoe.tobytes()))
+    manager.join_game(1, 2, 'p2')
+    game = manager.games[1]
+
+    while True:
+        user_id = game.turn
+        player = game.seat(user_id)
+        threshold = stand_on[0 if user_id == 1 else 1]
+
+        if player.stand:
+            result = manager.stand(1, user_id)
+        elif (not player.split_hands and len(player.cards) == 2
+              and player.cards[0][:-1] == player.cards[1][:-1]
+              and player.cards[0][:-1] in split_ranks):
+            result = manager.split_hand(1, user_id)
+        else:
+            if player.current_hand().score < threshold:
+                result = manager.hit(1, user_id)
+            elif player.split_hands:
+                result = manager.switch_split_hand(1, user_id)
+            else:
+                result = manager.stand(1, user_id)
+
+        if 'error' in result:
+            raise AssertionError(result['error'])
+        if result['result'] == 'bust':
+            return (PLAYER1_WINS if result['winner_id'] == 1 else PLAYER2_WINS), True
+        if result['result'] == 'finished':
+            return RESULT_NAMES.index(result['game_result']), False
+
+def verify(hands, stand_on=(17, 17), split_ranks=('A', '8'), seed=None):
+    """Check the vectorized results against GameManager, table by table"""
+    shoes = deal_shoes(np.random.default_rng(seed), hands)
+    batch = Batch(shoes, stand_on, split_ranks).run()
+    manager = GameManager(ShoePool(size=1))
+    for i in range(hands):
+        expected = replay(manager, shoes[i], stand_on, split_ranks)
+        got = (int(batch.result[i]), bool(batch.by_bust[i]))
+        if got != expected:
+            cards = [CARD_STRINGS[c] for c in shoes[i][:batch.cursor[i]]]
+            raise AssertionError(f"table {i}: simulated {got}, GameManager {expected}, cards {cards}")
+    return hands
+
+def main():
+    parser = argparse.ArgumentParser(description='Blackjack Monte Carlo simulator')
+    parser.add_argument('--hands', type=int, default=10_000_000)
+    parser.add_argument('--batch', type=int, default=20_000)
+    parser.add_argument('--p1-stand', type=int, default=17)
+    parser.add_argument('--p2-stand', type=int, default=17)
+    parser.add_argument('--split', default='A,8', help="ranks to split, e.g. 'A,8' or '' for none")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--verify', type=int, default=0, help='replay N tables through GameManager first')
+    args = parser.parse_args()
+
+    stand_on = (args.p1_stand, args.p2_stand)
+    split_ranks = tuple(r for r in args.split.split(',') if r)
+
+    if args.verify:
+        verify(args.verify, stand_on, split_ranks, args.seed)
+        print(f"verified {args.verify:,} tables against GameManager")
+
+    stats = simulate(args.hands, args.batch, stand_on, split_ranks, args.seed)
+    hands = stats['hands']
+    print(f"hands: {hands:,}  ({stats['seconds']:.2f}s, {stats['hands_per_second']:,.0f} hands/s)")
+    for name, count in stats['results'].items():
+        print(f"  {name:<13} {count:>12,}  {count / hands:7.2%}")
+    for player in ('player1', 'player2'):
+        print(f"  {player} bust losses {stats['bust_losses'][player]:,} "
+              f"({stats['bust_losses'][player] / hands:.2%}), splits {stats['splits'][player]:,}")
+
+if __name__ == '__main__':
+    main()
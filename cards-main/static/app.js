@@ -46,6 +46,7 @@ console.log('Chat ID:', chatId, 'User ID:', userId, 'Username:', username);
 let gameState = null;
 let isMyTurn = false;
 let gameUpdateInterval = null;
+let gameEvents = null;
 
 // Initialize app
 document.addEventListener('DOMContentLoaded', function() {
@@ -74,7 +75,7 @@ async function checkExistingGame() {
                 // User is already in the game, start playing
                 gameState = game;
                 updateGameDisplay();
-                gameUpdateInterval = setInterval(fetchGame, 3000);
+                startGameUpdates();
                 return;
             } else if (!game.player2) {
                 // Game exists but needs second player, try to join
@@ -115,7 +116,7 @@ async function tryJoinExistingGame() {
             // Successfully joined, start game
             gameState = data.game;
             updateGameDisplay();
-            gameUpdateInterval = setInterval(fetchGame, 3000);
+            startGameUpdates();
             showMessage('Ви успішно приєдналися до гри!', 'success');
         } else {
             showError(data.error || 'Не вдалося приєднатися до гри');
@@ -156,7 +157,7 @@ async function startGameWithStake() {
         const data = await response.json();
         if (data.success) {
             fetchGame();
-            gameUpdateInterval = setInterval(fetchGame, 3000);
+            startGameUpdates();
         } else {
             showError(data.error || 'Помилка створення гри');
         }
@@ -165,6 +166,46 @@ async function startGameWithStake() {
     }
 }
 
+// Live game updates: Server-Sent Events, polling as a fallback
+function startGameUpdates() {
+    stopGameUpdates();
+    
+    if (!window.EventSource) {
+        gameUpdateInterval = setInterval(fetchGame, 3000);
+        return;
+    }
+    
+    gameEvents = new EventSource(`/api/game/${chatId}/events`);
+    gameEvents.onmessage = function(event) {
+        const data = JSON.parse(event.data);
+        if (data.game) {
+            gameState = data.game;
+            updateGameDisplay();
+        }
+    };
+    gameEvents.addEventListener('closed', function() {
+        stopGameUpdates();
+    });
+    gameEvents.onerror = function() {
+        // EventSource reconnects by itself; fall back to polling only if it gave up
+        if (gameEvents && gameEvents.readyState === EventSource.CLOSED) {
+            gameEvents = null;
+            gameUpdateInterval = setInterval(fetchGame, 3000);
+        }
+    };
+}
+
+function stopGameUpdates() {
+    if (gameEvents) {
+        gameEvents.close();
+        gameEvents = null;
+    }
+    if (gameUpdateInterval) {
+        clearInterval(gameUpdateInterval);
+        gameUpdateInterval = null;
+    }
+}
+
 // Main functions
 async function fetchGame() {
     if (!chatId) {
@@ -215,7 +256,7 @@ async function hit() {
         } else if (data.result === 'finished') {
             showMessage(data.message, 'success');
             if (tg) tg.showAlert(data.message);
-            clearInterval(gameUpdateInterval);
+            stopGameUpdates();
         }
     } catch (error) {
         console.error('Hit error:', error);
@@ -246,7 +287,7 @@ async function stand() {
         if (data.result === 'finished') {
             showMessage(data.message, 'success');
             if (tg) tg.showAlert(data.message);
-            clearInterval(gameUpdateInterval);
+            stopGameUpdates();
         }
     } catch (error) {
         console.error('Stand error:', error);
@@ -429,7 +470,7 @@ async function pollRematchStatus() {
                 gameState = data.game;
                 updateGameDisplay();
                 showMessage('Реванш почався!', 'success');
-                gameUpdateInterval = setInterval(fetchGame, 3000);
+                startGameUpdates();
                 return;
             }
         } catch {}
@@ -440,11 +481,8 @@ async function pollRematchStatus() {
 
 async function endGame() {
     try {
-        // Clear any intervals
-        if (gameUpdateInterval) {
-            clearInterval(gameUpdateInterval);
-            gameUpdateInterval = null;
-        }
+        // Stop live updates
+        stopGameUpdates();
         
         // Clear rematch requests
         rematchRequested = false;
@@ -522,7 +560,7 @@ async function acceptRematch() {
             updateGameDisplay();
             showMessage('Реванш почався!', 'success');
             // Start polling for game updates
-            gameUpdateInterval = setInterval(fetchGame, 3000);
+            startGameUpdates();
         } else if (data.success && !data.rematch) {
             // Waiting for other player
             showMessage('Очікуємо відповідь суперника...', 'info');
@@ -662,22 +700,17 @@ function showMessage(message, type = 'success') {
 // Handle page visibility changes to pause/resume updates
 document.addEventListener('visibilitychange', function() {
     if (document.hidden) {
-        if (gameUpdateInterval) {
-            clearInterval(gameUpdateInterval);
-        }
+        stopGameUpdates();
     } else {
         if (chatId && gameState && gameState.status === 'playing') {
-            fetchGame();
-            gameUpdateInterval = setInterval(fetchGame, 3000);
+            startGameUpdates();
         }
     }
 });
 
 // Handle page unload
 window.addEventListener('beforeunload', function() {
-    if (gameUpdateInterval) {
-        clearInterval(gameUpdateInterval);
-    }
+    stopGameUpdates();
 });
 
 // Demo mode for browser testing
@@ -726,7 +759,7 @@ function createDemoGame() {
         if (data.success) {
             // Start fetching game state
             fetchGame();
-            gameUpdateInterval = setInterval(fetchGame, 3000);
+            startGameUpdates();
         } else {
             showError(data.error || 'Помилка створення демо гри');
         }
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+
+import aiohttp
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Заголовки для тунелів (localtunnel / ngrok), потрібні для кожного запиту
+DEFAULT_HEADERS = {
+    "bypass-tunnel-reminder": "true",
+    "ngrok-skip-browser-warning": "1"
+}
+
+# Статуси від проксі/тунелю, після яких запит до API варто повторити
+RETRY_STATUSES = {502, 503, 504}
+
+class ApiResponse:
+    """Відповідь API, прочитана до закриття з'єднання"""
+    __slots__ = ('status_code', '_data')
+
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self._data = data
+
+    def json(self):
+        return self._data
+
+class GamesApiClient:
+    """Спільний асинхронний HTTP клієнт до BlackJack та Buckshot API"""
+
+    def __init__(self, timeout=None, max_connections=None, retries=None, backoff=None):
+        self.timeout = aiohttp.ClientTimeout(total=timeout or config.API_TIMEOUT)
+        self.max_connections = max_connections or config.API_MAX_CONNECTIONS
+        self.retries = config.API_RETRIES if retries is None else retries
+        self.backoff = config.API_RETRY_BACKOFF if backoff is None else backoff
+        self._session = None
+
+    async def start(self):
+        """Відкрити пул з'єднань (викликається на старті Dispatcher)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections,
+                keepalive_timeout=30
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers=DEFAULT_HEADERS
+            )
+            logger.info(f"Games API client started (max {self.max_connections} connections)")
+
+    async def close(self):
+        """Закрити пул з'єднань (викликається при зупинці Dispatcher)"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("Games API client closed")
+        self._session = None
+
+    async def post(self, url, json=None, timeout=None, idempotent=False):
+        """POST запит з повторами
+
+        Помилку встановлення з'єднання (запит ще не надіслано) повторюємо
+        завжди. Обрив з'єднання та 502/503/504 повторюємо лише для
+        ідемпотентних запитів: сервер міг уже виконати перший. Приєднання
+        до сесії ідемпотентне (API повертає гру гравцю, що вже приєднався),
+        створення сесії - ні: повтор створив би ще одну.
+        """
+        if self._session is None or self._session.closed:
+            await self.start()
+
+        # Без власного timeout діє API_TIMEOUT сесії (timeout=None вимкнув би його)
+        options = {'timeout': aiohttp.ClientTimeout(total=timeout)} if timeout else {}
+        attempt = 0
+        while True:
+            try:
+                async with self._session.post(url, json=json, **options) as response:
+                    if response.status in RETRY_STATUSES and idempotent and attempt < self.retries:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history, status=response.status
+                        )
+                    try:
+                        data = await response.json(content_type=None)
+                    except ValueError:
+                        data = {}
+                    return ApiResponse(response.status, data)
+            except (aiohttp.ClientConnectionError, aiohttp.ClientResponseError) as e:
+                unsent = isinstance(e, aiohttp.ClientConnectorError)
+                if attempt >= self.retries or not (unsent or idempotent):
+                    raise
+                attempt += 1
+                delay = self.backoff * 2 ** (attempt - 1)
+                logger.warning(f"API request to {url} failed ({e}), retry {attempt}/{self.retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+api_client = GamesApiClient()
@@ -0,0 +1,104 @@
+"""Micro-benchmark: nested get_text vs precompiled flat translation tables.
+
+Builds get_main_menu_keyboard() (bypassing the keyboard cache) with the
+old nested-dict lookup (a copy of the previous Localization.get_text)
+patched into keyboards.py, then with the compiled tables, and compares
+that to a cached render. Also times the bare get_text calls.
+
+Each measurement is the best of --repeat runs.
+
+Usage: python bench_localization.py [--renders 50000] [--lookups 1000000] [--repeat 5]
+"""
+import argparse
+import time
+
+import keyboards
+import localization
+from localization import localization as loc
+
+def nested_get_text(locale, key, **kwargs):
+    """Previous implementation: walk nested dicts on every call"""
+    if locale not in loc.translations:
+        locale = "uk"
+    keys = key.split('.')
+    value = loc.translations[locale]
+    try:
+        for k in keys:
+            value = value[k]
+    except (KeyError, TypeError):
+        if locale != "uk":
+            return nested_get_text("uk", key, **kwargs)
+        return f"Missing translation: {key}"
+    if isinstance(value, str) and kwargs:
+        try:
+            return value.format(**kwargs)
+        except KeyError:
+            return value
+    return str(value)
+
+def all_keys():
+    keys = set()
+    for table in loc.tables.values():
+        keys.update(table)
+    return sorted(keys) + ["bot.no_such_key", "bot.welcome.deeper"]
+
+def check():
+    samples = [{}, {"chat_id": 123456, "player_name": "Ann"}, {"name": "x"},
+               {"round": 2, "max": 3, "current": 1, "next": 2, "damage": 1,
+                "shell": "live", "type": "beer", "count": 4, "creator_name": "Bob",
+                "chat_id": 1, "player_name": "Ann", "name": "n"}]
+    for locale in list(loc.tables) + ["xx"]:
+        for key in all_keys():
+            for kwargs in samples:
+                old = nested_get_text(locale, key, **kwargs)
+                new = loc.get_text(locale, key, **kwargs)
+                assert old == new, (locale, key, kwargs, old, new)
+
+def bench_renders(get_text, renders, locales, render=keyboards.get_main_menu_keyboard.__wrapped__):
+    keyboards.get_text = get_text
+    try:
+        start = time.perf_counter()
+        for i in range(renders):
+            render(locales[i % len(locales)])
+        return time.perf_counter() - start
+    finally:
+        keyboards.get_text = localization.get_text
+
+def bench_lookups(get_text, lookups, locales):
+    start = time.perf_counter()
+    for i in range(lookups):
+        get_text(locales[i % len(locales)], "buttons.buckshot")
+        get_text(locales[i % len(locales)], "games.buckshot.joined", chat_id=i, player_name="Ann")
+    return time.perf_counter() - start
+
+def best(repeat, fn, *args):
+    return min(fn(*args) for _ in range(repeat))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--renders', type=int, default=50_000)
+    parser.add_argument('--lookups', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    check()
+    locales = loc.get_available_locales()
+
+    old = best(args.repeat, bench_renders, nested_get_text, args.renders, locales)
+    new = best(args.repeat, bench_renders, localization.get_text, args.renders, locales)
+    print(f"get_main_menu_keyboard x {args.renders:,}")
+    print(f"  nested get_text:  {old / args.renders * 1e6:.2f} us/render")
+    print(f"  flat tables:      {new / args.renders * 1e6:.2f} us/render  ({old / new:.2f}x)")
+    cached = best(args.repeat, bench_renders, localization.get_text, args.renders, locales,
+                  keyboards.get_main_menu_keyboard)
+    print(f"  cached markup:    {cached / args.renders * 1e6:.2f} us/render  ({old / cached:.0f}x)")
+
+    old = best(args.repeat, bench_lookups, nested_get_text, args.lookups, locales)
+    new = best(args.repeat, bench_lookups, localization.get_text, args.lookups, locales)
+    calls = args.lookups * 2
+    print(f"get_text x {calls:,} (plain + formatted)")
+    print(f"  nested get_text:  {old / calls * 1e9:.0f} ns/call")
+    print(f"  flat tables:      {new / calls * 1e9:.0f} ns/call  ({old / new:.2f}x)")
+
+if __name__ == '__main__':
+    main()
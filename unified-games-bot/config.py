@@ -14,6 +14,16 @@ WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
 WEBAPP_HOST = os.getenv('WEBAPP_HOST', 'localhost')
 WEBAPP_PORT = int(os.getenv('WEBAPP_PORT', 8080))
 
+# Webhook update scheduler: updates processed at once, and updates in flight before answering 503
+UPDATE_CONCURRENCY = int(os.getenv('UPDATE_CONCURRENCY', 64))
+UPDATE_QUEUE_LIMIT = int(os.getenv('UPDATE_QUEUE_LIMIT', 1000))
+
+# Multi-worker webhook: worker processes on WEBAPP_PORT (SO_REUSEPORT); worker i also
+# listens on 127.0.0.1:WORKER_PORT_BASE + i for updates of its users forwarded by other workers
+WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', 1))
+WORKER_PORT_BASE = int(os.getenv('WORKER_PORT_BASE', WEBAPP_PORT + 1))
+WORKER_SHUTDOWN_TIMEOUT = float(os.getenv('WORKER_SHUTDOWN_TIMEOUT', 30))
+
 # BlackJack Configuration
 BLACKJACK_WEBAPP_URL = os.getenv('BLACKJACK_WEBAPP_URL', 'https://35233836d1c6.ngrok-free.app')
 BLACKJACK_FLASK_API_URL = os.getenv('BLACKJACK_FLASK_API_URL', 'http://localhost:5000')
@@ -22,5 +32,24 @@ BLACKJACK_FLASK_API_URL = os.getenv('BLACKJACK_FLASK_API_URL', 'http://localhost
 BUCKSHOT_WEBAPP_URL = os.getenv('BUCKSHOT_WEBAPP_URL', 'https://krok1buckshot.loca.lt')
 BUCKSHOT_API_URL = os.getenv('BUCKSHOT_API_URL', 'http://localhost:5001')
 
+# Games API client Configuration
+API_TIMEOUT = float(os.getenv('API_TIMEOUT', 10))
+API_MAX_CONNECTIONS = int(os.getenv('API_MAX_CONNECTIONS', 20))
+API_RETRIES = int(os.getenv('API_RETRIES', 2))
+API_RETRY_BACKOFF = float(os.getenv('API_RETRY_BACKOFF', 0.5))
+
 # Database Configuration
-DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///unified_games.db') 
\ No newline at end of file
+DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///unified_games.db')
+
+# FSM storage Configuration: "memory" or "sqlite:///fsm.db" (TTL and flush interval in seconds).
+# The cache is safe with WEBHOOK_WORKERS > 1 (each user is pinned to one worker); only
+# independent bot processes sharing the file need FSM_FLUSH_INTERVAL=0 and FSM_CACHE_TTL=0
+FSM_STORAGE = os.getenv('FSM_STORAGE', 'sqlite:///fsm.db')
+FSM_CACHE_TTL = float(os.getenv('FSM_CACHE_TTL', 300))
+FSM_FLUSH_INTERVAL = float(os.getenv('FSM_FLUSH_INTERVAL', 1))
+FSM_STATE_TTL = float(os.getenv('FSM_STATE_TTL', 7 * 24 * 3600))
+
+# User cache Configuration (TTL and flush interval in seconds)
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', 600))
+USER_FLUSH_INTERVAL = float(os.getenv('USER_FLUSH_INTERVAL', 5)) 
\ No newline at end of file
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+logger = logging.getLogger(__name__)
+
+class _Entry:
+    __slots__ = ('state', 'data', 'dirty', 'loaded_at')
+
+    def __init__(self, state, data, loaded_at):
+        self.state = state
+        self.data = data
+        self.dirty = False
+        self.loaded_at = loaded_at
+
+class SQLiteStorage(BaseStorage):
+    """FSM storage у SQLite (WAL) з кешем у пам'яті.
+
+    flush_interval > 0 - write-back: зміни пишуться пачкою раз на інтервал і при close();
+    flush_interval = 0 - write-through, кожна зміна одразу в БД.
+    Чисті записи кешу живуть cache_ttl секунд; cache_ttl = 0 - читання завжди з БД.
+    Кеш безпечний, доки стан кожного користувача змінює лише один процес: так
+    працює і кілька webhook-воркерів (WEBHOOK_WORKERS > 1), бо кожен користувач
+    закріплений за своїм воркером. Лише незалежним процесам без такої
+    маршрутизації на одному файлі потрібні flush_interval = 0 і cache_ttl = 0.
+    Стани, що не змінювались state_ttl секунд, видаляються з БД.
+    Дані стану мають бути JSON-серіалізовними.
+    """
+
+    def __init__(self, path: str, cache_ttl: float = 300, flush_interval: float = 1.0,
+                 state_ttl: float = 7 * 24 * 3600):
+        self.path = path
+        self.cache_ttl = cache_ttl
+        self.flush_interval = flush_interval
+        self.state_ttl = state_ttl
+        self._cache: Dict[str, _Entry] = {}
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fsm ("
+            " key TEXT PRIMARY KEY, state TEXT, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_fsm_updated_at ON fsm (updated_at)")
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._last_purge = 0.0
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        return ":".join(str(part) for part in (
+            key.bot_id, key.chat_id, key.user_id, key.thread_id,
+            key.business_connection_id, key.destiny
+        ))
+
+    # --- Синхронна частина, виконується в потоці ---
+
+    def _load(self, key: str):
+        with self._db_lock:
+            return self._conn.execute("SELECT state, data FROM fsm WHERE key = ?", (key,)).fetchone()
+
+    def _write(self, rows):
+        """rows: (key, state, data_json); порожній стан без даних - видалення"""
+        now = time.time()
+        upserts = [(key, state, data, now) for key, state, data in rows if state is not None or data != "{}"]
+        deletes = [(key,) for key, state, data in rows if state is None and data == "{}"]
+        with self._db_lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO fsm (key, state, data, updated_at) VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT(key) DO UPDATE SET state = excluded.state, data = excluded.data,"
+                    " updated_at = excluded.updated_at",
+                    upserts
+                )
+                self._conn.executemany("DELETE FROM fsm WHERE key = ?", deletes)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _purge(self, older_than: float):
+        with self._db_lock:
+            return self._conn.execute("DELETE FROM fsm WHERE updated_at < ?", (older_than,)).rowcount
+
+    # --- Кеш ---
+
+    async def _entry(self, key: StorageKey) -> _Entry:
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._maintenance_loop())
+        k = self._key(key)
+        now = time.monotonic()
+        entry = self._cache.get(k)
+        if entry is not None and (entry.dirty or now - entry.loaded_at < self.cache_ttl):
+            return entry
+
+        row = await asyncio.to_thread(self._load, k)
+        entry = self._cache.get(k)
+        if entry is not None and entry.dirty:
+            return entry  # змінено, поки читали з БД
+        state, data = (row[0], json.loads(row[1])) if row else (None, {})
+        entry = self._cache[k] = _Entry(state, data, now)
+        return entry
+
+    async def _changed(self, key: StorageKey, entry: _Entry):
+        if self.flush_interval <= 0:
+            await asyncio.to_thread(self._write, [(self._key(key), entry.state, json.dumps(entry.data))])
+            entry.loaded_at = time.monotonic()
+            return
+        entry.dirty = True
+
+    async def flush(self) -> int:
+        """Записати всі змінені стани однією транзакцією"""
+        dirty = [(k, entry) for k, entry in self._cache.items() if entry.dirty]
+        if not dirty:
+            return 0
+        rows = [(k, entry.state, json.dumps(entry.data)) for k, entry in dirty]
+        for _, entry in dirty:
+            entry.dirty = False
+        try:
+            await asyncio.to_thread(self._write, rows)
+        except Exception as e:
+            logger.error(f"Error flushing {len(rows)} FSM states: {e}")
+            for _, entry in dirty:
+                entry.dirty = True
+            return 0
+        now = time.monotonic()
+        for _, entry in dirty:
+            entry.loaded_at = now
+        return len(rows)
+
+    def _evict(self):
+        """Прибрати з кешу чисті записи, старші за cache_ttl"""
+        deadline = time.monotonic() - self.cache_ttl
+        for k in [k for k, entry in self._cache.items() if not entry.dirty and entry.loaded_at < deadline]:
+            del self._cache[k]
+
+    async def _maintenance_loop(self):
+        interval = self.flush_interval if self.flush_interval > 0 else max(self.cache_ttl, 1)
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+            self._evict()
+            if self.state_ttl and time.time() - self._last_purge > 3600:
+                self._last_purge = time.time()
+                await asyncio.to_thread(self._purge, self._last_purge - self.state_ttl)
+
+    # --- BaseStorage ---
+
+    async def set_state(self, key: StorageKey, state=None) -> None:
+        entry = await self._entry(key)
+        entry.state = state.state if isinstance(state, State) else state
+        await self._changed(key, entry)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._entry(key)).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        entry = await self._entry(key)
+        entry.data = dict(data)
+        await self._changed(key, entry)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._entry(key)).data.copy()
+
+    async def close(self) -> None:
+        """Дописати кеш і закрити БД (Dispatcher викликає це сам при зупинці)"""
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+def create_storage(url: str, cache_ttl: float = 300, flush_interval: float = 1.0,
+                   state_ttl: float = 7 * 24 * 3600) -> BaseStorage:
+    """FSM storage за адресою: "memory" або "sqlite:///fsm.db" """
+    if url == "memory":
+        return MemoryStorage()
+    if url.startswith("sqlite:///"):
+        return SQLiteStorage(url[len("sqlite:///"):], cache_ttl=cache_ttl,
+                             flush_interval=flush_interval, state_ttl=state_ttl)
+    raise ValueError(f"Unsupported FSM storage: {url}")
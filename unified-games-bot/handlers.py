@@ -1,5 +1,4 @@
 import logging
-import requests
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
@@ -7,16 +6,21 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
 import config
+from api_client import api_client
 from keyboards import (
     get_main_menu_keyboard,
     get_buckshot_menu_keyboard,
     get_blackjack_menu_keyboard,
     get_back_keyboard,
     get_webapp_keyboard,
-    get_language_keyboard
+    get_language_keyboard,
+    get_buckshot_session_keyboard,
+    get_blackjack_session_keyboard,
+    get_buckshot_invite_keyboard,
+    get_blackjack_invite_keyboard
 )
 from localization import get_text
-from models import get_user_language, create_or_update_user, update_user_language
+from user_cache import get_user_language, set_user_language, remember_user
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -29,20 +33,13 @@ class GameStates(StatesGroup):
 @router.message(Command("start"))
 async def cmd_start(message: Message):
     """Обробник команди /start"""
-    # Створити або оновити користувача
-    from models import SessionLocal
-    db = SessionLocal()
-    try:
-        user = create_or_update_user(
-            db, 
-            message.from_user.id,
-            message.from_user.username,
-            message.from_user.first_name,
-            message.from_user.last_name
-        )
-        locale = user.language
-    finally:
-        db.close()
+    # Профіль зберігається пачкою у фоні, мова береться з кешу
+    locale = await remember_user(
+        message.from_user.id,
+        message.from_user.username,
+        message.from_user.first_name,
+        message.from_user.last_name
+    )
     
     await message.answer(
         get_text(locale, "bot.welcome"),
@@ -57,7 +54,7 @@ async def cmd_help(message: Message):
 @router.callback_query(F.data == "help")
 async def show_help(callback: CallbackQuery):
     """Показати допомогу"""
-    locale = get_user_language(None, callback.from_user.id)
+    locale = await get_user_language(callback.from_user.id)
     help_text = get_text(locale, "bot.help")
     
     await callback.message.edit_text(help_text, reply_markup=get_back_keyboard(locale))
@@ -66,7 +63,7 @@ async def show_help(callback: CallbackQuery):
 @router.callback_query(F.data == "rules")
 async def show_rules(callback: CallbackQuery):
     """Показати загальні правила"""
-    locale = get_user_language(None, callback.from_user.id)
+    locale = await get_user_language(callback.from_user.id)
     rules_text = get_text(locale, "bot.rules")
     
     await callback.message.edit_text(rules_text, reply_markup=get_back_keyboard(locale))
@@ -75,7 +72,7 @@ async def show_rules(callback: CallbackQuery):
 @router.callback_query(F.data == "game_buckshot")
 async def buckshot_menu(callback: CallbackQuery):
     """Меню Buckshot Roulette"""
-    locale = get_user_language(None, callback.from_user.id)
+    locale = await get_user_language(callback.from_user.id)
     await callback.message.edit_text(
         get_text(locale, "games.buckshot.name") + "\n\n" + get_text(locale, "games.buckshot.description"),
         reply_markup=get_buckshot_menu_keyboard(locale)
@@ -85,7 +82,7 @@ async def buckshot_menu(callback: CallbackQuery):
 @router.callback_query(F.data == "game_blackjack")
 async def blackjack_menu(callback: CallbackQuery):
     """Меню BlackJack"""
-    locale = get_user_language(None, callback.from_user.id)
+    locale = await get_user_language(callback.from_user.id)
     await callback.message.edit_text(
         get_text(locale, "games.blackjack.name") + "\n\n" + get_text(locale, "games.blackjack.description"),
         reply_markup=get_blackjack_menu_keyboard(locale)
@@ -95,7 +92,7 @@ async def blackjack_menu(callback: CallbackQuery):
 @router.callback_query(F.data == "rules_buckshot")
 async def buckshot_rules(callback: CallbackQuery):
     """Правила Buckshot Roulette"""
-    locale = get_user_language(None, callback.from_user.id)
+    locale = await get_user_language(callback.from_user.id)
     rules_text = get_text(locale, "games.buckshot.rules")
     
     await callback.message.edit_text(rules_text, reply_markup=get_back_keyboard(locale))
@@ -104,7 +101,7 @@ async def buckshot_rules(callback: CallbackQuery):
 @router.callback_query(F.data == "rules_blackjack")
 async def blackjack_rules(callback: CallbackQuery):
     """Правила BlackJack"""
-    locale = get_user_language(None, callback.from_user.id)
+    locale = await get_user_language(callback.from_user.id)
     rules_text = get_text(locale, "games.blackjack.rules")
     
     await callback.message.edit_text(rules_text, reply_markup=get_back_keyboard(locale))
@@ -117,23 +114,17 @@ async def handle_buckshot_game(callback: CallbackQuery):
     
     try:
         # Створюємо сесію через Buckshot API
-        import random
-        chat_id = random.randint(100000, 999999)
-        
+        # ID сесії видає API
         session_data = {
             "user_id": callback.from_user.id,
             "username": callback.from_user.username or callback.from_user.first_name,
             "mode": game_mode,
-            "chat_id": chat_id,
             "stake": 10.0
         }
         
-        response = requests.post(
+        response = await api_client.post(
             f"{config.BUCKSHOT_API_URL}/api/sessions",
-            json=session_data,
-            headers={
-                "bypass-tunnel-reminder": "true"
-            }
+            json=session_data
         )
         
         if response.status_code == 200:
@@ -142,38 +133,19 @@ async def handle_buckshot_game(callback: CallbackQuery):
             
             webapp_url = f"{config.BUCKSHOT_WEBAPP_URL}?chat_id={chat_id}&mode={game_mode}"
             
-            locale = get_user_language(None, callback.from_user.id)
+            locale = await get_user_language(callback.from_user.id)
             
             if game_mode == "test":
                 message_text = get_text(locale, "games.buckshot.session_created", chat_id=chat_id)
             else:
                 message_text = get_text(locale, "games.buckshot.session_created_real", chat_id=chat_id)
             
-            # Створюємо клавіатуру з кнопками
-            from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-            from aiogram.utils.keyboard import InlineKeyboardBuilder
-            
-            builder = InlineKeyboardBuilder()
-            builder.add(InlineKeyboardButton(
-                text=get_text(locale, "buttons.open_game"),
-                web_app={"url": webapp_url}
-            ))
-            builder.add(InlineKeyboardButton(
-                text=get_text(locale, "buttons.invite_player"),
-                callback_data=f"invite_buckshot_{chat_id}"
-            ))
-            builder.add(InlineKeyboardButton(
-                text=get_text(locale, "buttons.back"),
-                callback_data="back_to_main"
-            ))
-            builder.adjust(1)
-            
             await callback.message.edit_text(
                 message_text,
-                reply_markup=builder.as_markup()
+                reply_markup=get_buckshot_session_keyboard(webapp_url, chat_id, locale)
             )
         else:
-            locale = get_user_language(None, callback.from_user.id)
+            locale = await get_user_language(callback.from_user.id)
             await callback.message.edit_text(
                 get_text(locale, "errors.session_creation_failed"),
                 reply_markup=get_back_keyboard(locale)
@@ -181,7 +153,7 @@ async def handle_buckshot_game(callback: CallbackQuery):
     
     except Exception as e:
         logger.error(f"Error creating Buckshot session: {e}")
-        locale = get_user_language(None, callback.from_user.id)
+        locale = await get_user_language(callback.from_user.id)
         await callback.message.edit_text(
             get_text(locale, "errors.connection_failed"),
             reply_markup=get_back_keyboard(locale)
@@ -196,25 +168,17 @@ async def handle_blackjack_create(callback: CallbackQuery):
     
     try:
         # Створюємо сесію через Flask API
-        # Генеруємо унікальний chat_id
-        import random
-        chat_id = random.randint(100000, 999999)
-        
+        # ID сесії (chat_id) видає API
         session_data = {
             "user_id": callback.from_user.id,
             "username": callback.from_user.username or callback.from_user.first_name,
             "mode": game_mode,
-            "chat_id": chat_id,
             "stake": 10.0  # Ставка за замовчуванням
         }
         
-        response = requests.post(
+        response = await api_client.post(
             f"{config.BLACKJACK_FLASK_API_URL}/api/sessions",
-            json=session_data,
-            headers={
-                "bypass-tunnel-reminder": "true",
-                "ngrok-skip-browser-warning": "1"
-            }
+            json=session_data
         )
         
         if response.status_code == 200:
@@ -236,28 +200,9 @@ async def handle_blackjack_create(callback: CallbackQuery):
                     "Натисніть кнопку нижче, щоб відкрити гру:"
                 )
             
-            # Створюємо клавіатуру з двома кнопками
-            from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-            from aiogram.utils.keyboard import InlineKeyboardBuilder
-            
-            builder = InlineKeyboardBuilder()
-            builder.add(InlineKeyboardButton(
-                text="🎮 Відкрити BlackJack",
-                web_app={"url": webapp_url}
-            ))
-            builder.add(InlineKeyboardButton(
-                text="👥 Запросити гравця",
-                callback_data=f"invite_player_{chat_id}"
-            ))
-            builder.add(InlineKeyboardButton(
-                text="⬅️ Назад",
-                callback_data="back_to_main"
-            ))
-            builder.adjust(1)  # По одній кнопці в ряд
-            
             await callback.message.edit_text(
                 message_text,
-                reply_markup=builder.as_markup()
+                reply_markup=get_blackjack_session_keyboard(webapp_url, chat_id)
             )
         else:
             await callback.message.edit_text(
@@ -291,24 +236,9 @@ async def invite_player(callback: CallbackQuery):
         f"💰 Ставка: 10 монет (тестовий режим)"
     )
     
-    # Створюємо клавіатуру з кнопкою приєднання
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    from aiogram.utils.keyboard import InlineKeyboardBuilder
-    
-    builder = InlineKeyboardBuilder()
-    builder.add(InlineKeyboardButton(
-        text="🎮 Приєднатися до гри",
-        callback_data=f"join_game_{chat_id}"
-    ))
-    builder.add(InlineKeyboardButton(
-        text="❌ Відхилити",
-        callback_data="decline_invite"
-    ))
-    builder.adjust(1)
-    
     await callback.message.edit_text(
         invite_text,
-        reply_markup=builder.as_markup()
+        reply_markup=get_blackjack_invite_keyboard(chat_id)
     )
     await callback.answer()
 
@@ -316,30 +246,15 @@ async def invite_player(callback: CallbackQuery):
 async def invite_buckshot_player(callback: CallbackQuery):
     """Запросити гравця до гри Buckshot Roulette"""
     chat_id = callback.data.split("_")[2]
-    locale = get_user_language(None, callback.from_user.id)
+    locale = await get_user_language(callback.from_user.id)
     
     # Створюємо повідомлення для пересилання
     invite_text = get_text(locale, "games.buckshot.invite_text", 
                           chat_id=chat_id, creator_name=callback.from_user.first_name)
     
-    # Створюємо клавіатуру з кнопкою приєднання
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    from aiogram.utils.keyboard import InlineKeyboardBuilder
-    
-    builder = InlineKeyboardBuilder()
-    builder.add(InlineKeyboardButton(
-        text=get_text(locale, "buttons.join_game"),
-        callback_data=f"join_buckshot_{chat_id}"
-    ))
-    builder.add(InlineKeyboardButton(
-        text=get_text(locale, "buttons.decline"),
-        callback_data="decline_invite"
-    ))
-    builder.adjust(1)
-    
     await callback.message.edit_text(
         invite_text,
-        reply_markup=builder.as_markup()
+        reply_markup=get_buckshot_invite_keyboard(chat_id, locale)
     )
     await callback.answer()
 
@@ -355,13 +270,10 @@ async def join_game(callback: CallbackQuery):
             "username": callback.from_user.username or callback.from_user.first_name
         }
         
-        response = requests.post(
+        response = await api_client.post(
             f"{config.BLACKJACK_FLASK_API_URL}/api/sessions/{chat_id}/join",
             json=join_data,
-            headers={
-                "bypass-tunnel-reminder": "true",
-                "ngrok-skip-browser-warning": "1"
-            }
+            idempotent=True  # API returns the game to a player who already joined
         )
         
         if response.status_code == 200:
@@ -403,42 +315,26 @@ async def join_buckshot_game(callback: CallbackQuery):
             "username": callback.from_user.username or callback.from_user.first_name
         }
         
-        response = requests.post(
+        response = await api_client.post(
             f"{config.BUCKSHOT_API_URL}/api/sessions/{chat_id}/join",
             json=session_data,
-            headers={
-                "bypass-tunnel-reminder": "true"
-            }
+            idempotent=True  # API returns the game to a player who already joined
         )
         
         if response.status_code == 200:
             data = response.json()
             webapp_url = f"{config.BUCKSHOT_WEBAPP_URL}?chat_id={chat_id}&mode=test"
-            locale = get_user_language(None, callback.from_user.id)
+            locale = await get_user_language(callback.from_user.id)
             
             message_text = get_text(locale, "games.buckshot.joined", 
                                   chat_id=chat_id, player_name=callback.from_user.first_name)
             
-            from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-            from aiogram.utils.keyboard import InlineKeyboardBuilder
-            
-            builder = InlineKeyboardBuilder()
-            builder.add(InlineKeyboardButton(
-                text=get_text(locale, "buttons.open_game"),
-                web_app={"url": webapp_url}
-            ))
-            builder.add(InlineKeyboardButton(
-                text=get_text(locale, "buttons.back"),
-                callback_data="back_to_main"
-            ))
-            builder.adjust(1)
-            
             await callback.message.edit_text(
                 message_text,
-                reply_markup=builder.as_markup()
+                reply_markup=get_webapp_keyboard(webapp_url, locale=locale, one_per_row=True)
             )
         else:
-            locale = get_user_language(None, callback.from_user.id)
+            locale = await get_user_language(callback.from_user.id)
             await callback.message.edit_text(
                 get_text(locale, "errors.join_failed"),
                 reply_markup=get_back_keyboard(locale)
@@ -446,7 +342,7 @@ async def join_buckshot_game(callback: CallbackQuery):
     
     except Exception as e:
         logger.error(f"Error joining Buckshot game: {e}")
-        locale = get_user_language(None, callback.from_user.id)
+        locale = await get_user_language(callback.from_user.id)
         await callback.message.edit_text(
             get_text(locale, "errors.connection_failed"),
             reply_markup=get_back_keyboard(locale)
@@ -457,7 +353,7 @@ async def join_buckshot_game(callback: CallbackQuery):
 @router.callback_query(F.data == "decline_invite")
 async def decline_invite(callback: CallbackQuery):
     """Відхилити запрошення"""
-    locale = get_user_language(None, callback.from_user.id)
+    locale = await get_user_language(callback.from_user.id)
     await callback.message.edit_text(
         get_text(locale, "buttons.decline"),
         reply_markup=get_back_keyboard(locale)
@@ -467,7 +363,7 @@ async def decline_invite(callback: CallbackQuery):
 @router.callback_query(F.data == "language")
 async def language_menu(callback: CallbackQuery):
     """Меню вибору мови"""
-    locale = get_user_language(None, callback.from_user.id)
+    locale = await get_user_language(callback.from_user.id)
     await callback.message.edit_text(
         get_text(locale, "bot.select_language"),
         reply_markup=get_language_keyboard()
@@ -479,30 +375,24 @@ async def change_language(callback: CallbackQuery):
     """Змінити мову користувача"""
     new_language = callback.data.split("_")[1]  # uk, ru, en
     
-    # Оновити мову в базі даних
-    from models import SessionLocal
-    db = SessionLocal()
-    try:
-        success = update_user_language(db, callback.from_user.id, new_language)
-        if success:
-            await callback.message.edit_text(
-                get_text(new_language, "bot.language_changed"),
-                reply_markup=get_main_menu_keyboard(new_language)
-            )
-        else:
-            await callback.message.edit_text(
-                "❌ Помилка зміни мови",
-                reply_markup=get_main_menu_keyboard()
-            )
-    finally:
-        db.close()
+    # Оновити мову в базі даних (і в кеші)
+    if await set_user_language(callback.from_user.id, new_language):
+        await callback.message.edit_text(
+            get_text(new_language, "bot.language_changed"),
+            reply_markup=get_main_menu_keyboard(new_language)
+        )
+    else:
+        await callback.message.edit_text(
+            "❌ Помилка зміни мови",
+            reply_markup=get_main_menu_keyboard()
+        )
     
     await callback.answer()
 
 @router.callback_query(F.data == "back_to_main")
 async def back_to_main_menu(callback: CallbackQuery):
     """Повернутися до головного меню"""
-    locale = get_user_language(None, callback.from_user.id)
+    locale = await get_user_language(callback.from_user.id)
     await callback.message.edit_text(
         get_text(locale, "bot.welcome"),
         reply_markup=get_main_menu_keyboard(locale)
@@ -537,13 +427,10 @@ async def cmd_join(message: Message):
             "username": message.from_user.username or message.from_user.first_name
         }
         
-        response = requests.post(
+        response = await api_client.post(
             f"{config.BLACKJACK_FLASK_API_URL}/api/sessions/{chat_id}/join",
             json=join_data,
-            headers={
-                "bypass-tunnel-reminder": "true",
-                "ngrok-skip-browser-warning": "1"
-            }
+            idempotent=True  # API returns the game to a player who already joined
         )
         
         if response.status_code == 200:
@@ -575,7 +462,7 @@ async def cmd_join(message: Message):
 @router.message()
 async def handle_unknown_message(message: Message):
     """Обробник невідомих повідомлень"""
-    locale = get_user_language(None, message.from_user.id)
+    locale = await get_user_language(message.from_user.id)
     await message.answer(
         get_text(locale, "bot.unknown_message")
     ) 
\ No newline at end of file
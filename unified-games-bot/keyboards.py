@@ -1,7 +1,57 @@
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from functools import wraps
+
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from localization import get_text
+from localization import get_text, localization
+
+# (функція, аргументи) -> готова клавіатура або шаблон; спільні для всіх, не змінювати
+_keyboard_cache = {}
+
+def cached_keyboard(build):
+    """Будувати клавіатуру один раз на процес для кожного набору аргументів (мови)"""
+    @wraps(build)
+    def wrapper(*args):
+        key = (build.__name__,) + args
+        keyboard = _keyboard_cache.get(key)
+        if keyboard is None:
+            keyboard = _keyboard_cache[key] = build(*args)
+        return keyboard
+    return wrapper
 
+def clear_keyboard_cache():
+    """Скинути кеш клавіатур (після зміни перекладів)"""
+    _keyboard_cache.clear()
+
+# Кнопки містять тексти перекладів - після їх перезавантаження будуємо заново
+localization.add_reload_listener(clear_keyboard_cache)
+
+class KeyboardTemplate:
+    """Зібрана один раз розкладка, в якій підставляються лише callback_data та url"""
+    __slots__ = ('rows',)
+    
+    def __init__(self, markup: InlineKeyboardMarkup):
+        self.rows = tuple(
+            tuple(
+                (button.text, button.callback_data, button.web_app.url if button.web_app else None)
+                for button in row
+            )
+            for row in markup.inline_keyboard
+        )
+    
+    def fill(self, **values) -> InlineKeyboardMarkup:
+        """Підставити значення без InlineKeyboardBuilder та повторної валідації"""
+        construct = InlineKeyboardButton.model_construct
+        return InlineKeyboardMarkup.model_construct(inline_keyboard=[
+            [
+                construct(text=text, web_app=WebAppInfo.model_construct(url=url.format(**values)))
+                if url is not None else
+                construct(text=text, callback_data=callback_data.format(**values))
+                for text, callback_data, url in row
+            ]
+            for row in self.rows
+        ])
+
+@cached_keyboard
 def get_main_menu_keyboard(locale: str = "uk") -> InlineKeyboardMarkup:
     """Головне меню з вибором гри"""
     builder = InlineKeyboardBuilder()
@@ -30,6 +80,7 @@ def get_main_menu_keyboard(locale: str = "uk") -> InlineKeyboardMarkup:
     builder.adjust(2)  # 2 кнопки в ряд
     return builder.as_markup()
 
+@cached_keyboard
 def get_language_keyboard() -> InlineKeyboardMarkup:
     """Клавіатура вибору мови"""
     builder = InlineKeyboardBuilder()
@@ -54,6 +105,7 @@ def get_language_keyboard() -> InlineKeyboardMarkup:
     builder.adjust(1)  # 1 кнопка в ряд
     return builder.as_markup()
 
+@cached_keyboard
 def get_buckshot_menu_keyboard(locale: str = "uk") -> InlineKeyboardMarkup:
     """Меню для Buckshot Roulette"""
     builder = InlineKeyboardBuilder()
@@ -78,6 +130,7 @@ def get_buckshot_menu_keyboard(locale: str = "uk") -> InlineKeyboardMarkup:
     builder.adjust(2)
     return builder.as_markup()
 
+@cached_keyboard
 def get_blackjack_menu_keyboard(locale: str = "uk") -> InlineKeyboardMarkup:
     """Меню для BlackJack"""
     builder = InlineKeyboardBuilder()
@@ -102,6 +155,7 @@ def get_blackjack_menu_keyboard(locale: str = "uk") -> InlineKeyboardMarkup:
     builder.adjust(2)
     return builder.as_markup()
 
+@cached_keyboard
 def get_back_keyboard(locale: str = "uk") -> InlineKeyboardMarkup:
     """Кнопка назад"""
     builder = InlineKeyboardBuilder()
@@ -111,18 +165,94 @@ def get_back_keyboard(locale: str = "uk") -> InlineKeyboardMarkup:
     ))
     return builder.as_markup()
 
-def get_webapp_keyboard(url: str, text: str = None, locale: str = "uk") -> InlineKeyboardMarkup:
+@cached_keyboard
+def _webapp_template(text: str, locale: str, one_per_row: bool) -> KeyboardTemplate:
+    builder = InlineKeyboardBuilder()
+    builder.add(InlineKeyboardButton(
+        text=text,
+        web_app={"url": "{url}"}
+    ))
+    builder.add(InlineKeyboardButton(
+        text=get_text(locale, "buttons.back"), 
+        callback_data="back_to_main"
+    ))
+    if one_per_row:
+        builder.adjust(1)
+    return KeyboardTemplate(builder.as_markup())
+
+def get_webapp_keyboard(url: str, text: str = None, locale: str = "uk",
+                        one_per_row: bool = False) -> InlineKeyboardMarkup:
     """Клавіатура з WebApp кнопкою"""
     if text is None:
         text = get_text(locale, "buttons.open_game")
-    
+    return _webapp_template(text, locale, one_per_row).fill(url=url)
+
+@cached_keyboard
+def _buckshot_session_template(locale: str) -> KeyboardTemplate:
     builder = InlineKeyboardBuilder()
     builder.add(InlineKeyboardButton(
-        text=text,
-        web_app={"url": url}
+        text=get_text(locale, "buttons.open_game"),
+        web_app={"url": "{url}"}
     ))
     builder.add(InlineKeyboardButton(
-        text=get_text(locale, "buttons.back"), 
+        text=get_text(locale, "buttons.invite_player"),
+        callback_data="invite_buckshot_{chat_id}"
+    ))
+    builder.add(InlineKeyboardButton(
+        text=get_text(locale, "buttons.back"),
         callback_data="back_to_main"
     ))
-    return builder.as_markup() 
\ No newline at end of file
+    builder.adjust(1)
+    return KeyboardTemplate(builder.as_markup())
+
+def get_buckshot_session_keyboard(url: str, chat_id, locale: str = "uk") -> InlineKeyboardMarkup:
+    """Створена сесія Buckshot: відкрити гру, запросити гравця, назад"""
+    return _buckshot_session_template(locale).fill(url=url, chat_id=chat_id)
+
+@cached_keyboard
+def _blackjack_session_template() -> KeyboardTemplate:
+    builder = InlineKeyboardBuilder()
+    builder.add(InlineKeyboardButton(
+        text="🎮 Відкрити BlackJack",
+        web_app={"url": "{url}"}
+    ))
+    builder.add(InlineKeyboardButton(
+        text="👥 Запросити гравця",
+        callback_data="invite_player_{chat_id}"
+    ))
+    builder.add(InlineKeyboardButton(
+        text="⬅️ Назад",
+        callback_data="back_to_main"
+    ))
+    builder.adjust(1)  # По одній кнопці в ряд
+    return KeyboardTemplate(builder.as_markup())
+
+def get_blackjack_session_keyboard(url: str, chat_id) -> InlineKeyboardMarkup:
+    """Створена сесія BlackJack: відкрити гру, запросити гравця, назад"""
+    return _blackjack_session_template().fill(url=url, chat_id=chat_id)
+
+@cached_keyboard
+def _invite_template(join_text: str, decline_text: str, join_prefix: str) -> KeyboardTemplate:
+    builder = InlineKeyboardBuilder()
+    builder.add(InlineKeyboardButton(
+        text=join_text,
+        callback_data=join_prefix + "{chat_id}"
+    ))
+    builder.add(InlineKeyboardButton(
+        text=decline_text,
+        callback_data="decline_invite"
+    ))
+    builder.adjust(1)
+    return KeyboardTemplate(builder.as_markup())
+
+def get_blackjack_invite_keyboard(chat_id) -> InlineKeyboardMarkup:
+    """Запрошення до BlackJack: приєднатися або відхилити"""
+    return _invite_template("🎮 Приєднатися до гри", "❌ Відхилити", "join_game_").fill(chat_id=chat_id)
+
+def get_buckshot_invite_keyboard(chat_id, locale: str = "uk") -> InlineKeyboardMarkup:
+    """Запрошення до Buckshot Roulette: приєднатися або відхилити"""
+    return _invite_template(
+        get_text(locale, "buttons.join_game"),
+        get_text(locale, "buttons.decline"),
+        "join_buckshot_"
+    ).fill(chat_id=chat_id)
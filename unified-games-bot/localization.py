@@ -1,14 +1,85 @@
+import asyncio
 import json
+import logging
 import os
-from typing import Dict, Any, Optional
+import signal
+from string import Formatter
+from typing import Dict, Any, Optional, Tuple
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCALE = "uk"
+
+def _flatten(node: Dict[str, Any], prefix: str = "", out: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Розгорнути вкладені переклади у {"bot.welcome": значення}"""
+    if out is None:
+        out = {}
+    for key, value in node.items():
+        path = prefix + key
+        out[path] = value
+        if isinstance(value, dict):
+            _flatten(value, path + ".", out)
+    return out
+
+def _compile_entry(value: Any) -> Tuple[str, Any]:
+    """(текст без підстановки, шаблон) для одного ключа.
+
+    Шаблон без полів зберігається вже готовим рядком (з розкритими {{ }}),
+    з полями - як зв'язаний метод str.format, щоб виклик йшов одразу в C.
+    """
+    if not isinstance(value, str):
+        text = str(value)
+        return text, text
+    try:
+        has_fields = any(field is not None for _, field, _, _ in Formatter().parse(value))
+    except ValueError:
+        has_fields = True
+    return value, value.format if has_fields else value.format()
+
+def _template_fields(text: str) -> set:
+    """Імена полів шаблону; ValueError для зламаного шаблону"""
+    fields = set()
+    for _, field, _, _ in Formatter().parse(text):
+        if field is not None:
+            fields.add(field)
+    return fields
+
+def validate_translations(translations: Dict[str, Dict[str, Any]]) -> list:
+    """Перевірити набір бандлів перед підміною; повертає список помилок"""
+    base = translations.get(DEFAULT_LOCALE)
+    if not base:
+        return [f"default locale '{DEFAULT_LOCALE}' is missing or empty"]
+    
+    errors = []
+    base_fields = {}
+    for locale in [DEFAULT_LOCALE] + sorted(set(translations) - {DEFAULT_LOCALE}):
+        for key, value in _flatten(translations[locale]).items():
+            if not isinstance(value, str):
+                continue
+            try:
+                fields = _template_fields(value)
+            except ValueError as e:
+                errors.append(f"{locale}:{key}: {e}")
+                continue
+            if locale == DEFAULT_LOCALE:
+                base_fields[key] = fields
+            elif key in base_fields and not fields <= base_fields[key]:
+                # Обробники передають лише поля українського шаблону
+                extra = ", ".join(sorted(fields - base_fields[key]))
+                errors.append(f"{locale}:{key}: unknown placeholders {extra}")
+    return errors
+
 class Localization:
     """Система локалізації для бота"""
     
-    def __init__(self):
+    def __init__(self, watch_interval: float = 0):
         self.locales_dir = Path(__file__).parent / "locales"
         self.translations: Dict[str, Dict[str, Any]] = {}
+        self.tables: Dict[str, Dict[str, Tuple[str, Any]]] = {}
+        self.watch_interval = watch_interval
+        self._reload_listeners = []
+        self._watcher = None
         self.load_translations()
     
     def load_translations(self):
@@ -20,33 +91,124 @@ class Localization:
                     self.translations[locale] = json.load(f)
             except Exception as e:
                 print(f"Error loading locale {locale}: {e}")
+        self.compile_tables()
     
-    def get_text(self, locale: str, key: str, **kwargs) -> str:
-        """Отримати переклад за ключем з підстановкою параметрів"""
-        if locale not in self.translations:
-            locale = "uk"  # Fallback to Ukrainian
+    def compile_tables(self):
+        """Скомпілювати плоскі таблиці ключ -> шаблон з уже підмішаним fallback на українську"""
+        self.tables = self._compile(self.translations)
+    
+    @staticmethod
+    def _compile(translations: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Tuple[str, Any]]]:
+        base = {
+            key: _compile_entry(value)
+            for key, value in _flatten(translations.get(DEFAULT_LOCALE, {})).items()
+        }
+        tables = {DEFAULT_LOCALE: base}
+        for locale, bundle in translations.items():
+            if locale != DEFAULT_LOCALE:
+                table = dict(base)
+                table.update((key, _compile_entry(value)) for key, value in _flatten(bundle).items())
+                tables[locale] = table
+        return tables
+    
+    def _read_bundles(self) -> Dict[str, Dict[str, Any]]:
+        translations = {}
+        for locale_file in sorted(self.locales_dir.glob("*.json")):
+            try:
+                with open(locale_file, 'r', encoding='utf-8') as f:
+                    bundle = json.load(f)
+            except ValueError as e:
+                raise ValueError(f"{locale_file.name}: {e}") from e
+            if not isinstance(bundle, dict):
+                raise ValueError(f"{locale_file.name}: root must be a JSON object")
+            translations[locale_file.stem] = bundle
+        return translations
+    
+    def reload(self) -> bool:
+        """Перечитати locales/*.json і атомарно підмінити таблиці.
         
-        # Розбиваємо ключ на частини (наприклад: "bot.welcome")
-        keys = key.split('.')
-        value = self.translations[locale]
+        Весь набір бандлів читається, перевіряється та компілюється збоку;
+        при будь-якій помилці залишаються поточні переклади.
+        """
+        try:
+            translations = self._read_bundles()
+            errors = validate_translations(translations)
+            if errors:
+                raise ValueError("; ".join(errors))
+            tables = self._compile(translations)
+        except Exception as e:
+            logger.error(f"Locale reload rejected, keeping current translations: {e}")
+            return False
         
+        # Читачі беруть self.tables одним зверненням - підміна посилання атомарна
+        self.tables = tables
+        self.translations = translations
+        for listener in self._reload_listeners:
+            listener()
+        logger.info(f"Locales reloaded: {', '.join(sorted(translations))}")
+        return True
+    
+    def add_reload_listener(self, listener):
+        """Викликати listener() після кожного успішного перезавантаження"""
+        self._reload_listeners.append(listener)
+    
+    def _bundle_stamp(self):
+        stamp = []
+        for locale_file in sorted(self.locales_dir.glob("*.json")):
+            try:
+                stat = locale_file.stat()
+            except FileNotFoundError:
+                continue
+            stamp.append((locale_file.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(stamp)
+    
+    async def _watch(self, stamp):
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            current = self._bundle_stamp()
+            if current != stamp:
+                stamp = current
+                self.reload()
+    
+    async def start_watching(self):
+        """SIGHUP та (якщо задано watch_interval) стеження за файлами - на старті Dispatcher"""
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGHUP, self.reload)
+        except (AttributeError, NotImplementedError, RuntimeError):
+            pass  # Windows або не головний потік
+        if self.watch_interval > 0 and self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch(self._bundle_stamp()))
+    
+    async def stop_watching(self):
+        """Зупинити перезавантаження перекладів (при зупинці Dispatcher)"""
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
         try:
-            for k in keys:
-                value = value[k]
-        except (KeyError, TypeError):
-            # Fallback to Ukrainian
-            if locale != "uk":
-                return self.get_text("uk", key, **kwargs)
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+        except (AttributeError, NotImplementedError, RuntimeError):
+            pass
+    
+    def get_text(self, locale: str, key: str, **kwargs) -> str:
+        """Отримати переклад за ключем з підстановкою параметрів"""
+        tables = self.tables
+        table = tables.get(locale) or tables[DEFAULT_LOCALE]
+        entry = table.get(key)
+        if entry is None:
             return f"Missing translation: {key}"
         
-        # Підставляємо параметри
-        if isinstance(value, str) and kwargs:
-            try:
-                return value.format(**kwargs)
-            except KeyError:
-                return value
+        text, template = entry
+        if not kwargs:
+            return text
+        if template.__class__ is str:
+            return template
         
-        return str(value)
+        # Підставляємо параметри
+        try:
+            return template(**kwargs)
+        except KeyError:
+            return text
     
     def get_available_locales(self) -> list:
         """Отримати список доступних мов"""
@@ -56,12 +218,11 @@ class Localization:
         """Перевірити чи існує мова"""
         return locale in self.translations
 
-# Глобальний екземпляр локалізації
-localization = Localization()
+# Глобальний екземпляр локалізації (LOCALES_WATCH_INTERVAL=0 - лише SIGHUP)
+localization = Localization(watch_interval=float(os.getenv('LOCALES_WATCH_INTERVAL', 2)))
 
-def get_text(locale: str, key: str, **kwargs) -> str:
-    """Зручна функція для отримання перекладу"""
-    return localization.get_text(locale, key, **kwargs)
+# Зручна функція для отримання перекладу (зв'язаний метод, без зайвого виклику-обгортки)
+get_text = localization.get_text
 
 def get_user_language(user_id: int) -> str:
     """Отримати мову користувача (з бази даних або за замовчуванням)"""
@@ -3,11 +3,14 @@ import logging
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 
 import config
+from fsm_storage import create_storage
+from api_client import api_client
 from handlers import router
-from models import init_db
+from localization import localization
+from user_cache import user_cache
+from models import init_db, async_engine
 
 # Configure logging
 logging.basicConfig(
@@ -28,9 +31,24 @@ async def main():
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
     
-    dp = Dispatcher(storage=MemoryStorage())
+    storage = create_storage(
+        config.FSM_STORAGE,
+        cache_ttl=config.FSM_CACHE_TTL,
+        flush_interval=config.FSM_FLUSH_INTERVAL,
+        state_ttl=config.FSM_STATE_TTL
+    )
+    dp = Dispatcher(storage=storage)
     dp.include_router(router)
     
+    # Пул HTTP з'єднань до ігрових API живе стільки ж, скільки Dispatcher
+    dp.startup.register(api_client.start)
+    dp.shutdown.register(api_client.close)
+    dp.startup.register(user_cache.start)
+    dp.shutdown.register(user_cache.close)
+    dp.shutdown.register(async_engine.dispose)
+    dp.startup.register(localization.start_watching)
+    dp.shutdown.register(localization.stop_watching)
+    
     # Delete webhook if it exists (for polling mode)
     try:
         await bot.delete_webhook(drop_pending_updates=True)
@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean
+from sqlalchemy import create_engine, event, select, Column, Integer, String, DateTime, Boolean
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -38,6 +40,34 @@ DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///unified_games.db')
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async database setup (aiosqlite / asyncpg) для обробників aiogram
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+
+def get_async_database_url(url: str) -> str:
+    """Підставити асинхронний драйвер у DATABASE_URL"""
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.drivername)
+    return url.set(drivername=driver).render_as_string(hide_password=False) if driver else str(url)
+
+ASYNC_DATABASE_URL = get_async_database_url(DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_POOL_SIZE * 2,
+    pool_pre_ping=True
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+if async_engine.dialect.name == 'sqlite':
+    @event.listens_for(async_engine.sync_engine, 'connect')
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        """WAL: читачі не блокуються записом, а записи не чекають fsync кожного читання"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
 def init_db():
     """Ініціалізувати базу даних"""
     Base.metadata.create_all(bind=engine)
@@ -99,4 +129,75 @@ def update_user_language(db, user_id: int, language: str) -> bool:
 def get_user_language(db, user_id: int) -> str:
     """Отримати мову користувача"""
     user = get_user_by_id(db, user_id)
-    return user.language if user else 'uk' 
\ No newline at end of file
+    return user.language if user else 'uk' 
+
+async def get_user_by_id_async(db, user_id: int) -> User:
+    """Отримати користувача за ID (async)"""
+    result = await db.execute(select(User).where(User.user_id == user_id))
+    return result.scalar_one_or_none()
+
+async def create_or_update_user_async(db, user_id: int, username: str = None,
+                                      first_name: str = None, last_name: str = None,
+                                      language: str = 'uk') -> User:
+    """Створити або оновити користувача (async)"""
+    user = await get_user_by_id_async(db, user_id)
+    
+    if user:
+        if username is not None:
+            user.username = username
+        if first_name is not None:
+            user.first_name = first_name
+        if last_name is not None:
+            user.last_name = last_name
+        if language is not None:
+            user.language = language
+        user.updated_at = datetime.utcnow()
+    else:
+        user = User(
+            user_id=user_id,
+            username=username,
+            first_name=first_name,
+            last_name=last_name,
+            language=language
+        )
+        db.add(user)
+    
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+async def upsert_users_async(db, profiles: dict, chunk_size: int = 500) -> int:
+    """Зберегти пачку профілів одним комітом (async)"""
+    user_ids = list(profiles)
+    now = datetime.utcnow()
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        result = await db.execute(select(User).where(User.user_id.in_(chunk)))
+        existing = {user.user_id: user for user in result.scalars()}
+        for user_id in chunk:
+            profile = profiles[user_id]
+            user = existing.get(user_id)
+            if user is None:
+                db.add(User(user_id=user_id, language='uk', **profile))
+                continue
+            for field, value in profile.items():
+                if value is not None:
+                    setattr(user, field, value)
+            user.updated_at = now
+    await db.commit()
+    return len(user_ids)
+
+async def update_user_language_async(db, user_id: int, language: str) -> bool:
+    """Оновити мову користувача (async)"""
+    user = await get_user_by_id_async(db, user_id)
+    if user:
+        user.language = language
+        user.updated_at = datetime.utcnow()
+        await db.commit()
+        return True
+    return False
+
+async def get_user_language_async(db, user_id: int) -> str:
+    """Отримати мову користувача (async)"""
+    result = await db.execute(select(User.language).where(User.user_id == user_id))
+    return result.scalar_one_or_none() or 'uk'
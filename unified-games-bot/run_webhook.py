@@ -1,41 +1,64 @@
 import asyncio
 import logging
+import signal
 from aiohttp import web
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
-from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiogram.webhook.aiohttp_server import setup_application
 
 import config
+from fsm_storage import create_storage
+from api_client import api_client
 from handlers import router
+from localization import localization
+from user_cache import user_cache
+from models import async_engine
+from update_scheduler import ScheduledRequestHandler, ShardedRequestHandler, UpdateScheduler
 
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    format='%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
-async def main():
-    """Main function to run the bot with webhook"""
-    # Initialize bot and dispatcher
-    bot = Bot(
+def create_bot() -> Bot:
+    return Bot(
         token=config.BOT_TOKEN,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
-    
-    dp = Dispatcher(storage=MemoryStorage())
+
+def create_dispatcher() -> Dispatcher:
+    """Dispatcher з усіма сервісами, прив'язаними до його старту та зупинки"""
+    storage = create_storage(
+        config.FSM_STORAGE,
+        cache_ttl=config.FSM_CACHE_TTL,
+        flush_interval=config.FSM_FLUSH_INTERVAL,
+        state_ttl=config.FSM_STATE_TTL
+    )
+    dp = Dispatcher(storage=storage)
     dp.include_router(router)
-    
-    # Set webhook
+
+    # Пул HTTP з'єднань до ігрових API живе стільки ж, скільки Dispatcher
+    dp.startup.register(api_client.start)
+    dp.shutdown.register(api_client.close)
+    dp.startup.register(user_cache.start)
+    dp.shutdown.register(user_cache.close)
+    dp.shutdown.register(async_engine.dispose)
+    dp.startup.register(localization.start_watching)
+    dp.shutdown.register(localization.stop_watching)
+    return dp
+
+async def configure_webhook(bot: Bot):
+    """Встановити webhook і команди бота (один раз, а не в кожному воркері)"""
     if config.WEBHOOK_URL:
         await bot.set_webhook(
             url=config.WEBHOOK_URL + config.WEBHOOK_PATH,
             drop_pending_updates=True
         )
         logger.info(f"Webhook set to {config.WEBHOOK_URL + config.WEBHOOK_PATH}")
-    
+
     # Set bot commands
     from aiogram.types import BotCommand
     commands = [
@@ -44,35 +67,108 @@ async def main():
         BotCommand(command="rules", description="📖 Правила ігор"),
     ]
     await bot.set_my_commands(commands)
-    
+
+async def serve(worker_index: int = 0, workers: int = 1):
+    """Запустити webhook сервер; з workers > 1 - як один із воркерів на спільному порту"""
+    bot = create_bot()
+    dp = create_dispatcher()
+    if workers == 1:
+        await configure_webhook(bot)
+
     # Create aiohttp application
     app = web.Application()
-    
-    # Setup webhook handler
-    webhook_handler = SimpleRequestHandler(
-        dispatcher=dp,
-        bot=bot
+
+    # Setup webhook handler: ACK одразу, апдейти одного користувача - по черзі
+    scheduler = UpdateScheduler(
+        dp,
+        bot,
+        max_concurrency=config.UPDATE_CONCURRENCY,
+        max_pending=config.UPDATE_QUEUE_LIMIT
     )
+    if workers == 1:
+        webhook_handler = ScheduledRequestHandler(
+            dispatcher=dp,
+            bot=bot,
+            scheduler=scheduler
+        )
+    else:
+        webhook_handler = ShardedRequestHandler(
+            dispatcher=dp,
+            bot=bot,
+            scheduler=scheduler,
+            worker_index=worker_index,
+            workers=workers,
+            port_base=config.WORKER_PORT_BASE
+        )
     webhook_handler.register(app, path=config.WEBHOOK_PATH)
-    
+
     # Setup application
     setup_application(app, dp, bot=bot)
-    
+
+    runner = web.AppRunner(app, shutdown_timeout=config.WORKER_SHUTDOWN_TIMEOUT)
+    await runner.setup()
+    await web.TCPSite(
+        runner, config.WEBAPP_HOST, config.WEBAPP_PORT, reuse_port=workers > 1
+    ).start()
+    internal_runner = None
+    if workers > 1:
+        # Внутрішній порт для апдейтів, пересланих іншими воркерами: окремий
+        # застосунок лише з цим маршрутом, публічний порт його не обслуговує
+        internal_app = web.Application()
+        webhook_handler.register_internal(internal_app, config.WEBHOOK_PATH)
+        internal_runner = web.AppRunner(internal_app)
+        await internal_runner.setup()
+        await web.TCPSite(internal_runner, "127.0.0.1", config.WORKER_PORT_BASE + worker_index).start()
+
+    logger.info(f"Worker {worker_index + 1}/{workers} listening on {config.WEBAPP_HOST}:{config.WEBAPP_PORT}")
+
+    # SIGTERM/SIGINT: перестати приймати запити, дообробити черги, закрити сервіси
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        if internal_runner is not None:
+            await internal_runner.cleanup()
+        await runner.cleanup()
+        logger.info(f"Worker {worker_index + 1}/{workers} stopped")
+
+def run_worker(worker_index: int, workers: int):
+    """Точка входу процесу-воркера"""
+    asyncio.run(serve(worker_index, workers))
+
+async def setup_once():
+    bot = create_bot()
+    try:
+        await configure_webhook(bot)
+    finally:
+        await bot.session.close()
+
+def main():
+    """Main function to run the bot with webhook"""
     logger.info("Starting Unified Games Bot with webhook...")
     logger.info(f"Webhook path: {config.WEBHOOK_PATH}")
     logger.info(f"Available games: Buckshot Roulette, BlackJack")
-    
-    # Start webhook
-    web.run_app(
-        app,
-        host=config.WEBAPP_HOST,
-        port=config.WEBAPP_PORT
-    )
+
+    if config.WEBHOOK_WORKERS <= 1:
+        asyncio.run(serve())
+        return
+
+    from supervisor import Supervisor
+    asyncio.run(setup_once())
+    Supervisor(
+        run_worker,
+        config.WEBHOOK_WORKERS,
+        ready_port=config.WORKER_PORT_BASE,
+        shutdown_timeout=config.WORKER_SHUTDOWN_TIMEOUT
+    ).run()
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        main()
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
-        logger.error(f"Error running bot: {e}") 
\ No newline at end of file
+        logger.error(f"Error running bot: {e}")
@@ -0,0 +1,109 @@
+import logging
+import multiprocessing
+import signal
+import socket
+import time
+
+logger = logging.getLogger(__name__)
+
+class Supervisor:
+    """Pre-fork менеджер воркерів webhook сервера.
+
+    Запускає workers процесів target(index, workers), перезапускає ті, що впали,
+    по SIGHUP перезапускає їх по одному (наступний - лише коли попередній готовий),
+    по SIGTERM/SIGINT м'яко зупиняє всіх. Готовність воркера - відкритий
+    внутрішній порт ready_port + index.
+    """
+
+    def __init__(self, target, workers: int, ready_port: int, shutdown_timeout: float = 30,
+                 ready_timeout: float = 60, restart_delay: float = 1.0):
+        self.target = target
+        self.workers = workers
+        self.ready_port = ready_port
+        self.shutdown_timeout = shutdown_timeout
+        self.ready_timeout = ready_timeout
+        self.restart_delay = restart_delay
+        self._context = multiprocessing.get_context("spawn")
+        self._processes = []
+        self._started_at = []
+        self._stopping = False
+        self._reload = False
+
+    def _start(self, index: int):
+        process = self._context.Process(
+            target=self.target, args=(index, self.workers), name=f"webhook-worker-{index}"
+        )
+        process.start()
+        logger.info(f"Started worker {index} (pid {process.pid})")
+        return process
+
+    def _wait_ready(self, index: int, process) -> bool:
+        deadline = time.monotonic() + self.ready_timeout
+        while time.monotonic() < deadline and not self._stopping:
+            if not process.is_alive():
+                return False
+            try:
+                with socket.create_connection(("127.0.0.1", self.ready_port + index), timeout=0.5):
+                    return True
+            except OSError:
+                time.sleep(0.2)
+        return False
+
+    def _stop(self, process):
+        """SIGTERM і очікування, поки воркер дообробить черги; потім SIGKILL"""
+        if process.is_alive():
+            process.terminate()
+        process.join(self.shutdown_timeout + 5)
+        if process.is_alive():
+            logger.warning(f"Worker pid {process.pid} did not stop in time, killing")
+            process.kill()
+            process.join()
+
+    def rolling_restart(self):
+        """Перезапустити воркери по одному, щоб решта продовжувала приймати апдейти"""
+        logger.info("Rolling restart of webhook workers")
+        for index in range(self.workers):
+            if self._stopping:
+                return
+            self._stop(self._processes[index])
+            self._processes[index] = self._start(index)
+            self._started_at[index] = time.monotonic()
+            if not self._wait_ready(index, self._processes[index]):
+                logger.error(f"Worker {index} did not become ready after restart")
+
+    def _on_signal(self, signum, frame):
+        if signum == signal.SIGHUP:
+            self._reload = True
+        else:
+            self._stopping = True
+
+    def run(self):
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(sig, self._on_signal)
+
+        self._processes = [self._start(index) for index in range(self.workers)]
+        self._started_at = [time.monotonic()] * self.workers
+        logger.info(f"Supervisor running {self.workers} workers (SIGHUP - rolling restart)")
+
+        try:
+            while not self._stopping:
+                time.sleep(0.5)
+                if self._reload:
+                    self._reload = False
+                    self.rolling_restart()
+                for index, process in enumerate(self._processes):
+                    if self._stopping or process.is_alive():
+                        continue
+                    # Воркер упав: перезапуск, але не частіше restart_delay
+                    if time.monotonic() - self._started_at[index] < self.restart_delay:
+                        continue
+                    logger.error(f"Worker {index} exited with code {process.exitcode}, restarting")
+                    self._processes[index] = self._start(index)
+                    self._started_at[index] = time.monotonic()
+        finally:
+            logger.info("Stopping webhook workers")
+            for process in self._processes:
+                if process.is_alive():
+                    process.terminate()
+            for process in self._processes:
+                self._stop(process)
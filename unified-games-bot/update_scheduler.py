@@ -0,0 +1,182 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Dict, Optional
+
+from aiohttp import ClientError, ClientSession, ClientTimeout, web
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+
+logger = logging.getLogger(__name__)
+
+def ordering_key(update: Dict[str, Any]) -> Optional[tuple]:
+    """Ключ черги для апдейта: користувач (from.id), інакше чат, інакше None"""
+    for field, event in update.items():
+        if field == "update_id" or not isinstance(event, dict):
+            continue
+        user = event.get("from") or event.get("user")
+        if user:
+            return ("user", user["id"])
+        chat = event.get("chat") or (event.get("message") or {}).get("chat")
+        if chat:
+            return ("chat", chat["id"])
+    return None
+
+class UpdateScheduler:
+    """Паралельна обробка апдейтів різних користувачів, послідовна - одного користувача.
+
+    Кожен ключ (користувач або чат) має свою чергу та не більше одного активного
+    завдання, тому подвійне натискання кнопки обробляється по черзі.
+    Одночасно виконується не більше max_concurrency апдейтів; якщо в роботі
+    вже max_pending апдейтів, нові відхиляються, і Telegram доставить їх повторно.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, max_concurrency: int = 64,
+                 max_pending: int = 1000, **data: Any):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.max_pending = max_pending
+        self.data = data
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._queues: Dict[Any, deque] = {}
+        self._tasks: set = set()
+        self.pending = 0
+
+    def submit(self, update: Dict[str, Any]) -> bool:
+        """Поставити апдейт у чергу; False - перевищено ліміт (back-pressure)"""
+        if self.pending >= self.max_pending:
+            return False
+        self.pending += 1
+
+        key = ordering_key(update)
+        if key is None:
+            key = ("update", update.get("update_id"))
+        queue = self._queues.get(key)
+        if queue is not None:
+            queue.append(update)  # воркер цього ключа вже працює
+            return True
+
+        self._queues[key] = deque((update,))
+        task = asyncio.create_task(self._drain(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _drain(self, key):
+        queue = self._queues[key]
+        try:
+            while queue:
+                update = queue.popleft()
+                try:
+                    async with self._slots:
+                        await self._process(update)
+                finally:
+                    self.pending -= 1
+        finally:
+            del self._queues[key]
+
+    async def _process(self, update: Dict[str, Any]):
+        try:
+            result = await self.dispatcher.feed_raw_update(bot=self.bot, update=update, **self.data)
+            if isinstance(result, TelegramMethod):
+                await self.dispatcher.silent_call_request(bot=self.bot, result=result)
+        except Exception as e:
+            logger.error(f"Error processing update {update.get('update_id')}: {e}")
+
+    async def close(self, timeout: float = 30):
+        """Дочекатися апдейтів, що вже в роботі (при зупинці)"""
+        if self._tasks:
+            done, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                logger.warning(f"Dropped {len(pending)} update queues on shutdown")
+
+class ScheduledRequestHandler(SimpleRequestHandler):
+    """Webhook handler: одразу відповідає Telegram, а апдейт віддає UpdateScheduler"""
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, scheduler: UpdateScheduler, **kwargs: Any):
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=True, **kwargs)
+        self.scheduler = scheduler
+
+    async def close(self) -> None:
+        """Дообробити черги і лише потім закрити сесію бота"""
+        await self.scheduler.close()
+        await super().close()
+
+    def _submit(self, bot: Bot, update: Dict[str, Any]) -> web.Response:
+        if not self.scheduler.submit(update):
+            # Черга повна: Telegram повторить доставку пізніше
+            return web.Response(status=503, headers={"Retry-After": "1"})
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        update = await request.json(loads=bot.session.json_loads)
+        return self._submit(bot, update)
+
+def shard_of(update: Dict[str, Any], workers: int) -> Optional[int]:
+    """Номер воркера, що володіє користувачем/чатом апдейта; None - будь-який"""
+    key = ordering_key(update)
+    if key is None:
+        return None
+    return key[1] % workers
+
+class ShardedRequestHandler(ScheduledRequestHandler):
+    """Webhook handler для кількох воркерів на одному порту (SO_REUSEPORT).
+
+    Кожен користувач закріплений за одним воркером (user_id % workers), тому
+    порядок його апдейтів і кеші процесу залишаються узгодженими. Чужі апдейти
+    пересилаються власнику на його внутрішній порт (127.0.0.1:port_base + номер).
+    Там їх приймає окремий застосунок з register_internal: на публічному порту
+    апдейт завжди маршрутизується за user_id, хай які заголовки він має.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, scheduler: UpdateScheduler,
+                 worker_index: int, workers: int, port_base: int, **kwargs: Any):
+        super().__init__(dispatcher=dispatcher, bot=bot, scheduler=scheduler, **kwargs)
+        self.worker_index = worker_index
+        self.workers = workers
+        self.port_base = port_base
+        self._forward_session: Optional[ClientSession] = None
+
+    async def close(self) -> None:
+        if self._forward_session is not None:
+            await self._forward_session.close()
+        await super().close()
+
+    async def _forward(self, shard: int, request: web.Request, body: bytes) -> web.Response:
+        if self._forward_session is None:
+            self._forward_session = ClientSession(timeout=ClientTimeout(total=5))
+        headers = {"Content-Type": "application/json"}
+        secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token")
+        if secret:
+            headers["X-Telegram-Bot-Api-Secret-Token"] = secret
+        url = f"http://127.0.0.1:{self.port_base + shard}{request.path}"
+        try:
+            async with self._forward_session.post(url, data=body, headers=headers) as response:
+                return web.Response(status=response.status, headers={"Retry-After": "1"} if response.status == 503 else None)
+        except (ClientError, asyncio.TimeoutError) as e:
+            # Воркер шарду перезапускається: Telegram повторить доставку
+            logger.warning(f"Worker {shard} unavailable: {e}")
+            return web.Response(status=503, headers={"Retry-After": "1"})
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        body = await request.read()
+        update = bot.session.json_loads(body)
+        shard = shard_of(update, self.workers)
+        if shard is not None and shard != self.worker_index:
+            return await self._forward(shard, request, body)
+        return self._submit(bot, update)
+
+    def register_internal(self, app: web.Application, path: str) -> None:
+        """Маршрут для апдейтів від інших воркерів (лише на внутрішньому loopback сайті)"""
+        app.router.add_route("POST", path, self.handle_forwarded)
+
+    async def handle_forwarded(self, request: web.Request) -> web.Response:
+        """Апдейт, уже маршрутизований іншим воркером: обробити тут без пересилання"""
+        bot = await self.resolve_bot(request)
+        if not self.verify_secret(request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), bot):
+            return web.Response(body="Unauthorized", status=401)
+        update = await request.json(loads=bot.session.json_loads)
+        return self._submit(bot, update)
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+import config
+from models import (
+    AsyncSessionLocal,
+    create_or_update_user_async,
+    get_user_language_async,
+    update_user_language_async,
+    upsert_users_async
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LANGUAGE = 'uk'
+
+class UserCache:
+    """LRU/TTL кеш мови користувачів з відкладеним збереженням профілів"""
+
+    def __init__(self, maxsize=None, ttl=None, flush_interval=None):
+        self.maxsize = maxsize or config.USER_CACHE_SIZE
+        self.ttl = config.USER_CACHE_TTL if ttl is None else ttl
+        self.flush_interval = flush_interval or config.USER_FLUSH_INTERVAL
+        self._languages = OrderedDict()  # user_id -> (language, expires_at)
+        self._pending = {}  # user_id -> останній профіль, ще не записаний у БД
+        self._task = None
+        self._stopping = None
+
+    def _remember(self, user_id, language):
+        self._languages[user_id] = (language, time.monotonic() + self.ttl)
+        self._languages.move_to_end(user_id)
+        while len(self._languages) > self.maxsize:
+            self._languages.popitem(last=False)
+
+    async def get_language(self, user_id: int) -> str:
+        """Мова користувача з кешу, а при промаху чи застарілому записі - з БД"""
+        entry = self._languages.get(user_id)
+        if entry is not None and entry[1] > time.monotonic():
+            self._languages.move_to_end(user_id)
+            return entry[0]
+
+        try:
+            async with AsyncSessionLocal() as db:
+                language = await get_user_language_async(db, user_id)
+        except Exception as e:
+            logger.error(f"Error loading language for user {user_id}: {e}")
+            return entry[0] if entry else DEFAULT_LANGUAGE
+
+        self._remember(user_id, language)
+        return language
+
+    async def set_language(self, user_id: int, language: str) -> bool:
+        """Write-through: записати мову в БД і лише потім оновити кеш
+
+        Профіль у черзі запишеться при наступному flush; одразу з мовою
+        його зберігаємо лише для нового користувача.
+        """
+        try:
+            async with AsyncSessionLocal() as db:
+                if not await update_user_language_async(db, user_id, language):
+                    profile = self._pending.pop(user_id, {})
+                    try:
+                        await create_or_update_user_async(db, user_id, language=language, **profile)
+                    except Exception:
+                        if profile:
+                            self._pending.setdefault(user_id, profile)
+                        raise
+        except Exception as e:
+            logger.error(f"Error updating language for user {user_id}: {e}")
+            return False
+
+        self._remember(user_id, language)
+        return True
+
+    async def remember_user(self, user_id: int, username: str = None,
+                            first_name: str = None, last_name: str = None) -> str:
+        """Поставити профіль у чергу на збереження та повернути мову користувача"""
+        self._pending[user_id] = {
+            'username': username,
+            'first_name': first_name,
+            'last_name': last_name
+        }
+        return await self.get_language(user_id)
+
+    async def flush(self) -> int:
+        """Записати накопичені профілі однією транзакцією"""
+        if not self._pending:
+            return 0
+
+        pending, self._pending = self._pending, {}
+        try:
+            async with AsyncSessionLocal() as db:
+                return await upsert_users_async(db, pending)
+        except Exception as e:
+            logger.error(f"Error saving {len(pending)} user profiles: {e}")
+            # Новіші профілі, що прийшли під час запису, мають пріоритет
+            for user_id, profile in pending.items():
+                self._pending.setdefault(user_id, profile)
+            return 0
+
+    async def _flush_loop(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def start(self):
+        """Запустити фонове збереження профілів (на старті Dispatcher)"""
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        """Зупинити фонове збереження, дописавши чергу (при зупинці Dispatcher)"""
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+user_cache = UserCache()
+
+async def get_user_language(user_id: int) -> str:
+    """Отримати мову користувача"""
+    return await user_cache.get_language(user_id)
+
+async def set_user_language(user_id: int, language: str) -> bool:
+    """Змінити мову користувача"""
+    return await user_cache.set_language(user_id, language)
+
+async def remember_user(user_id: int, username: str = None,
+                        first_name: str = None, last_name: str = None) -> str:
+    """Оновити профіль користувача та отримати його мову"""
+    return await user_cache.remember_user(user_id, username, first_name, last_name)